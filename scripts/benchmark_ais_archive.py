@@ -0,0 +1,108 @@
+"""Time-range and bounding-box queries on the partitioned AIS archive against a flat file"""
+import sys
+import time
+import shutil
+import tempfile
+import argparse
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import pandas as pd
+from src.data.ais_archive import AISArchive
+from src.utils.config_loader import load_config
+
+
+def generate_fleet(n_vessels, days, reports_per_day, seed=42):
+    """Vessels drifting across the Indian Ocean, reporting over several days"""
+    rng = np.random.default_rng(seed)
+    n_points = days * reports_per_day
+    minutes = np.sort(rng.uniform(0, days * 1440, (n_vessels, n_points)), axis=1)
+    
+    df = pd.DataFrame({
+        'MMSI': np.repeat(400000000 + np.arange(1, n_vessels + 1), n_points),
+        'timestamp': pd.Timestamp('2024-01-01') + pd.to_timedelta(minutes.ravel(), unit='min'),
+        'lat': (np.repeat(rng.uniform(0, 24, n_vessels), n_points)
+                + rng.normal(0, 0.02, (n_vessels, n_points)).cumsum(axis=1).ravel()),
+        'lon': (np.repeat(rng.uniform(60, 92, n_vessels), n_points)
+                + rng.normal(0, 0.02, (n_vessels, n_points)).cumsum(axis=1).ravel()),
+        'SOG': rng.uniform(0, 12, n_vessels * n_points),
+        'COG': rng.uniform(0, 360, n_vessels * n_points)
+    })
+    return df.sort_values('timestamp', kind='stable').reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Partitioned archive query benchmark')
+    parser.add_argument('--vessels', type=int, default=500)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--reports', type=int, default=144, help='Reports per vessel per day')
+    parser.add_argument('--batches', type=int, default=4, help='Appends the fleet is split into')
+    args = parser.parse_args()
+    
+    config = load_config()
+    df = generate_fleet(args.vessels, args.days, args.reports)
+    workdir = Path(tempfile.mkdtemp(prefix='ais_archive_'))
+    
+    try:
+        flat_path = workdir / 'ais_flat.parquet'
+        df.to_parquet(flat_path, index=False)
+        
+        archive = AISArchive(config, root=workdir / 'archive', retention_days=0)
+        start = time.perf_counter()
+        for batch in np.array_split(np.arange(len(df)), args.batches):
+            archive.append(df.iloc[batch])
+        # Re-append an overlapping slice, as consecutive live fetches do
+        archive.append(df.iloc[:len(df) // 20])
+        write_s = time.perf_counter() - start
+        partitions = archive.partitions()
+        print(f"Archived {len(df):,} reports in {write_s:.2f} s: {len(partitions)} partitions, "
+              f"{partitions['parts'].sum()} part files")
+        
+        # Two days over one 4 x 4 degree box
+        q_start, q_end = pd.Timestamp('2024-01-03 06:00'), pd.Timestamp('2024-01-04 18:00')
+        bbox = [8.0, 72.0, 12.0, 76.0]
+        
+        start = time.perf_counter()
+        flat = pd.read_parquet(flat_path)
+        expected = flat[flat['timestamp'].between(q_start, q_end)
+                        & flat['lat'].between(bbox[0], bbox[2])
+                        & flat['lon'].between(bbox[1], bbox[3])]
+        flat_s = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        result = archive.load(start=q_start, end=q_end, bbox=bbox)
+        archive_s = time.perf_counter() - start
+        read = len(archive.matching_partitions(start=q_start, end=q_end, bbox=bbox))
+        
+        print(f"Query: full flat read {flat_s:.3f} s, archive {archive_s:.3f} s "
+              f"({read} of {len(partitions)} partitions read, {len(result):,} reports)")
+        
+        # Parity: same reports as filtering the flat file, duplicates removed
+        keys = ['MMSI', 'timestamp']
+        expected = expected.sort_values(keys).reset_index(drop=True)
+        got = result.sort_values(keys).reset_index(drop=True)
+        assert len(got) == len(expected), f"{len(got)} reports, expected {len(expected)}"
+        for column in ['MMSI', 'timestamp']:
+            assert (got[column].to_numpy() == expected[column].to_numpy()).all(), column
+        for column in ['lat', 'lon', 'SOG', 'COG']:
+            assert np.allclose(got[column].astype(float), expected[column].astype(float), atol=1e-4), column
+        print("Parity: archive query matches the filtered flat file")
+        
+        # Compaction merges every closed day's parts without changing the data
+        archive.compact(before=pd.Timestamp('2100-01-01'))
+        assert (archive.partitions()['parts'] == 1).all()
+        assert len(archive.load(start=q_start, end=q_end, bbox=bbox)) == len(expected)
+        
+        # Retention: keep the last three days relative to the final report
+        archive.retention_days = 3
+        removed = archive.apply_retention(now=df['timestamp'].max())
+        remaining = archive.partitions()['date']
+        assert remaining.min() >= df['timestamp'].max().normalize() - pd.Timedelta(days=3)
+        print(f"Compaction and retention checks passed ({len(removed)} day partitions removed)")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""Microbenchmark of the batch AIS payload decoders against the per-record parsers"""
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pandas as pd
+from scripts.stub_ais_server import sample_vessels, render
+from scripts.replay_aisstream_server import synthetic_messages
+from src.data.ais_decoders import decode_payload, decode_aisstream, orjson
+
+BBOX = [6, 68, 22, 88]
+
+
+def reference_aishub(payload):
+    """Per-record AISHub parser as used before the batch decoder"""
+    data = json.loads(payload)
+    vessels = []
+    for vessel in data[0]:
+        vessels.append({
+            'MMSI': int(vessel.get('MMSI', 0)),
+            'timestamp': datetime.fromtimestamp(int(vessel.get('TIME', 0))),
+            'lat': float(vessel.get('LATITUDE', 0)),
+            'lon': float(vessel.get('LONGITUDE', 0)),
+            'SOG': float(vessel.get('SOG', 0)),
+            'COG': float(vessel.get('COG', 0)),
+            'heading': float(vessel.get('HEADING', 0)),
+            'vessel_name': vessel.get('NAME', 'Unknown'),
+            'vessel_type': int(vessel.get('TYPE', 0))
+        })
+    return pd.DataFrame(vessels)
+
+
+def reference_marinetraffic(payload):
+    """Per-record MarineTraffic parser as used before the batch decoder"""
+    vessels = []
+    for vessel in json.loads(payload):
+        vessels.append({
+            'MMSI': vessel.get('MMSI'),
+            'timestamp': datetime.strptime(vessel.get('TIMESTAMP'), '%Y-%m-%d %H:%M:%S'),
+            'lat': float(vessel.get('LAT', 0)),
+            'lon': float(vessel.get('LON', 0)),
+            'SOG': float(vessel.get('SPEED', 0)),
+            'COG': float(vessel.get('COURSE', 0)),
+            'heading': float(vessel.get('HEADING', 0)),
+            'vessel_name': vessel.get('SHIPNAME', 'Unknown'),
+            'vessel_type': vessel.get('TYPE', 0)
+        })
+    return pd.DataFrame(vessels)
+
+
+def reference_vesselfinder(payload):
+    """Per-record VesselFinder parser as used before the batch decoder"""
+    vessels = []
+    for vessel in json.loads(payload)['vessels']:
+        vessels.append({
+            'MMSI': vessel.get('MMSI'),
+            'timestamp': datetime.fromtimestamp(vessel.get('TIMESTAMP', 0)),
+            'lat': float(vessel.get('LAT', 0)),
+            'lon': float(vessel.get('LON', 0)),
+            'SOG': float(vessel.get('SPEED', 0)),
+            'COG': float(vessel.get('COURSE', 0)),
+            'heading': float(vessel.get('HEADING', 0)),
+            'vessel_name': vessel.get('NAME', 'Unknown'),
+            'vessel_type': vessel.get('TYPE', 0)
+        })
+    return pd.DataFrame(vessels)
+
+
+def reference_aisstream(messages, bbox):
+    """Per-message AIS Stream parser as used before the batch decoder"""
+    vessels = []
+    for message in messages:
+        data = json.loads(message)
+        if 'Message' in data and 'PositionReport' in data['Message']:
+            pos = data['Message']['PositionReport']
+            lat = pos.get('Latitude')
+            lon = pos.get('Longitude')
+            if not (bbox[0] <= lat <= bbox[2] and bbox[1] <= lon <= bbox[3]):
+                continue
+            time_str = data['MetaData']['time_utc']
+            if ' UTC' in time_str:
+                time_str = time_str.replace(' UTC', '')
+            timestamp = datetime.strptime(time_str.split('.')[0], '%Y-%m-%d %H:%M:%S')
+            vessels.append({
+                'MMSI': data['MetaData'].get('MMSI'),
+                'timestamp': timestamp,
+                'lat': lat,
+                'lon': lon,
+                'SOG': pos.get('Sog', 0),
+                'COG': pos.get('Cog', 0),
+                'heading': pos.get('TrueHeading', 0),
+                'vessel_name': data['MetaData'].get('ShipName', 'Unknown'),
+                'vessel_type': data['MetaData'].get('ShipType', 0)
+            })
+    return pd.DataFrame(vessels)
+
+
+def best_of(func, repeat, *args, **kwargs):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def same_frame(a, b):
+    """Equal values, ignoring integer/float width differences of the legacy frames"""
+    if list(a.columns) != list(b.columns) or len(a) != len(b):
+        return False
+    for col in a.columns:
+        left, right = a[col], b[col]
+        if pd.api.types.is_numeric_dtype(left) and pd.api.types.is_numeric_dtype(right):
+            if not (left.astype('float64').to_numpy() == right.astype('float64').to_numpy()).all():
+                return False
+        elif not left.astype(str).equals(right.astype(str)):
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='AIS decoder microbenchmark')
+    parser.add_argument('--vessels', type=int, default=20000, help='Vessels per HTTP payload')
+    parser.add_argument('--messages', type=int, default=50000, help='AIS Stream messages per batch')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--record-dir', help='Also write the generated payloads here')
+    args = parser.parse_args()
+    
+    vessels = sample_vessels(args.vessels)
+    payloads = {name: json.dumps(render(name, vessels)).encode()
+                for name in ('aishub', 'marinetraffic', 'vesselfinder')}
+    messages = synthetic_messages(args.messages)
+    
+    if args.record_dir:
+        record_dir = Path(args.record_dir)
+        record_dir.mkdir(parents=True, exist_ok=True)
+        for name, payload in payloads.items():
+            (record_dir / f"{name}.json").write_bytes(payload)
+        (record_dir / "aisstream.jsonl").write_text('\n'.join(messages) + '\n')
+    
+    references = {
+        'aishub': reference_aishub,
+        'marinetraffic': reference_marinetraffic,
+        'vesselfinder': reference_vesselfinder
+    }
+    backends = ['json'] + (['orjson'] if orjson is not None else [])
+    
+    print("=" * 78)
+    print(f"AIS DECODERS - {args.vessels:,} vessels per payload, {args.messages:,} stream messages")
+    print("=" * 78)
+    print(f"{'format':<15} {'per-record (ms)':>16} " + ' '.join(f"{'batch/' + b + ' (ms)':>19}" for b in backends)
+          + f" {'identical':>10}")
+    print("-" * 78)
+    
+    rows = [(name, lambda p=payload, f=references[name]: f(p),
+             lambda backend, p=payload, n=name: decode_payload(n, p, backend=backend))
+            for name, payload in payloads.items()]
+    rows.append(('aisstream', lambda: reference_aisstream(messages, BBOX),
+                 lambda backend: decode_aisstream(messages, BBOX, backend=backend)))
+    
+    for name, reference, batch in rows:
+        expected, reference_time = best_of(reference, args.repeat)
+        timings, identical = [], True
+        for backend in backends:
+            result, elapsed = best_of(batch, args.repeat, backend)
+            timings.append(elapsed)
+            identical &= same_frame(expected, result)
+        
+        print(f"{name:<15} {reference_time * 1000:>16.1f} "
+              + ' '.join(f"{t * 1000:>11.1f} ({reference_time / t:>4.1f}x)" for t in timings)
+              + f" {str(identical):>10}")
+    
+    print("-" * 78)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Benchmark per-vessel track clustering and the region-wide hotspot pass"""
+import sys
+import time
+import argparse
+import tracemalloc
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import DBSCAN
+from src.features.clustering import TrackClusterer
+from src.utils.config_loader import load_config
+
+
+def fishing_fleet(n_vessels, points_per_vessel, n_grounds=5, seed=42):
+    """Vessels alternating between transits and fishing on a few shared grounds"""
+    rng = np.random.default_rng(seed)
+    grounds = np.column_stack([rng.uniform(8, 20, n_grounds), rng.uniform(70, 86, n_grounds)])
+    frames = []
+    for v in range(n_vessels):
+        home = grounds[rng.choice(n_grounds, size=2, replace=False)]
+        visit = (np.arange(points_per_vessel) // 40) % 3  # ground A, transit, ground B, ...
+        fishing = visit != 1
+        centre = np.where((visit == 0)[:, None], home[0], home[1])
+        lat = np.where(fishing, centre[:, 0] + rng.normal(0, 0.02, points_per_vessel),
+                       rng.uniform(6, 22, points_per_vessel))
+        lon = np.where(fishing, centre[:, 1] + rng.normal(0, 0.02, points_per_vessel),
+                       rng.uniform(68, 88, points_per_vessel))
+        frames.append(pd.DataFrame({
+            'MMSI': 400000000 + v,
+            'timestamp': pd.Timestamp('2024-01-01') + pd.to_timedelta(np.arange(points_per_vessel) * 5, unit='min'),
+            'lat': lat,
+            'lon': lon,
+            'SOG': np.where(fishing, rng.uniform(1.5, 4.5, points_per_vessel), rng.uniform(8, 14, points_per_vessel))
+        }))
+    return pd.concat(frames, ignore_index=True).sample(frac=1, random_state=seed)
+
+
+def legacy_table(df):
+    """Original per-vessel DBSCAN on degrees with the loop over cluster ids"""
+    features = {}
+    for mmsi, group in df.groupby('MMSI'):
+        coords = group.sort_values('timestamp')[['lat', 'lon']].values
+        n_clusters = cluster_time = cluster_revisits = 0
+        if len(coords) > 5:
+            labels = DBSCAN(eps=0.05, min_samples=3).fit(coords).labels_
+            n_clusters = len(set(labels)) - (1 if -1 in labels else 0)
+            cluster_time = (labels != -1).sum() / len(labels)
+            for cluster_id in set(labels):
+                if cluster_id != -1:
+                    cluster_indices = np.where(labels == cluster_id)[0]
+                    if len(cluster_indices) > 1:
+                        cluster_revisits += (np.diff(cluster_indices) > 10).sum()
+        features[mmsi] = (n_clusters, cluster_time, cluster_revisits)
+    return pd.DataFrame.from_dict(
+        features, orient='index', columns=['spatial_clusters', 'cluster_time_ratio', 'cluster_revisits']
+    ).rename_axis('MMSI')
+
+
+def measured(func, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Track clustering benchmark')
+    parser.add_argument('--vessels', type=int, default=20, help='Vessels in the timing runs')
+    parser.add_argument('--lengths', type=int, nargs='+', default=[500, 5000, 20000, 50000],
+                       help='Reports per vessel')
+    parser.add_argument('--legacy-max', type=int, default=20000,
+                       help='Longest track run through the legacy degrees DBSCAN')
+    args = parser.parse_args()
+    
+    config = load_config()
+    
+    print("=" * 78)
+    print("TRACK CLUSTERING")
+    print("=" * 78)
+    
+    # The degrees metric with vectorized revisits must reproduce the original table
+    sample = fishing_fleet(40, 400)
+    degrees = TrackClusterer(config)
+    degrees.metric = 'degrees'
+    expected = legacy_table(sample)
+    result = degrees.vessel_table(sample)
+    matches = (result.index.equals(expected.index) and
+               np.allclose(result.to_numpy(dtype=float), expected.to_numpy(dtype=float)))
+    print(f"degrees metric vs original loop ({len(sample):,} reports): {'identical' if matches else 'MISMATCH'}")
+    if not matches:
+        raise SystemExit("Vectorized clustering disagrees with the original implementation")
+    
+    clusterer = TrackClusterer(config)
+    print(f"haversine: eps {clusterer.eps_km} km, tracks over {clusterer.compress_above:,} reports "
+          f"grid-compressed into {clusterer.grid_km} km cells")
+    print("-" * 78)
+    print(f"{'reports/vessel':>14} {'legacy (s)':>11} {'peak MB':>8} {'haversine (s)':>14} {'peak MB':>8} {'clusters':>9}")
+    for length in args.lengths:
+        df = fishing_fleet(args.vessels, length)
+        table, elapsed, peak = measured(clusterer.vessel_table, df)
+        if length <= args.legacy_max:
+            _, legacy_elapsed, legacy_peak = measured(legacy_table, df)
+            legacy = f"{legacy_elapsed:>11.2f} {legacy_peak:>8.0f}"
+        else:
+            legacy = f"{'-':>11} {'-':>8}"
+        print(f"{length:>14,} {legacy} {elapsed:>14.2f} {peak:>8.0f} {table['spatial_clusters'].mean():>9.1f}")
+    
+    # Region-wide pass over all vessels
+    df = fishing_fleet(200, 2000)
+    (hotspots, hotspot_ids), elapsed, peak = measured(clusterer.hotspots, df)
+    print("-" * 78)
+    print(f"Hotspots over {len(df):,} reports of 200 vessels: {len(hotspots)} shared hotspots, "
+          f"{(hotspot_ids >= 0).mean():.0%} of reports inside, {elapsed:.2f} s, peak {peak:.0f} MB")
+    print(hotspots.head(10).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Benchmark the grid-indexed EEZ filter against the geopandas sjoin path"""
+import sys
+import time
+import argparse
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+from shapely.geometry import Polygon
+from src.preprocessing.eez_filter import EEZFilter
+from src.utils.config_loader import load_config
+
+
+def synthetic_boundary(n_vertices, seed=42):
+    """Coastline-like polygon with a smooth, wavy outline over the Indian EEZ box"""
+    rng = np.random.default_rng(seed)
+    angles = np.linspace(0, 2 * np.pi, n_vertices, endpoint=False)
+    radius = 0.8 + sum(
+        rng.uniform(0.01, 0.05) * np.sin(k * angles + rng.uniform(0, 2 * np.pi))
+        for k in range(2, 40)
+    ) / 4
+    lon = 78.0 + 10.0 * radius * np.cos(angles)
+    lat = 14.0 + 8.0 * radius * np.sin(angles)
+    return gpd.GeoDataFrame(geometry=[Polygon(zip(lon, lat))], crs="EPSG:4326")
+
+
+def random_points(n_points, boundary, seed=42):
+    """Uniform points over the boundary's bounding box plus a 10% margin"""
+    rng = np.random.default_rng(seed)
+    minx, miny, maxx, maxy = boundary.total_bounds
+    mx, my = (maxx - minx) * 0.1, (maxy - miny) * 0.1
+    return pd.DataFrame({
+        'MMSI': rng.integers(400000000, 400100000, n_points),
+        'lon': rng.uniform(minx - mx, maxx + mx, n_points),
+        'lat': rng.uniform(miny - my, maxy + my, n_points)
+    })
+
+
+def sjoin_mask(eez_filter, df):
+    """Membership mask from the sjoin path"""
+    gdf = eez_filter.create_geodataframe(df)
+    kept = eez_filter.filter_within_eez(gdf)
+    return np.isin(np.arange(len(df)), kept.index.to_numpy())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='EEZ filter benchmark')
+    parser.add_argument('--points', type=int, default=10_000_000,
+                       help='Points for the grid-index throughput run')
+    parser.add_argument('--sjoin-points', type=int, default=500_000,
+                       help='Points for the sjoin comparison and equivalence check')
+    parser.add_argument('--vertices', type=int, default=5000,
+                       help='Vertices of the synthetic irregular boundary')
+    args = parser.parse_args()
+    
+    config = load_config()
+    boundaries = {
+        'configured': gpd.read_file(config.get('data', 'eez_boundary')),
+        f'synthetic ({args.vertices} vertices)': synthetic_boundary(args.vertices)
+    }
+    
+    print("=" * 78)
+    print("EEZ FILTER BENCHMARK")
+    print("=" * 78)
+    
+    for name, boundary in boundaries.items():
+        eez_filter = EEZFilter(config)
+        eez_filter.eez_boundary = boundary
+        
+        start = time.perf_counter()
+        eez_filter.build_index()
+        build_time = time.perf_counter() - start
+        
+        # Equivalence and speed against sjoin on the smaller sample
+        sample = random_points(args.sjoin_points, boundary)
+        start = time.perf_counter()
+        expected = sjoin_mask(eez_filter, sample)
+        sjoin_time = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        mask = eez_filter.within_eez_mask(sample)
+        index_time = time.perf_counter() - start
+        mismatches = int((mask != expected).sum())
+        
+        # Throughput on the full run
+        points = random_points(args.points, boundary, seed=7)
+        start = time.perf_counter()
+        inside = eez_filter.within_eez_mask(points)
+        full_time = time.perf_counter() - start
+        
+        print(f"\nBoundary: {name}")
+        print(f"  index build:          {build_time:8.3f} s")
+        print(f"  sjoin   {len(sample):>11,} pts: {sjoin_time:8.3f} s "
+              f"({len(sample) / sjoin_time * 60 / 1e6:8.1f} M points/min)")
+        print(f"  index   {len(sample):>11,} pts: {index_time:8.3f} s "
+              f"({len(sample) / index_time * 60 / 1e6:8.1f} M points/min, "
+              f"{sjoin_time / index_time:.0f}x)")
+        print(f"  index   {len(points):>11,} pts: {full_time:8.3f} s "
+              f"({len(points) / full_time * 60 / 1e6:8.1f} M points/min, {inside.mean() * 100:.1f}% inside)")
+        print(f"  mismatches vs sjoin:  {mismatches}")
+        
+        if mismatches:
+            raise SystemExit(f"Grid index disagrees with sjoin on {mismatches} points")
+    
+    print("=" * 78)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""Check the vectorized feature kernels against per-row references and profile the feature stage"""
+import sys
+import math
+import time
+import pstats
+import argparse
+import cProfile
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import pandas as pd
+from scipy.spatial.distance import cdist
+from src.features import kernels
+from src.features.behavior_features import BehaviorFeatureExtractor
+from src.features.transmission_features import TransmissionFeatureExtractor
+from src.features.extract_features import extract_shard
+from src.features.spatiotemporal_features import SpatioTemporalFeatureExtractor
+from src.utils.config_loader import load_config
+
+
+def generate_fleet(n_vessels, n_points, seed=42):
+    """Sorted random-walk tracks with transmission gaps and missing headings"""
+    rng = np.random.default_rng(seed)
+    n_rows = n_vessels * n_points
+    gaps = np.where(rng.random((n_vessels, n_points)) < 0.05,
+                    rng.uniform(60, 300, (n_vessels, n_points)),
+                    rng.choice([2.0, 5.0, 10.0, 15.0], (n_vessels, n_points))).cumsum(axis=1)
+    heading = rng.uniform(0, 360, n_rows)
+    heading[rng.random(n_rows) < 0.05] = np.nan
+    return pd.DataFrame({
+        'MMSI': np.repeat(400000000 + np.arange(1, n_vessels + 1), n_points),
+        'timestamp': pd.Timestamp('2024-01-01') + pd.to_timedelta(gaps.ravel(), unit='min'),
+        'lat': np.repeat(rng.uniform(6, 22, n_vessels), n_points) + rng.normal(0, 0.01, n_rows).cumsum(),
+        'lon': np.repeat(rng.uniform(68, 88, n_vessels), n_points) + rng.normal(0, 0.01, n_rows).cumsum(),
+        'SOG': rng.uniform(0, 12, n_rows),
+        'COG': rng.uniform(0, 360, n_rows),
+        'heading': heading
+    })
+
+
+# Per-row references (the code the kernels replace)
+
+def reference_wrap(diff):
+    return pd.Series(diff).apply(lambda x: min(x, 360 - x) if pd.notna(x) else x).to_numpy()
+
+
+def reference_disappeared(time_gap, max_gap_minutes):
+    group = pd.DataFrame({'time_gap': time_gap})
+    group['disappeared'] = 0
+    for i in range(1, len(group)):
+        if group['time_gap'].iloc[i] > max_gap_minutes * 2:
+            group.loc[group.index[i], 'disappeared'] = 1
+    return group['disappeared'].to_numpy()
+
+
+def reference_haversine(lat1, lon1, lat2, lon2):
+    if any(math.isnan(v) for v in (lat1, lon1, lat2, lon2)):
+        return math.nan
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371 * math.asin(math.sqrt(a))
+
+
+def reference_proximity(df):
+    features = []
+    for _, time_group in df.groupby('timestamp'):
+        if len(time_group) < 2:
+            for idx in time_group.index:
+                features.append({'index': idx, 'nearby_vessels': 0,
+                                 'min_vessel_distance': np.inf, 'avg_vessel_distance': np.inf})
+            continue
+        coords = time_group[['lat', 'lon']].values
+        distances = cdist(coords, coords)
+        np.fill_diagonal(distances, np.inf)
+        for i, idx in enumerate(time_group.index):
+            d = distances[i]
+            nearby = (d < 0.1).sum()
+            min_dist = d.min()
+            avg_dist = d[d < np.inf].mean() if nearby > 0 else np.inf
+            features.append({'index': idx, 'nearby_vessels': nearby,
+                             'min_vessel_distance': min_dist if min_dist != np.inf else 999,
+                             'avg_vessel_distance': avg_dist if avg_dist != np.inf else 999})
+    return pd.DataFrame(features).set_index('index')
+
+
+def same(a, b):
+    return np.allclose(np.asarray(a, dtype=float), np.asarray(b, dtype=float), rtol=1e-12, atol=1e-12, equal_nan=True)
+
+
+def check_kernels(df, config):
+    """Kernel outputs against the per-row code they replace"""
+    max_gap = TransmissionFeatureExtractor(config).max_gap_minutes
+    starts = kernels.track_starts(df['MMSI'].to_numpy())
+    vessels = df.groupby('MMSI', sort=False)
+    cog_diff = vessels['COG'].diff().abs()
+    time_gap = vessels['timestamp'].diff().dt.total_seconds() / 60
+    prev_lat, prev_lon = vessels['lat'].shift(1), vessels['lon'].shift(1)
+    
+    checks = {
+        'angle_diff': same(kernels.angle_diff(df['heading'], df['COG']),
+                           reference_wrap((df['heading'] - df['COG']).abs())),
+        'course_change': same(kernels.course_change(df['COG'], starts), reference_wrap(cog_diff)),
+        'time_gaps_minutes': same(kernels.time_gaps_minutes(df['timestamp'].to_numpy(), starts), time_gap),
+        'track_diff': same(kernels.track_diff(df['lat'], starts), vessels['lat'].diff()),
+        'gap_flags': same(kernels.gap_flags(time_gap, max_gap * 2),
+                          np.concatenate([reference_disappeared(g.to_numpy(), max_gap)
+                                          for _, g in time_gap.groupby(df['MMSI'], sort=False)])),
+        'step_distances_km': np.allclose(
+            kernels.step_distances_km(df['lat'], df['lon'], starts),
+            [reference_haversine(*row) for row in zip(prev_lat, prev_lon, df['lat'], df['lon'])],
+            rtol=1e-9, atol=1e-9, equal_nan=True
+        )
+    }
+    return checks
+
+
+def check_extractors(df, config):
+    """Per-vessel extractors, the fused pass and exact-timestamp proximity"""
+    legacy = TransmissionFeatureExtractor(config).extract_features(
+        BehaviorFeatureExtractor(config).extract_features(df)
+    ).sort_index()
+    fused = extract_shard(config, df).sort_index()
+    columns = [col for col in legacy.columns if col not in df.columns]
+    fused_ok = all(same(legacy[col], fused[col]) for col in columns)
+    
+    # Streamed part files: each chunk sorted by (MMSI, timestamp), concatenated with
+    # compact uint32 MMSIs as StageStore loads them; the frame must still be re-sorted
+    later = df['timestamp'] > df['timestamp'].median()
+    chunked = pd.concat([df[~later].sort_values(['MMSI', 'timestamp']),
+                         df[later].sort_values(['MMSI', 'timestamp'])]).astype({'MMSI': 'uint32'})
+    unsorted = extract_shard(config, chunked).sort_index()
+    unsorted_ok = all(same(fused[col], unsorted[col]) for col in columns)
+    
+    sample = df.head(3000)
+    expected = reference_proximity(sample).sort_index()
+    result = SpatioTemporalFeatureExtractor(config)._exact_timestamp_proximity(sample).sort_index()
+    proximity_ok = expected.index.equals(result.index) and all(
+        same(expected[col], result[col]) for col in expected.columns
+    )
+    return {
+        'per-vessel vs fused extractors': fused_ok,
+        'fused on chunked uint32 frame': unsorted_ok,
+        'exact-timestamp proximity': proximity_ok
+    }
+
+
+def call_counts(func, df):
+    """Python-level function call counts of ``func(df)`` (C builtins excluded)"""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    func(df)
+    profiler.disable()
+    stats = pstats.Stats(profiler)
+    return {
+        f"{Path(filename).name}:{line}({name})": ncalls
+        for (filename, line, name), (_, ncalls, _, _, _) in stats.stats.items()
+        if not filename.startswith('~')
+    }
+
+
+def per_row_frames(func, n_vessels, n_points):
+    """Functions whose call count grows with track length at a fixed fleet size
+    
+    Profiles the same fleet with ``n_points`` and ``2 * n_points`` reports
+    per vessel: per-vessel overhead stays constant, per-row Python doubles.
+    """
+    short = call_counts(func, generate_fleet(n_vessels, n_points))
+    long = call_counts(func, generate_fleet(n_vessels, 2 * n_points))
+    rows = [(calls, name) for name, calls in long.items()
+            if calls >= n_vessels * n_points and calls >= 1.8 * short.get(name, 0)]
+    return sorted(rows, reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Feature kernel checks and profile')
+    parser.add_argument('--vessels', type=int, default=200)
+    parser.add_argument('--points', type=int, default=500, help='Points per vessel')
+    args = parser.parse_args()
+    
+    config = load_config()
+    df = generate_fleet(args.vessels, args.points)
+    
+    print("=" * 78)
+    print(f"FEATURE KERNELS - {args.vessels} vessels x {args.points} points ({len(df):,} rows)")
+    print("=" * 78)
+    
+    results = {**check_kernels(df.head(20000), config), **check_extractors(df.head(20000), config)}
+    for name, ok in results.items():
+        print(f"  {name:<32} {'ok' if ok else 'MISMATCH'}")
+    if not all(results.values()):
+        raise SystemExit("Vectorized kernels disagree with the per-row references")
+    
+    # Old per-row hot spots against their kernels on the full frame
+    max_gap = TransmissionFeatureExtractor(config).max_gap_minutes
+    time_gap = kernels.time_gaps_minutes(df['timestamp'].to_numpy(), kernels.track_starts(df['MMSI'].to_numpy()))
+    start = time.perf_counter()
+    reference_wrap(np.abs(df['heading'] - df['COG']))
+    for _, g in pd.Series(time_gap).groupby(df['MMSI'].to_numpy(), sort=False):
+        reference_disappeared(g.to_numpy(), max_gap)
+    reference_time = time.perf_counter() - start
+    start = time.perf_counter()
+    kernels.angle_diff(df['heading'], df['COG'])
+    kernels.gap_flags(time_gap, max_gap * 2)
+    kernel_time = time.perf_counter() - start
+    print("-" * 78)
+    print(f"heading deviation + disappearance: per-row {reference_time:.2f} s, "
+          f"kernels {kernel_time * 1000:.1f} ms ({reference_time / kernel_time:,.0f}x)")
+    
+    # Profile of the feature stage: no Python function should run per row
+    print("-" * 78)
+    stages = [
+        ('fused pass', lambda frame: extract_shard(config, frame)),
+        ('per-vessel extractors', lambda frame: TransmissionFeatureExtractor(config).extract_features(
+            BehaviorFeatureExtractor(config).extract_features(frame)))
+    ]
+    n_points = max(args.points // 4, 20)
+    for label, func in stages:
+        hot = per_row_frames(func, args.vessels, n_points)
+        print(f"{label}: {len(hot)} Python functions called per row")
+        for calls, name in hot[:5]:
+            print(f"    {calls:>10,} calls  {name}")
+    
+    # The replaced lambda and loop, profiled the same way
+    reference = lambda frame: (reference_wrap(np.abs(frame['heading'] - frame['COG'])),
+                               reference_disappeared(frame['SOG'].to_numpy() * 60, max_gap))
+    hot = per_row_frames(reference, args.vessels, n_points)
+    print(f"replaced per-row code (reference): {len(hot)} Python functions called per row, e.g. "
+          f"{hot[0][1] if hot else '-'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Compare the numba and NumPy backends of the trajectory kernels (parity and timings)"""
+import sys
+import time
+import argparse
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+from src.features import kernels
+from src.features.fused_features import FusedFeatureExtractor
+from src.utils.config_loader import load_config
+from benchmark_feature_kernels import generate_fleet
+
+
+def timed(func, repeat=3):
+    """Best wall time of ``repeat`` runs and the last result"""
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def close(a, b):
+    return np.allclose(np.asarray(a, dtype=float), np.asarray(b, dtype=float), rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+def kernel_cases(df, window):
+    """(name, callable taking a backend, comparison) for every dual-backend kernel"""
+    lat = df['lat'].to_numpy(dtype=float)
+    lon = df['lon'].to_numpy(dtype=float)
+    starts = kernels.track_starts(df['MMSI'].to_numpy())
+    gaps = kernels.time_gaps_minutes(df['timestamp'].to_numpy(), starts)
+    sample = slice(0, 2000)
+    return [
+        ('step haversine', lambda b: kernels.step_distances_km(lat, lon, starts, backend=b), close),
+        ('pairwise haversine (2k x 2k)',
+         lambda b: kernels.pairwise_haversine_km(lat[sample], lon[sample], backend=b), close),
+        ('window radius counts',
+         lambda b: kernels.window_radius_counts(lat, lon, window + 1, 5.0, backend=b),
+         lambda x, y: np.array_equal(x, y)),
+        ('path length / efficiency',
+         lambda b: np.column_stack(kernels.path_stats(lat, lon, starts, backend=b)), close),
+        ('rolling SOG stats',
+         lambda b: np.column_stack(list(kernels.rolling_track_stats(
+             df['SOG'].to_numpy(dtype=float), starts, window, backend=b).values())), close),
+        ('rolling gap stats',
+         lambda b: np.column_stack(list(kernels.rolling_track_stats(gaps, starts, 20, backend=b).values())), close)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='numba vs NumPy kernel backends')
+    parser.add_argument('--vessels', type=int, default=200)
+    parser.add_argument('--points', type=int, default=2000, help='Points per vessel')
+    args = parser.parse_args()
+    
+    config = load_config()
+    df = generate_fleet(args.vessels, args.points)
+    window = config.get('features', 'behavior', 'speed_window', default=10)
+    
+    print("=" * 78)
+    print(f"KERNEL BACKENDS - {args.vessels} vessels x {args.points} points ({len(df):,} rows)")
+    print("=" * 78)
+    if kernels.numba is None:
+        print("numba is not installed: only the NumPy backend is available")
+        return
+    
+    # Compile outside the timings
+    for _, func, _ in kernel_cases(df.head(100), window):
+        func('numba')
+    
+    mismatches = []
+    print(f"{'kernel':<30} {'numpy (ms)':>11} {'numba (ms)':>11} {'speed-up':>9}  parity")
+    for name, func, compare in kernel_cases(df, window):
+        numpy_time, expected = timed(lambda: func('numpy'))
+        numba_time, result = timed(lambda: func('numba'))
+        ok = compare(expected, result)
+        if not ok:
+            mismatches.append(name)
+        print(f"{name:<30} {numpy_time * 1000:>11.1f} {numba_time * 1000:>11.1f} "
+              f"{numpy_time / numba_time:>8.1f}x  {'ok' if ok else 'MISMATCH'}")
+    
+    # Whole fused feature pass with each backend
+    print("-" * 78)
+    frames = {}
+    for backend in kernels.BACKENDS:
+        extractor = FusedFeatureExtractor(config)
+        extractor.kernel_backend = extractor.behavior.kernel_backend = backend
+        elapsed, frames[backend] = timed(lambda: extractor.extract_features(df), repeat=1)
+        print(f"fused feature pass, {backend:<6} backend: {elapsed:.2f} s")
+    columns = [col for col in frames['numpy'].columns if col not in df.columns]
+    if not all(close(frames['numpy'][col], frames['numba'][col]) for col in columns):
+        mismatches.append('fused feature pass')
+    
+    if mismatches:
+        raise SystemExit(f"Backends disagree: {', '.join(mismatches)}")
+    print("All kernels agree between backends")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Benchmark vectorized loitering detection against the per-row reference loop"""
+import sys
+import time
+import argparse
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import pandas as pd
+from src.features.behavior_features import BehaviorFeatureExtractor
+from src.utils.config_loader import load_config
+
+
+def generate_track(n_points, seed=42):
+    """Generate a single vessel track alternating transit and loitering legs"""
+    rng = np.random.default_rng(seed)
+    
+    # Legs of 50-500 points, half of them near-stationary
+    step_deg = np.empty(n_points)
+    pos = 0
+    loitering = False
+    while pos < n_points:
+        leg = rng.integers(50, 500)
+        step_deg[pos:pos + leg] = 0.002 if loitering else 0.05
+        pos += leg
+        loitering = not loitering
+    
+    lat = 15.0 + np.cumsum(rng.uniform(-1, 1, n_points) * step_deg)
+    lon = 75.0 + np.cumsum(rng.uniform(-1, 1, n_points) * step_deg)
+    gaps = rng.uniform(5, 30, n_points)  # minutes
+    timestamps = pd.Timestamp('2024-01-01') + pd.to_timedelta(np.cumsum(gaps), unit='min')
+    
+    return pd.DataFrame({
+        'MMSI': 400000001,
+        'timestamp': timestamps,
+        'lat': lat,
+        'lon': lon
+    })
+
+
+def reference_loitering(extractor, group):
+    """Original per-row loitering loop, kept as the parity reference"""
+    loitering_flags = []
+    
+    for i in range(len(group)):
+        if i < extractor.speed_window:
+            loitering_flags.append(0)
+            continue
+        
+        window = group.iloc[max(0, i-extractor.speed_window):i+1]
+        
+        distances = extractor.calculate_distance(
+            window['lat'].iloc[-1], window['lon'].iloc[-1],
+            window['lat'].values, window['lon'].values
+        )
+        
+        within_radius = (distances <= extractor.loitering_radius).sum()
+        time_span = (window['timestamp'].iloc[-1] - window['timestamp'].iloc[0]).total_seconds() / 3600
+        
+        if within_radius >= len(window) * 0.8 and time_span >= extractor.loitering_time:
+            loitering_flags.append(1)
+        else:
+            loitering_flags.append(0)
+    
+    return np.array(loitering_flags)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Loitering detection benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                       help='Track lengths (points per vessel) to benchmark')
+    parser.add_argument('--reference-max-points', type=int, default=20_000,
+                       help='Run the per-row reference on at most this many points '
+                            'and extrapolate linearly beyond it')
+    args = parser.parse_args()
+    
+    config = load_config()
+    extractor = BehaviorFeatureExtractor(config)
+    
+    print("=" * 78)
+    print("LOITERING DETECTION BENCHMARK")
+    print("=" * 78)
+    print(f"{'points':>10} {'vectorized (s)':>15} {'reference (s)':>15} {'speedup':>9} {'flags':>8} {'parity':>7}")
+    print("-" * 78)
+    
+    for n_points in args.sizes:
+        track = generate_track(n_points)
+        
+        start = time.perf_counter()
+        flags = extractor.detect_loitering(track.copy())['loitering'].to_numpy()
+        vectorized_time = time.perf_counter() - start
+        
+        # Reference loop on a prefix; the loop is linear in track length
+        n_ref = min(n_points, args.reference_max_points)
+        prefix = track.iloc[:n_ref]
+        start = time.perf_counter()
+        ref_flags = reference_loitering(extractor, prefix)
+        reference_time = (time.perf_counter() - start) * n_points / n_ref
+        
+        parity = np.array_equal(flags[:n_ref], ref_flags)
+        estimated = '*' if n_ref < n_points else ' '
+        print(f"{n_points:>10,} {vectorized_time:>15.3f} {reference_time:>14.2f}{estimated} "
+              f"{reference_time / vectorized_time:>8.0f}x {int(flags.sum()):>8,} {str(parity):>7}")
+        
+        if not parity:
+            raise SystemExit(f"Parity check failed at {n_points} points")
+    
+    print("-" * 78)
+    print("* reference time extrapolated from the first "
+          f"{args.reference_max_points:,} points")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Scaling benchmark for MMSI-sharded parallel feature extraction"""
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import pandas as pd
+from src.features.extract_features import extract_all_features
+from src.features.spatiotemporal_features import SpatioTemporalFeatureExtractor
+from src.utils.config_loader import load_config
+
+
+def generate_fleet(n_vessels, n_points, seed=42):
+    """Generate random-walk tracks for a fleet of vessels"""
+    rng = np.random.default_rng(seed)
+    n_rows = n_vessels * n_points
+    
+    mmsi = np.repeat(400000000 + np.arange(1, n_vessels + 1), n_points)
+    start_lat = np.repeat(rng.uniform(6, 22, n_vessels), n_points)
+    start_lon = np.repeat(rng.uniform(68, 88, n_vessels), n_points)
+    steps = rng.uniform(-0.01, 0.01, (2, n_vessels, n_points)).cumsum(axis=2)
+    gaps = rng.uniform(5, 15, (n_vessels, n_points)).cumsum(axis=1).ravel()
+    
+    df = pd.DataFrame({
+        'MMSI': mmsi,
+        'timestamp': pd.Timestamp('2024-01-01') + pd.to_timedelta(gaps, unit='min'),
+        'lat': start_lat + steps[0].ravel(),
+        'lon': start_lon + steps[1].ravel(),
+        'SOG': rng.uniform(0, 12, n_rows),
+        'COG': rng.uniform(0, 360, n_rows),
+        'heading': rng.uniform(0, 360, n_rows)
+    })
+    
+    # Interleave vessels the way a raw AIS feed would
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def time_call(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parallel feature extraction scaling benchmark')
+    parser.add_argument('--vessels', type=int, default=2000)
+    parser.add_argument('--points', type=int, default=200, help='Points per vessel')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    
+    config = load_config()
+    df = generate_fleet(args.vessels, args.points)
+    spatiotemporal = SpatioTemporalFeatureExtractor(config)
+    
+    worker_counts = [1]
+    while worker_counts[-1] * 2 <= args.max_workers:
+        worker_counts.append(worker_counts[-1] * 2)
+    if worker_counts[-1] != args.max_workers:
+        worker_counts.append(args.max_workers)
+    
+    print("=" * 78)
+    print(f"PARALLEL FEATURE EXTRACTION - {args.vessels:,} vessels x {args.points} points "
+          f"({len(df):,} rows)")
+    print("=" * 78)
+    print(f"{'workers':>8} {'basic (s)':>11} {'speedup':>8} {'vessel-level (s)':>17} {'speedup':>8} {'identical':>10}")
+    print("-" * 78)
+    
+    baseline = None
+    for n_workers in worker_counts:
+        basic, basic_time = time_call(extract_all_features, df, config, n_workers=n_workers)
+        vessel, vessel_time = time_call(spatiotemporal.extract_vessel_features, basic, n_workers=n_workers)
+        
+        if baseline is None:
+            baseline = (basic, basic_time, vessel, vessel_time)
+        identical = baseline[0].equals(basic) and baseline[2].equals(vessel)
+        
+        print(f"{n_workers:>8} {basic_time:>11.2f} {baseline[1] / basic_time:>7.1f}x "
+              f"{vessel_time:>17.2f} {baseline[3] / vessel_time:>7.1f}x {str(identical):>10}")
+    
+    print("-" * 78)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Compare sequential and concurrent provider fetching against the stub AIS server"""
+import sys
+import time
+import argparse
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import pandas as pd
+from scripts.stub_ais_server import StubAISServer
+from src.data.ais_api_integration import (
+    AISDataManager, AISHubProvider, VesselFinderProvider, MarineTrafficProvider
+)
+
+
+def build_manager(server, timeout):
+    """Manager whose HTTP providers all point at the stub server"""
+    urls = server.base_urls()
+    options = {'timeout': timeout, 'pool_size': 4}
+    providers = [
+        {'name': 'AISHub', 'provider': AISHubProvider(base_url=urls['aishub'], **options),
+         'priority': 1, 'free': True},
+        {'name': 'VesselFinder', 'provider': VesselFinderProvider('stub', base_url=urls['vesselfinder'], **options),
+         'priority': 2, 'free': False},
+        {'name': 'MarineTraffic', 'provider': MarineTrafficProvider('stub', base_url=urls['marinetraffic'], **options),
+         'priority': 3, 'free': False}
+    ]
+    return AISDataManager(providers=providers)
+
+
+class DrainingProvider:
+    """Stand-in for a stream buffer: each fetch returns the reports queued since the last one"""
+    
+    drains = True
+    
+    def __init__(self, delay):
+        self.delay = delay
+        self.next_mmsi = 400000000
+        self.delivered = []
+    
+    def fetch_data(self, bbox=None, time_range=None):
+        time.sleep(self.delay)
+        mmsi = list(range(self.next_mmsi, self.next_mmsi + 5))
+        self.next_mmsi += 5
+        self.delivered.extend(mmsi)
+        return pd.DataFrame({'MMSI': mmsi, 'timestamp': pd.Timestamp.now(), 'lat': 15.0, 'lon': 75.0,
+                             'SOG': 5.0, 'COG': 90.0})
+    
+    def close(self):
+        pass
+
+
+def check_draining(cycles):
+    """In 'first' mode a slower stream provider's drained reports still reach every result"""
+    stream = DrainingProvider(delay=0.5)
+    with StubAISServer(behaviour={'vesselfinder': {'delay': 0.1}}) as server:
+        manager = build_manager(server, timeout=2)
+        manager.providers.append({'name': 'AISStream', 'provider': stream, 'priority': 0, 'free': True})
+        seen = []
+        for _ in range(cycles):
+            df = manager.fetch_live_data(mode='first')
+            seen.extend(df.loc[df['data_source'] == 'AISStream', 'MMSI'])
+        manager.close()
+    assert seen == stream.delivered, (len(seen), len(stream.delivered))
+    print(f"Draining provider in 'first' mode: {len(seen)}/{len(stream.delivered)} drained reports returned")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Provider fan-out benchmark')
+    parser.add_argument('--cycles', type=int, default=5)
+    parser.add_argument('--slow-delay', type=float, default=1.5,
+                       help='Response delay of the failing primary provider (seconds)')
+    args = parser.parse_args()
+    
+    # Primary provider is slow and then fails, the others answer quickly
+    behaviour = {
+        'aishub': {'delay': args.slow_delay, 'fail': True},
+        'vesselfinder': {'delay': 0.2},
+        'marinetraffic': {'delay': 0.4}
+    }
+    
+    print("=" * 78)
+    print(f"PROVIDER FAN-OUT - {args.cycles} fetch cycles, failing primary after {args.slow_delay}s")
+    print("=" * 78)
+    print(f"{'mode':<12} {'cycle (s)':>10} {'records':>8} {'source':>28} {'conns':>6} {'reqs':>5}")
+    print("-" * 78)
+    
+    for mode in AISDataManager.FETCH_MODES:
+        with StubAISServer(behaviour=behaviour) as server:
+            manager = build_manager(server, timeout=args.slow_delay * 4)
+            
+            start = time.perf_counter()
+            for _ in range(args.cycles):
+                df = manager.fetch_live_data(mode=mode)
+            cycle_time = (time.perf_counter() - start) / args.cycles
+            
+            # Let background requests of 'first' mode finish before reading counters
+            time.sleep(args.slow_delay + 0.5)
+            sources = ','.join(sorted(df['data_source'].unique())) if not df.empty else '-'
+            print(f"{mode:<12} {cycle_time:>10.2f} {len(df):>8} {sources:>28} "
+                  f"{server.connections:>6} {sum(server.requests.values()):>5}")
+            
+            histograms = manager.latency_histograms()
+            manager.close()
+        
+        for name, snapshot in histograms.items():
+            print(f"    {name:<14} n={snapshot['count']:<3} fail={snapshot['failures']:<3} "
+                  f"mean={snapshot['mean_seconds']:.3f}s p95<={snapshot['p95_seconds']:.3f}s")
+    
+    print("-" * 78)
+    print("conns = TCP connections opened; keep-alive sessions reuse them unless requests overlap")
+    check_draining(args.cycles)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Benchmark the time-bucketed proximity index against exact-timestamp cdist"""
+import sys
+import time
+import argparse
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import pandas as pd
+from src.features.proximity import VesselProximityIndex, NO_NEIGHBOR_DISTANCE
+from src.features.spatiotemporal_features import SpatioTemporalFeatureExtractor
+from src.utils.config_loader import load_config
+
+
+def concurrent_fleet(n_vessels, n_steps=1, jitter_minutes=0.0, seed=42):
+    """Vessels spread over the Indian EEZ box reporting at n_steps 10-minute steps"""
+    rng = np.random.default_rng(seed)
+    lat = rng.uniform(6, 22, n_vessels)
+    lon = rng.uniform(68, 88, n_vessels)
+    frames = []
+    for step in range(n_steps):
+        offsets = step * 10 + rng.uniform(0, jitter_minutes, n_vessels)
+        frames.append(pd.DataFrame({
+            'MMSI': 400000000 + np.arange(n_vessels),
+            'timestamp': pd.Timestamp('2024-01-01') + pd.to_timedelta(offsets, unit='min'),
+            'lat': lat + rng.normal(0, 0.01, n_vessels),
+            'lon': lon + rng.normal(0, 0.01, n_vessels)
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def brute_force(df, index):
+    """Reference proximity features by full pairwise haversine per bucket"""
+    result = pd.DataFrame(index=df.index, columns=['nearby_vessels', 'min_vessel_distance',
+                                                   'avg_vessel_distance'], dtype=float)
+    bucket = df['timestamp'].to_numpy(dtype='datetime64[ns]').view('int64') // index.time_bucket.value
+    for _, group in df.groupby(bucket):
+        latest = group.sort_values('timestamp', kind='stable').groupby('MMSI').tail(1)
+        lat1 = np.radians(group['lat'].to_numpy())[:, None]
+        lon1 = np.radians(group['lon'].to_numpy())[:, None]
+        lat2 = np.radians(latest['lat'].to_numpy())[None, :]
+        lon2 = np.radians(latest['lon'].to_numpy())[None, :]
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        distance = 2 * 6371 * np.arcsin(np.sqrt(a))
+        distance[group['MMSI'].to_numpy()[:, None] == latest['MMSI'].to_numpy()[None, :]] = np.inf
+        
+        within = distance <= index.radius_km
+        nearby = within.sum(axis=1)
+        avg = np.where(nearby > 0, np.where(within, distance, 0).sum(axis=1) / np.maximum(nearby, 1),
+                       NO_NEIGHBOR_DISTANCE)
+        closest = distance.min(axis=1)
+        result.loc[group.index] = np.column_stack([
+            nearby, np.where(np.isfinite(closest), closest, NO_NEIGHBOR_DISTANCE), avg
+        ])
+    return result
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Proximity feature benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 20000, 50000],
+                       help='Concurrent vessels at one time step')
+    parser.add_argument('--exact-max', type=int, default=5000,
+                       help='Largest size run through the exact-timestamp cdist (quadratic memory)')
+    parser.add_argument('--steps', type=int, default=12, help='Time steps for the multi-bucket run')
+    args = parser.parse_args()
+    
+    config = load_config()
+    index = VesselProximityIndex(config)
+    extractor = SpatioTemporalFeatureExtractor(config)
+    
+    print("=" * 78)
+    print(f"VESSEL PROXIMITY - radius {index.radius_km} km, {index.time_bucket.total_seconds() / 60:g}-minute buckets")
+    print("=" * 78)
+    
+    # Correctness of the index against brute-force haversine
+    sample = concurrent_fleet(1500, n_steps=4, jitter_minutes=9)
+    expected = brute_force(sample, index)
+    result = index.features(sample)
+    matches = np.allclose(result.to_numpy(dtype=float), expected.to_numpy(dtype=float), rtol=1e-6, atol=1e-6)
+    print(f"index vs brute-force haversine ({len(sample):,} reports): {'identical' if matches else 'MISMATCH'}")
+    if not matches:
+        raise SystemExit("Proximity index disagrees with brute force")
+    
+    print("-" * 78)
+    print(f"{'vessels':>8} {'exact cdist (s)':>16} {'index (s)':>10} {'speedup':>8}")
+    exact_ref = None
+    for n in args.sizes:
+        df = concurrent_fleet(n)
+        _, index_time = timed(index.features, df)
+        if n <= args.exact_max:
+            _, exact_time = timed(extractor._exact_timestamp_proximity, df)
+            exact_ref = (n, exact_time)
+            exact = f"{exact_time:>16.2f}"
+        elif exact_ref is not None:
+            exact_time = exact_ref[1] * (n / exact_ref[0]) ** 2
+            exact = f"{'~' + format(exact_time, '.1f'):>16}"
+        else:
+            exact_time, exact = None, f"{'-':>16}"
+        speedup = f"{exact_time / index_time:>7.0f}x" if exact_time else f"{'-':>8}"
+        print(f"{n:>8,} {exact} {index_time:>10.3f} {speedup}")
+    
+    # Jittered report times: exact-timestamp grouping finds no neighbors at all
+    df = concurrent_fleet(max(args.sizes), n_steps=args.steps, jitter_minutes=9)
+    features, elapsed = timed(index.features, df)
+    print("-" * 78)
+    print(f"{max(args.sizes):,} vessels x {args.steps} steps with jittered times ({len(df):,} reports): "
+          f"{elapsed:.2f} s, mean nearby {features['nearby_vessels'].mean():.2f}")
+    print("(~ = extrapolated quadratically from the largest exact run)")
+
+
+if __name__ == "__main__":
+    main()
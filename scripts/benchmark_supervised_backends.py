@@ -0,0 +1,132 @@
+"""Fit time, predict latency, model size and ROC-AUC of the supervised tree model backends"""
+import io
+import sys
+import time
+import logging
+import argparse
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.datasets import make_classification
+from sklearn.metrics import roc_auc_score
+from src.models.supervised_models import SupervisedAnomalyDetector, SUPERVISED_BACKENDS, lightgbm
+from src.models.train import create_synthetic_labels
+from src.utils.config_loader import load_config
+from src.utils.storage import StageStore
+
+
+def synthetic_frame(n, n_features=22, missing=0.05, seed=42):
+    """Overlapping classes with label noise and values missing at random, as a feature frame"""
+    X, y = make_classification(n_samples=n, n_features=n_features, n_informative=10, weights=[0.85],
+                               flip_y=0.05, class_sep=1.0, random_state=seed)
+    X[np.random.default_rng(seed).random(X.shape) < missing] = np.nan
+    df = pd.DataFrame(X, columns=[f"f{i}" for i in range(n_features)])
+    df['anomaly'] = y
+    return df
+
+
+def model_mb(model):
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    return buffer.tell() / 1e6
+
+
+def measure(config, backend, train_df, test_df, repeat=200):
+    """One backend's tree model, through the detector's own data preparation"""
+    detector = SupervisedAnomalyDetector(config)
+    detector.set_backend(backend)
+    
+    start = time.perf_counter()
+    X_train, y_train = detector.prepare_data(train_df)
+    prepare_s = time.perf_counter() - start
+    X_train = detector.scaler.fit_transform(X_train)
+    X_test = detector.scaler.transform(detector.feature_matrix(test_df))
+    y_test = test_df['anomaly'].to_numpy()
+    
+    start = time.perf_counter()
+    model = detector.train_tree_model(X_train, y_train)
+    fit_s = time.perf_counter() - start
+    
+    latencies = []
+    for i in range(repeat):
+        row = X_test[i:i + 1]
+        start = time.perf_counter()
+        model.predict_proba(row)
+        latencies.append(time.perf_counter() - start)
+    
+    start = time.perf_counter()
+    proba = model.predict_proba(X_test)[:, 1]
+    batch_s = time.perf_counter() - start
+    
+    return {
+        'prepare_s': prepare_s,
+        'fit_s': fit_s,
+        'p50_ms': np.percentile(latencies, 50) * 1000,
+        'p99_ms': np.percentile(latencies, 99) * 1000,
+        'batch_rows_s': len(X_test) / batch_s,
+        'mb': model_mb(model),
+        'auc': roc_auc_score(y_test, proba)
+    }
+
+
+def check_native_missing(config, df):
+    """End to end with a native-missing backend: NaN rows score, and at any batch size"""
+    detector = SupervisedAnomalyDetector(config)
+    detector.set_backend('hist_gradient_boosting')
+    detector.train(df)
+    X = detector.feature_matrix(df.head(500))
+    assert X.isna().any().any(), "test rows should include missing values"
+    batch = detector.predict(X)
+    single = np.array([detector.predict(X.iloc[[i]])[0] for i in range(50)])
+    assert np.isfinite(batch).all()
+    assert np.allclose(batch[:50], single, atol=1e-12)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Supervised backend benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000, 200000])
+    parser.add_argument('--test-rows', type=int, default=10000)
+    parser.add_argument('--source', choices=['synthetic', 'ais'], default='synthetic',
+                        help='ais: ais_all_features with the training labels (run scripts/run_pipeline.py first)')
+    args = parser.parse_args()
+    
+    config = load_config()
+    backends = [b for b in SUPERVISED_BACKENDS if b != 'lightgbm' or lightgbm is not None]
+    logging.disable(logging.WARNING)
+    
+    if args.source == 'ais':
+        source = create_synthetic_labels(StageStore(config).load('ais_all_features').copy(deep=False))
+        test_rows = min(args.test_rows, len(source) // 5)
+        sizes = [len(source) - test_rows]
+    else:
+        source = synthetic_frame(max(args.sizes) + args.test_rows)
+        test_rows, sizes = args.test_rows, args.sizes
+    test_df = source.iloc[-test_rows:]
+    
+    print("=" * 104)
+    print(f"SUPERVISED BACKENDS - {args.source}: {test_rows:,} test rows, "
+          f"{source.drop(columns='anomaly').isna().mean().mean():.1%} of values missing")
+    print("=" * 104)
+    print(f"{'rows':>8}  {'backend':<24}{'prepare s':>10}{'fit s':>9}{'p50 ms':>9}{'p99 ms':>9}"
+          f"{'batch rows/s':>14}{'size MB':>9}{'ROC-AUC':>9}")
+    for n in sizes:
+        train_df = source.iloc[:n]
+        for backend in backends:
+            r = measure(config, backend, train_df, test_df)
+            print(f"{n:>8,}  {backend:<24}{r['prepare_s']:>10.3f}{r['fit_s']:>9.2f}{r['p50_ms']:>9.2f}"
+                  f"{r['p99_ms']:>9.2f}{r['batch_rows_s']:>14,.0f}{r['mb']:>9.2f}{r['auc']:>9.4f}")
+        print("-" * 104)
+    if lightgbm is None:
+        print("lightgbm not installed: skipped")
+    
+    check_native_missing(config, source.iloc[:min(sizes[0], 20000)])
+    logging.disable(logging.NOTSET)
+    print("Native missing values: hist_gradient_boosting trains and scores NaN rows, "
+          "same scores per row and in a batch")
+
+
+if __name__ == '__main__':
+    main()
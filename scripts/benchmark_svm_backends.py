@@ -0,0 +1,139 @@
+"""Training time, inference latency and ROC-AUC of the SVM backends at several training sizes"""
+import sys
+import time
+import logging
+import argparse
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+from sklearn.datasets import make_classification
+from sklearn.metrics import roc_auc_score
+from src.models.supervised_models import SupervisedAnomalyDetector
+from src.models.train import create_synthetic_labels
+from src.utils.config_loader import load_config
+from src.utils.storage import StageStore
+
+# (backend, classifier)
+BACKENDS = [
+    ('svc', None),
+    ('nystroem', 'sgd'),
+    ('nystroem', 'linear_svc'),
+    ('rbf_sampler', 'sgd'),
+    ('linear', 'linear_svc')
+]
+
+
+def synthetic_source(n_features=22, seed=42):
+    """Overlapping classes with 5% label noise: support vectors grow with the training size"""
+    X, y = make_classification(n_samples=400000, n_features=n_features, n_informative=10, weights=[0.85],
+                               flip_y=0.05, class_sep=1.0, random_state=seed)
+    return (X - X.mean(axis=0)) / X.std(axis=0), y
+
+
+def ais_source(config):
+    """Scaled ais_all_features rows with the training pipeline's threshold labels (nearly separable)"""
+    df = create_synthetic_labels(StageStore(config).load('ais_all_features').copy(deep=False))
+    detector = SupervisedAnomalyDetector(config)
+    X, y = detector.prepare_data(df)
+    return detector.scaler.fit_transform(X), y.to_numpy()
+
+
+def resample(X, y, n, rng, jitter=0.0):
+    """``n`` rows drawn from the source set, with optional Gaussian jitter"""
+    idx = rng.choice(len(X), n, replace=n > len(X))
+    return X[idx] + rng.normal(0, jitter, (n, X.shape[1])) * (jitter > 0), y[idx]
+
+
+def model_size(model):
+    """Support vectors for SVC, feature-map components otherwise"""
+    if hasattr(model, 'support_vectors_'):
+        return f"{len(model.support_vectors_)} SVs"
+    pipeline = model.calibrated_classifiers_[0].estimator
+    pipeline = getattr(pipeline, 'estimator', pipeline)  # unwrap FrozenEstimator
+    return f"{getattr(pipeline[0], 'n_components', 0)} comps" if len(pipeline) > 1 else "linear"
+
+
+def measure(config, X_train, y_train, X_test, y_test, backend, classifier, repeat=200):
+    config.config['models']['svm']['backend'] = backend
+    if classifier:
+        config.config['models']['svm']['classifier'] = classifier
+    detector = SupervisedAnomalyDetector(config)
+    
+    start = time.perf_counter()
+    model = detector.train_svm(X_train, y_train)
+    fit_s = time.perf_counter() - start
+    
+    latencies = []
+    for i in range(repeat):
+        row = X_test[i:i + 1]
+        start = time.perf_counter()
+        model.predict_proba(row)
+        latencies.append(time.perf_counter() - start)
+    
+    start = time.perf_counter()
+    proba = model.predict_proba(X_test)[:, 1]
+    batch_s = time.perf_counter() - start
+    
+    return {
+        'fit_s': fit_s,
+        'p50_ms': np.percentile(latencies, 50) * 1000,
+        'p99_ms': np.percentile(latencies, 99) * 1000,
+        'batch_rows_s': len(X_test) / batch_s,
+        'auc': roc_auc_score(y_test, proba),
+        'size': model_size(model)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SVM backend benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[2000, 5000, 10000, 20000, 100000])
+    parser.add_argument('--svc-max', type=int, default=20000, help='Largest training size for the exact SVC')
+    parser.add_argument('--test-rows', type=int, default=5000)
+    parser.add_argument('--source', choices=['synthetic', 'ais'], default='synthetic',
+                        help='ais: bootstrap ais_all_features with jitter (run scripts/run_pipeline.py first)')
+    args = parser.parse_args()
+    
+    config = load_config()
+    logging.disable(logging.WARNING)
+    if args.source == 'ais':
+        X_base, y_base = ais_source(config)
+        jitter, source = 0.05, "ais_all_features"
+    else:
+        X_base, y_base = synthetic_source()
+        jitter, source = 0.0, "make_classification"
+    # Test rows come from the end of the source, training rows from the rest
+    X_test, y_test = X_base[-args.test_rows:], y_base[-args.test_rows:]
+    if jitter:
+        X_test, y_test = resample(X_base, y_base, args.test_rows, np.random.default_rng(1), jitter)
+    X_pool, y_pool = X_base[:-args.test_rows], y_base[:-args.test_rows]
+    
+    print("=" * 96)
+    print(f"SVM BACKENDS - {source}: {len(X_base):,} source rows, {X_base.shape[1]} features, "
+          f"{y_base.mean():.1%} positive; {args.test_rows:,} test rows")
+    print("=" * 96)
+    print(f"{'rows':>8}  {'backend':<24}{'fit s':>9}{'p50 ms':>9}{'p99 ms':>9}{'batch rows/s':>14}"
+          f"{'ROC-AUC':>9}  {'size':<12}")
+    
+    for n in args.sizes:
+        X_train, y_train = resample(X_pool, y_pool, n, np.random.default_rng(n), jitter)
+        svc_fit = None
+        for backend, classifier in BACKENDS:
+            if backend == 'svc' and n > args.svc_max:
+                print(f"{n:>8,}  {'svc':<24}{'skipped (> --svc-max)':>27}")
+                continue
+            r = measure(config, X_train, y_train, X_test, y_test, backend, classifier)
+            if backend == 'svc':
+                svc_fit = r['fit_s']
+            name = backend + (f" + {classifier}" if classifier else "")
+            speedup = f" ({svc_fit / r['fit_s']:.0f}x)" if svc_fit and backend != 'svc' else ""
+            print(f"{n:>8,}  {name:<24}{r['fit_s']:>9.2f}{r['p50_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+                  f"{r['batch_rows_s']:>14,.0f}{r['auc']:>9.4f}  {r['size']:<12}{speedup}")
+        print("-" * 96)
+    
+    logging.disable(logging.NOTSET)
+    print("fit s includes calibration: SVC's internal 5-fold Platt scaling, one held-out sigmoid otherwise")
+
+
+if __name__ == '__main__':
+    main()
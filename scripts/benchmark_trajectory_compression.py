@@ -0,0 +1,202 @@
+"""Trajectory compression ratio, feature drift and downstream speedup"""
+import sys
+import time
+import argparse
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import pandas as pd
+from src.preprocessing.clean_ais import AISCleaner
+from src.preprocessing.compress_trajectory import TrajectoryCompressor
+from src.features.extract_features import extract_all_features
+from src.features.fused_features import FusedFeatureExtractor
+from src.features.behavior_features import BehaviorFeatureExtractor
+from src.features.transmission_features import TransmissionFeatureExtractor
+from src.features.spatiotemporal_features import SpatioTemporalFeatureExtractor
+from src.features.kernels import numba, rolling_track_stats, dead_reckoning_keep, track_starts
+from src.utils.config_loader import load_config
+
+# (SOG knots, SOG noise, COG noise per report, seconds between reports)
+PHASES = {
+    'anchored': (0.1, 0.05, 30.0, 180),
+    'transit': (10.0, 0.2, 0.5, 10),
+    'fishing': (3.0, 1.0, 15.0, 30)
+}
+
+
+def generate_fleet(n_vessels, n_points, seed=42):
+    """Tracks alternating between anchorage, steady transit and fishing"""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for v in range(n_vessels):
+        phase_names = rng.choice(list(PHASES), size=n_points // 200 + 1)
+        phase = np.repeat(phase_names, 200)[:n_points]
+        sog0, sog_noise, cog_noise, interval = (np.array([PHASES[p][k] for p in phase]) for k in range(4))
+        
+        # Course holds within a phase, random-walks by the phase's noise
+        cog = (rng.uniform(0, 360) + np.cumsum(rng.normal(0, cog_noise))) % 360
+        sog = np.clip(sog0 + rng.normal(0, sog_noise), 0, None)
+        dt = interval * rng.uniform(0.9, 1.1, n_points)
+        # One 2-hour transmission gap per vessel
+        dt[rng.integers(1, n_points)] += 7200
+        
+        step_km = sog * 1.852 * dt / 3600
+        lat = rng.uniform(6, 20) + np.cumsum(step_km * np.cos(np.radians(cog)) / 111.2)
+        lon = rng.uniform(68, 88) + np.cumsum(step_km * np.sin(np.radians(cog)) / (111.2 * np.cos(np.radians(lat))))
+        frames.append(pd.DataFrame({
+            'MMSI': 400000000 + v + 1,
+            'timestamp': pd.Timestamp('2024-01-01') + pd.to_timedelta(np.cumsum(dt), unit='s'),
+            'lat': lat + rng.normal(0, 0.00005, n_points),
+            'lon': lon + rng.normal(0, 0.00005, n_points),
+            'SOG': sog,
+            'COG': cog,
+            'heading': cog
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def downstream(df, config, repeat=2):
+    """Behavior/transmission and vessel-level spatio-temporal features; returns frames and best seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        features = extract_all_features(df, config, n_workers=1)
+        vessels = SpatioTemporalFeatureExtractor(config).vessel_feature_table(features)
+        timings.append(time.perf_counter() - start)
+    return features, vessels, min(timings)
+
+
+def check_weighted_rolling():
+    """Weighted windows against unweighted ones on unit weights and on repeated rows"""
+    rng = np.random.default_rng(0)
+    values = rng.normal(5, 2, 5000)
+    values[rng.random(5000) < 0.05] = np.nan
+    tracks = np.repeat(np.arange(50), 100)
+    starts = track_starts(tracks)
+    for backend in ['numpy'] + (['numba'] if numba is not None else []):
+        plain = rolling_track_stats(values, starts, 10, backend=backend)
+        weighted = rolling_track_stats(values, starts, 10, backend=backend, weights=np.ones(len(values)))
+        for name in plain:
+            assert np.allclose(plain[name], weighted[name], equal_nan=True, atol=1e-9), (backend, name)
+    
+    # Integer weights equal repeating each row: compare at the last copy of every row
+    weights = rng.integers(1, 5, 5000)
+    weighted = rolling_track_stats(values, starts, 10, weights=weights.astype(float))
+    repeated = rolling_track_stats(np.repeat(values, weights), track_starts(np.repeat(tracks, weights)), 10)
+    last_copy = np.cumsum(weights) - 1
+    for name in weighted:
+        assert np.allclose(weighted[name], repeated[name][last_copy], equal_nan=True, atol=1e-9), name
+    print("Parity: unit-weight rolling stats match unweighted ones; integer weights match repeated rows")
+
+
+def check_weighted_loitering(config):
+    """Weighted loitering windows against unweighted ones on unit weights"""
+    df = generate_fleet(5, 600).sort_values(['MMSI', 'timestamp'], kind='stable')
+    behavior = BehaviorFeatureExtractor(config)
+    args = (df['lat'].to_numpy(), df['lon'].to_numpy(), df['timestamp'].to_numpy())
+    starts = track_starts(df['MMSI'].to_numpy())
+    plain = behavior.loitering_flags(*args)
+    plain[df.groupby('MMSI').cumcount().to_numpy() < behavior.speed_window] = 0
+    weighted = behavior.loitering_flags(*args, weights=np.ones(len(df)), starts=starts)
+    assert (plain == weighted).all(), "unit-weight loitering must match unweighted windows"
+    print("Parity: unit-weight loitering windows match unweighted ones")
+
+
+def check_compression(raw, compressed, compressor):
+    """Invariants of a compressed frame"""
+    assert compressed['point_weight'].sum() == len(raw), "weights must account for every report"
+    
+    keys = ['MMSI', 'timestamp']
+    kept = pd.MultiIndex.from_frame(compressed[keys])
+    raw = raw.sort_values(keys).reset_index(drop=True)
+    gap = raw.groupby('MMSI')['timestamp'].diff().dt.total_seconds() / 60 > compressor.max_gap_minutes
+    boundaries = raw[gap | gap.shift(-1, fill_value=False)]
+    assert pd.MultiIndex.from_frame(boundaries[keys]).isin(kept).all(), "gap boundaries must be kept"
+    
+    first_last = raw.groupby('MMSI').nth([0, -1])
+    assert pd.MultiIndex.from_frame(first_last[keys]).isin(kept).all(), "track ends must be kept"
+    
+    kept_gaps = compressed.groupby('MMSI')['timestamp'].diff().dt.total_seconds() / 60
+    assert (kept_gaps > compressor.max_gap_minutes).sum() == gap.sum(), "no new gaps may appear"
+    
+    if numba is not None:
+        raw_sorted = raw.sort_values(keys, kind='stable')
+        starts = track_starts(raw_sorted['MMSI'].to_numpy())
+        args = (raw_sorted['lat'].to_numpy(), raw_sorted['lon'].to_numpy(),
+                raw_sorted['timestamp'].to_numpy().view('int64') / 1e9,
+                raw_sorted['SOG'].to_numpy(), raw_sorted['COG'].to_numpy(),
+                compressor.must_keep(raw_sorted, starts), compressor.tolerance_km,
+                compressor.sog_tolerance, compressor.cog_tolerance, compressor.max_interval_minutes * 60)
+        assert (dead_reckoning_keep(*args, backend='numba') == dead_reckoning_keep(*args, backend='numpy')).all()
+
+
+def check_engines(compressed, config, n_vessels=10):
+    """Per-vessel extractors and the fused pass agree on weighted rows"""
+    df = compressed[compressed['MMSI'].isin(compressed['MMSI'].unique()[:n_vessels])].reset_index(drop=True)
+    legacy = TransmissionFeatureExtractor(config).extract_features(
+        BehaviorFeatureExtractor(config).extract_features(df)
+    ).sort_index()
+    fused = FusedFeatureExtractor(config).extract_features(df).sort_index()
+    for column in [c for c in legacy.columns if c not in df.columns]:
+        assert np.allclose(legacy[column].astype(float), fused[column].astype(float),
+                           equal_nan=True, atol=1e-9), column
+
+
+def feature_drift(full, compressed):
+    """Per-vessel report-weighted means of rolling features, full against compressed tracks"""
+    columns = ['speed_mean', 'speed_std', 'turn_rate', 'fishing_speed_pct', 'loitering',
+               'avg_gap_duration', 'gap_count']
+    a = full.groupby('MMSI')[columns].mean()
+    weight = compressed['point_weight'].astype(float)
+    b = (compressed[columns].astype(float).mul(weight, axis=0).groupby(compressed['MMSI']).sum()
+         .div(weight.groupby(compressed['MMSI']).sum(), axis=0))
+    return pd.DataFrame({
+        'full_mean': a.mean(),
+        'compressed_mean': b.mean(),
+        'median_abs_diff': (a - b).abs().median()
+    })
+
+
+def run_case(name, raw, config):
+    compressor = TrajectoryCompressor(config)
+    start = time.perf_counter()
+    compressed = compressor.compress(raw)
+    compress_s = time.perf_counter() - start
+    check_compression(raw, compressed, compressor)
+    check_engines(compressed, config)
+    
+    full, full_vessels, full_s = downstream(raw, config)
+    small, small_vessels, small_s = downstream(compressed, config)
+    
+    print(f"\n{name}: {len(raw):,} -> {len(compressed):,} reports "
+          f"({compressor.stats['ratio']:.1f}x) in {compress_s:.2f} s")
+    print(f"  Features: {full_s:.2f} s full, {small_s:.2f} s compressed "
+          f"({full_s / max(small_s, 1e-9):.1f}x faster, {compress_s + small_s:.2f} s with compression)")
+    print(feature_drift(full, small).to_string(float_format='{:.3f}'.format))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Trajectory compression benchmark')
+    parser.add_argument('--vessels', type=int, default=50)
+    parser.add_argument('--points', type=int, default=4000, help='Reports per synthetic vessel')
+    args = parser.parse_args()
+    
+    config = load_config()
+    check_weighted_rolling()
+    check_weighted_loitering(config)
+    downstream(generate_fleet(2, 400), config, repeat=1)  # load compiled kernels before timing
+    
+    sample_path = Path(config.get('data', 'ais_data'))
+    if sample_path.exists():
+        sample = AISCleaner(config).clean(pd.read_csv(sample_path))
+        run_case(f"Sample data ({sample_path})", sample, config)
+    
+    run_case(f"Synthetic fleet ({args.vessels} vessels: anchorage, transit, fishing)",
+             generate_fleet(args.vessels, args.points), config)
+    print("\nCompression checks passed: weights sum to the input, track ends and gap boundaries kept, "
+          "no new gaps, per-vessel and fused extractors agree on weighted rows")
+
+
+if __name__ == '__main__':
+    main()
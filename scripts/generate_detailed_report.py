@@ -11,7 +11,9 @@ from datetime import datetime
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from src.utils.config_loader import load_config
 from src.utils.logger import setup_logger
+from src.models.supervised_models import SUPERVISED_BACKEND_NAMES, saved_backend
 
 logger = setup_logger(__name__, "logs/evaluation.log")
 
@@ -204,16 +206,28 @@ def add_model_details(report):
     models_dir = Path("outputs/models")
     
     report.append("### Model Details\n")
-    report.append("#### 1. Random Forest Classifier")
-    report.append("- **Type:** Supervised Learning")
-    report.append("- **Algorithm:** Ensemble of Decision Trees")
-    report.append("- **Purpose:** Primary anomaly detection using labeled data")
-    report.append("- **Features:** 22 behavioral and transmission features")
-    report.append("- **Hyperparameters:**")
-    report.append("  - n_estimators: 100")
-    report.append("  - max_depth: 20")
-    report.append("  - min_samples_split: 5")
-    report.append("- **Training Time:** ~2 minutes")
+    backend = saved_backend(models_dir)
+    if backend == 'random_forest':
+        report.append("#### 1. Random Forest Classifier")
+        report.append("- **Type:** Supervised Learning")
+        report.append("- **Algorithm:** Ensemble of Decision Trees")
+        report.append("- **Purpose:** Primary anomaly detection using labeled data")
+        report.append("- **Features:** 22 behavioral and transmission features")
+        report.append("- **Hyperparameters:**")
+        report.append("  - n_estimators: 100")
+        report.append("  - max_depth: 20")
+        report.append("  - min_samples_split: 5")
+        report.append("- **Training Time:** ~2 minutes")
+    else:
+        # Boosting backends (models.supervised.backend), saved under the same file name
+        report.append(f"#### 1. {SUPERVISED_BACKEND_NAMES[backend]} Classifier")
+        report.append("- **Type:** Supervised Learning")
+        report.append("- **Algorithm:** Gradient-Boosted Decision Trees")
+        report.append("- **Purpose:** Primary anomaly detection using labeled data")
+        report.append("- **Features:** 22 behavioral and transmission features (missing values handled natively)")
+        report.append("- **Hyperparameters:**")
+        for name, value in load_config().get('models', backend, default={}).items():
+            report.append(f"  - {name}: {value}")
     
     rf_path = models_dir / "random_forest.pkl"
     if rf_path.exists():
@@ -13,6 +13,7 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 
 from src.utils.config_loader import load_config
+from src.models.supervised_models import SUPERVISED_BACKEND_NAMES, saved_backend
 from src.utils.logger import setup_logger
 
 logger = setup_logger(__name__, "logs/evaluation.log")
@@ -22,7 +23,8 @@ def load_model_info():
     models_dir = Path("outputs/models")
     
     model_info = {
-        'random_forest.pkl': {'type': 'Supervised', 'algorithm': 'Random Forest'},
+        # Holds the tree model of whichever supervised backend was trained
+        'random_forest.pkl': {'type': 'Supervised', 'algorithm': SUPERVISED_BACKEND_NAMES[saved_backend(models_dir)]},
         'svm.pkl': {'type': 'Supervised', 'algorithm': 'Support Vector Machine'},
         'isolation_forest.pkl': {'type': 'Unsupervised', 'algorithm': 'Isolation Forest'},
         'lof.pkl': {'type': 'Unsupervised', 'algorithm': 'Local Outlier Factor'},
@@ -1,9 +1,13 @@
 """Generate project summary"""
-import pandas as pd
 from pathlib import Path
 import sys
 sys.path.append(str(Path(__file__).parent.parent))
 
+from src.utils.config_loader import load_config
+from src.utils.storage import StageStore
+
+store = StageStore(load_config())
+
 print("=" * 70)
 print("IUU FISHING DETECTION PROJECT - EXECUTION SUMMARY")
 print("=" * 70)
@@ -12,13 +16,13 @@ print("=" * 70)
 print("\n[1] DATA PROCESSING")
 print("-" * 70)
 
-cleaned_df = pd.read_csv("data/processed/ais_cleaned.csv")
+cleaned_df = store.load('ais_cleaned', columns=['MMSI'])
 print(f"✓ Cleaned AIS Data: {len(cleaned_df):,} records")
 
-eez_df = pd.read_csv("data/processed/ais_eez_filtered.csv")
+eez_df = store.load('ais_eez_filtered', columns=['MMSI'])
 print(f"✓ EEZ Filtered Data: {len(eez_df):,} records ({len(eez_df)/len(cleaned_df)*100:.1f}% within EEZ)")
 
-features_df = pd.read_csv("data/processed/ais_all_features.csv")
+features_df = store.load('ais_all_features')
 print(f"✓ Feature Extraction: {len(features_df):,} records, {len(features_df.columns)} features")
 print(f"✓ Unique Vessels: {features_df['MMSI'].nunique()}")
 
@@ -1,15 +1,19 @@
 """Quick visualization of results"""
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.utils.config_loader import load_config
+from src.utils.storage import StageStore
 
 # Set style
 sns.set_style("whitegrid")
 plt.rcParams['figure.figsize'] = (15, 10)
 
 # Load data
-df = pd.read_csv("data/processed/ais_all_features.csv")
+df = StageStore(load_config()).load('ais_all_features')
 
 # Create figure with subplots
 fig, axes = plt.subplots(2, 3, figsize=(18, 12))
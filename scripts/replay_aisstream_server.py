@@ -0,0 +1,192 @@
+"""Local AIS Stream stand-in that replays recorded messages over WebSocket
+
+Replays AIS Stream JSON messages (one per line in a .jsonl recording, or
+synthetic ones) at a configurable rate to every subscriber, optionally
+dropping the connection every N messages to exercise reconnects. Without
+--serve-only it also runs an AISStreamConsumer against itself and reports
+what was delivered.
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+import websockets
+from src.data.ais_stream import AISStreamConsumer
+
+
+def synthetic_messages(n_messages, n_vessels=500, seed=42):
+    """AIS Stream PositionReport messages for vessels inside the Indian EEZ box"""
+    rng = np.random.default_rng(seed)
+    start = datetime(2024, 1, 1)
+    vessel = rng.integers(0, n_vessels, n_messages)
+    nanos = rng.integers(0, 10 ** 9, n_messages)
+    return [json.dumps({
+        'MessageType': 'PositionReport',
+        'MetaData': {
+            'MMSI': int(400000000 + vessel[i]),
+            'ShipName': f'REPLAY {vessel[i]}',
+            'time_utc': f"{start + timedelta(seconds=i)}.{nanos[i]:09d} +0000 UTC"
+        },
+        'Message': {'PositionReport': {
+            'Latitude': float(rng.uniform(6.5, 21.5)),
+            'Longitude': float(rng.uniform(68.5, 87.5)),
+            'Sog': float(rng.uniform(0, 15)),
+            'Cog': float(rng.uniform(0, 360)),
+            'TrueHeading': int(rng.integers(0, 360))
+        }}
+    }) for i in range(n_messages)]
+
+
+class ReplayServer:
+    """WebSocket server replaying messages at ``rate`` messages per second
+    
+    The replay cursor is shared across connections, so a client that
+    reconnects continues where the stream left off; messages sent while no
+    client is connected are skipped, as with the real feed.
+    """
+    
+    def __init__(self, messages, rate=1000.0, drop_every=None, host='127.0.0.1', port=0):
+        self.messages = messages
+        self.rate = rate
+        self.drop_every = drop_every
+        self.host = host
+        self.port = port
+        self.sent = 0
+        self.connections = 0
+        self._cursor = 0
+    
+    async def handler(self, websocket):
+        await websocket.recv()  # subscription message
+        self.connections += 1
+        sent_here = 0
+        interval = 1.0 / self.rate if self.rate > 0 else 0.0
+        next_send = time.perf_counter()
+        
+        while self._cursor < len(self.messages):
+            try:
+                await websocket.send(self.messages[self._cursor])
+            except websockets.ConnectionClosed:
+                return
+            self._cursor += 1
+            self.sent += 1
+            sent_here += 1
+            
+            if self.drop_every and sent_here >= self.drop_every:
+                await websocket.close()
+                return
+            
+            next_send += interval
+            delay = next_send - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif sent_here % 256 == 0:
+                await asyncio.sleep(0)
+        
+        await websocket.close()
+    
+    async def serve(self, ready=None, stop=None):
+        async with websockets.serve(self.handler, self.host, self.port) as server:
+            self.port = server.sockets[0].getsockname()[1]
+            if ready is not None:
+                ready.set()
+            await (stop.wait() if stop is not None else asyncio.Future())
+    
+    def start_in_thread(self):
+        """Run the server on its own event loop; returns a stop callable"""
+        ready = threading.Event()
+        state = {}
+        
+        def run():
+            loop = asyncio.new_event_loop()
+            state['loop'] = loop
+            state['stop'] = asyncio.Event()
+            loop.run_until_complete(self.serve(ready, state['stop']))
+            loop.close()
+        
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        ready.wait()
+        
+        def stop():
+            state['loop'].call_soon_threadsafe(state['stop'].set)
+            thread.join(5)
+        return stop
+    
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}"
+
+
+def load_messages(path):
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay AIS Stream messages over a local WebSocket')
+    parser.add_argument('--messages', help='Recorded messages (.jsonl); synthetic if omitted')
+    parser.add_argument('--count', type=int, default=20000, help='Synthetic message count')
+    parser.add_argument('--record', help='Write the synthetic messages to this .jsonl file and exit')
+    parser.add_argument('--rate', type=float, default=2000.0, help='Messages per second')
+    parser.add_argument('--drop-every', type=int, default=None,
+                       help='Close the connection after this many messages')
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--serve-only', action='store_true')
+    parser.add_argument('--poll', type=float, default=1.0, help='Drain interval of the consumer check')
+    parser.add_argument('--buffer-size', type=int, default=100000)
+    args = parser.parse_args()
+    
+    messages = load_messages(args.messages) if args.messages else synthetic_messages(args.count)
+    if args.record:
+        Path(args.record).write_text('\n'.join(messages) + '\n')
+        print(f"Wrote {len(messages)} messages to {args.record}")
+        return
+    
+    server = ReplayServer(messages, rate=args.rate, drop_every=args.drop_every, port=args.port)
+    if args.serve_only:
+        print(f"Replaying {len(messages)} messages at {args.rate:g}/s on ws://127.0.0.1:{args.port}")
+        asyncio.run(server.serve())
+        return
+    
+    stop_server = server.start_in_thread()
+    consumer = AISStreamConsumer('replay', [6, 68, 22, 88], ws_url=server.url,
+                                 buffer_size=args.buffer_size, backoff_initial=0.1, backoff_max=1.0)
+    
+    print("=" * 78)
+    print(f"AIS STREAM REPLAY - {len(messages):,} messages at {args.rate:g}/s"
+          + (f", connection dropped every {args.drop_every}" if args.drop_every else ""))
+    print("=" * 78)
+    print(f"{'t (s)':>7} {'drained':>9} {'drain (ms)':>11} {'received':>9} {'dropped':>8} {'connects':>9}")
+    
+    start = time.perf_counter()
+    consumer.start()
+    drained = 0
+    while server.sent < len(messages) or consumer.buffer:
+        time.sleep(args.poll)
+        t0 = time.perf_counter()
+        df = consumer.drain()
+        drain_ms = (time.perf_counter() - t0) * 1000
+        drained += len(df)
+        stats = consumer.stats()
+        print(f"{time.perf_counter() - start:>7.1f} {len(df):>9} {drain_ms:>11.2f} "
+              f"{stats['received']:>9} {stats['dropped']:>8} {stats['connects']:>9}")
+        if time.perf_counter() - start > len(messages) / args.rate * 3 + 10:
+            break
+    
+    consumer.stop()
+    stop_server()
+    
+    print("-" * 78)
+    print(f"sent {server.sent:,}  drained {drained:,}  dropped from buffer {consumer.dropped:,}  "
+          f"server connections {server.connections}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,164 @@
 """Enhanced pipeline for IUU fishing detection with all improvements"""
 import sys
+import argparse
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
 from src.utils.config_loader import load_config
 from src.utils.logger import setup_logger
+from src.utils.storage import StageStore
+from src.utils.cache import StageCache
+from src.utils.dag import PipelineDAG
 import pandas as pd
 
 logger = setup_logger(__name__, "logs/enhanced_pipeline.log")
 
-def run_enhanced_pipeline():
+def extract_spatiotemporal(config, store, ais_all_features):
+    """[3/9] Spatio-temporal features, vessel table and shared hotspots"""
+    from src.features.spatiotemporal_features import SpatioTemporalFeatureExtractor
+    
+    extractor = SpatioTemporalFeatureExtractor(config)
+    df, vessel_table = extractor.extract_features(ais_all_features, return_vessel_table=True)
+    vessel_table = vessel_table.reset_index()
+    
+    store.save(df, 'ais_enhanced_features')
+    store.save(vessel_table, 'ais_vessel_features')
+    
+    hotspots = None
+    if config.get('features', 'clustering', 'hotspots', 'enabled', default=True):
+        hotspots, _ = extractor.extract_fishing_hotspots(df)
+        store.save(hotspots, 'ais_fishing_hotspots')
+        logger.info(f"✓ {len(hotspots)} shared fishing hotspots detected")
+    
+    logger.info(f"✓ Enhanced features extracted: {len(df.columns)} total features")
+    return df, vessel_table, hotspots
+
+def predict_ensemble(config, ais_enhanced_features):
+    """[5/9] Ensemble predictions"""
+    from src.models.ensemble import run_stage
+    
+    results = run_stage(config, ais_enhanced_features)
+    logger.info(f"✓ Ensemble predictions complete: {results['anomaly'].sum()} anomalies detected")
+    return results
+
+def compare_baseline(config, ais_enhanced_features):
+    """[6/9] Rule-based baseline"""
+    from src.evaluation.baseline import run_stage
+    
+    baseline_results = run_stage(config, ais_enhanced_features)
+    logger.info(f"✓ Baseline predictions complete: {baseline_results['rule_anomaly'].sum()} anomalies detected")
+    return baseline_results
+
+def evaluation_labels(ais_enhanced_features):
+    """Ground-truth labels, recreated with the synthetic labelling used for training"""
+    if 'anomaly' in ais_enhanced_features.columns:
+        return ais_enhanced_features[['anomaly']]
+    from src.models.train import create_synthetic_labels
+    return create_synthetic_labels(ais_enhanced_features.copy(deep=False))[['anomaly']]
+
+def evaluate(config, ml_predictions, rule_predictions, labels):
+    """[7/9] Comprehensive evaluation"""
+    from src.evaluation.comprehensive_evaluation import ComprehensiveEvaluator
+    
+    evaluator = ComprehensiveEvaluator(config)
+    
+    y_true = labels['anomaly'].values
+    predictions_dict = {
+        'ML Ensemble': (ml_predictions['anomaly'].values, ml_predictions['ensemble_score'].values),
+        'Rule-Based': (rule_predictions['rule_anomaly'].values[:len(y_true)], None)
+    }
+    
+    comparison = evaluator.generate_comprehensive_report(y_true, predictions_dict)
+    logger.info("✓ Comprehensive evaluation complete")
+    return comparison
+
+def explain(config, ais_enhanced_features, ml_predictions):
+    """[8/9] Model explainability and alert summary"""
+    from src.models.explainability import load_explainer
+    
+    explainer = load_explainer(config, "outputs/models", ais_enhanced_features)
+    
+    # Generate reports
+    output_dir = Path("outputs/explainability")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    
+    explainer.plot_feature_importance(output_dir / "feature_importance.png")
+    
+    df = ais_enhanced_features.iloc[:len(ml_predictions)]
+    explainer.generate_anomaly_report(
+        df,
+        ml_predictions['anomaly'].values,
+        ml_predictions['ensemble_score'].values,
+        output_dir / "anomaly_report.csv"
+    )
+    
+    alert_summary = explainer.create_alert_summary(
+        df,
+        ml_predictions['anomaly'].values,
+        ml_predictions['ensemble_score'].values
+    )
+    alert_summary.to_csv(output_dir / "alert_summary.csv", index=False)
+    
+    logger.info(f"✓ Explainability analysis complete: {len(alert_summary)} high-risk vessels identified")
+    return alert_summary
+
+def test_realtime(config, ais_enhanced_features):
+    """[9/9] Real-time detection on the first reports"""
+    from src.models.realtime_detector import RealtimeIUUDetector
+    
+    detector = RealtimeIUUDetector(config)
+    
+    # Test with sample data
+    test_stream = ais_enhanced_features.head(500).copy()
+    results = detector.process_stream(test_stream)
+    
+    output_dir = Path("outputs/realtime")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    
+    results.to_csv(output_dir / "realtime_detections.csv", index=False)
+    detector.export_alerts(output_dir / "realtime_alerts.csv")
+    
+    report = detector.generate_daily_report()
+    with open(output_dir / "daily_report.txt", 'w') as f:
+        f.write(report)
+    
+    logger.info(f"✓ Real-time detection test complete: {len(detector.alerts)} alerts generated")
+    return results
+
+def build_pipeline(config, use_cache=None, max_workers=None):
+    """Stages 3 and 5-9 as a DAG over in-memory frames
+    
+    The enhanced features are read (or computed) once and shared. Ensemble
+    prediction, the baseline and the real-time test only need the features
+    and run concurrently; evaluation and explainability wait for the
+    predictions they consume. Both draw with pyplot's global figure state,
+    so explainability also waits for the evaluation's model comparison.
+    """
+    store = StageStore(config)
+    cache = StageCache(config, store, enabled=use_cache)
+    dag = PipelineDAG(config, store=store, cache=cache, max_workers=max_workers)
+    
+    dag.add('spatiotemporal_features',
+            lambda ais_all_features: extract_spatiotemporal(config, store, ais_all_features),
+            inputs=['ais_all_features'],
+            outputs=['ais_enhanced_features', 'ais_vessel_features', 'ais_fishing_hotspots'],
+            cache_step='spatiotemporal_features')
+    dag.add('ensemble', lambda ais_enhanced_features: predict_ensemble(config, ais_enhanced_features),
+            inputs=['ais_enhanced_features'], outputs=['ml_predictions'])
+    dag.add('baseline', lambda ais_enhanced_features: compare_baseline(config, ais_enhanced_features),
+            inputs=['ais_enhanced_features'], outputs=['rule_predictions'])
+    dag.add('labels', evaluation_labels, inputs=['ais_enhanced_features'], outputs=['labels'])
+    dag.add('evaluation', lambda ml_predictions, rule_predictions, labels: evaluate(
+                config, ml_predictions, rule_predictions, labels),
+            inputs=['ml_predictions', 'rule_predictions', 'labels'], outputs=['model_comparison'])
+    dag.add('explainability', lambda ais_enhanced_features, ml_predictions, model_comparison: explain(
+                config, ais_enhanced_features, ml_predictions),
+            inputs=['ais_enhanced_features', 'ml_predictions', 'model_comparison'], outputs=['alert_summary'])
+    dag.add('realtime_test', lambda ais_enhanced_features: test_realtime(config, ais_enhanced_features),
+            inputs=['ais_enhanced_features'], outputs=['realtime_detections'])
+    return dag
+
+def run_enhanced_pipeline(use_cache=None, max_workers=None):
     """Run complete enhanced pipeline"""
     
     logger.info("=" * 70)
@@ -28,24 +177,6 @@ def run_enhanced_pipeline():
     logger.info("✓ Behavioral features extracted")
     logger.info("✓ Transmission features extracted")
     
-    # Step 3: Enhanced Spatio-Temporal Features
-    logger.info("\n[3/9] Enhanced Spatio-Temporal Feature Extraction")
-    try:
-        from src.features.spatiotemporal_features import SpatioTemporalFeatureExtractor
-        
-        input_path = Path(config.get('data', 'output_dir')) / "ais_all_features.csv"
-        df = pd.read_csv(input_path, parse_dates=['timestamp'])
-        
-        extractor = SpatioTemporalFeatureExtractor(config)
-        df = extractor.extract_features(df)
-        
-        output_path = Path(config.get('data', 'output_dir')) / "ais_enhanced_features.csv"
-        df.to_csv(output_path, index=False)
-        
-        logger.info(f"✓ Enhanced features extracted: {len(df.columns)} total features")
-    except Exception as e:
-        logger.error(f"✗ Enhanced feature extraction failed: {e}")
-    
     # Step 4: Model Training (already done)
     logger.info("\n[4/9] Model Training")
     logger.info("✓ Random Forest trained")
@@ -54,133 +185,13 @@ def run_enhanced_pipeline():
     logger.info("✓ LOF trained")
     logger.info("⚠ LSTM training (may be in progress)")
     
-    # Step 5: Ensemble Predictions
-    logger.info("\n[5/9] Ensemble Predictions")
-    try:
-        from src.models.ensemble import EnsembleAnomalyDetector
-        
-        ensemble = EnsembleAnomalyDetector(config)
-        ensemble.load_models("outputs/models")
-        
-        # Use enhanced features if available
-        feature_path = Path(config.get('data', 'output_dir')) / "ais_enhanced_features.csv"
-        if not feature_path.exists():
-            feature_path = Path(config.get('data', 'output_dir')) / "ais_all_features.csv"
-        
-        df = pd.read_csv(feature_path, parse_dates=['timestamp'])
-        results = ensemble.predict_with_details(df)
-        
-        output_path = Path("outputs") / "anomaly_predictions.csv"
-        results.to_csv(output_path, index=False)
-        
-        logger.info(f"✓ Ensemble predictions complete: {results['anomaly'].sum()} anomalies detected")
-    except Exception as e:
-        logger.error(f"✗ Ensemble prediction failed: {e}")
-    
-    # Step 6: Baseline Comparison
-    logger.info("\n[6/9] Baseline Comparison")
-    try:
-        from src.evaluation.baseline import RuleBasedDetector
-        
-        baseline = RuleBasedDetector(config)
-        df = pd.read_csv(feature_path, parse_dates=['timestamp'])
-        baseline_results = baseline.detect_anomalies(df)
-        
-        output_path = Path("outputs") / "rule_based_predictions.csv"
-        baseline_results.to_csv(output_path, index=False)
-        
-        logger.info(f"✓ Baseline predictions complete: {baseline_results['rule_anomaly'].sum()} anomalies detected")
-    except Exception as e:
-        logger.error(f"✗ Baseline comparison failed: {e}")
-    
-    # Step 7: Comprehensive Evaluation
-    logger.info("\n[7/9] Comprehensive Evaluation")
-    try:
-        from src.evaluation.comprehensive_evaluation import ComprehensiveEvaluator
-        
-        evaluator = ComprehensiveEvaluator(config)
-        
-        # Load predictions
-        ml_pred = pd.read_csv("outputs/anomaly_predictions.csv")
-        rule_pred = pd.read_csv("outputs/rule_based_predictions.csv")
-        df = pd.read_csv(feature_path)
-        
-        y_true = df['anomaly'].values
-        predictions_dict = {
-            'ML Ensemble': (ml_pred['anomaly'].values, ml_pred['ensemble_score'].values),
-            'Rule-Based': (rule_pred['rule_anomaly'].values[:len(y_true)], None)
-        }
-        
-        evaluator.generate_comprehensive_report(y_true, predictions_dict)
-        
-        logger.info("✓ Comprehensive evaluation complete")
-    except Exception as e:
-        logger.error(f"✗ Evaluation failed: {e}")
-    
-    # Step 8: Model Explainability
-    logger.info("\n[8/9] Model Explainability & Insights")
-    try:
-        from src.models.explainability import ModelExplainer
-        import joblib
-        
-        rf_model = joblib.load("outputs/models/random_forest.pkl")
-        feature_columns = joblib.load("outputs/models/feature_columns.pkl")
-        
-        explainer = ModelExplainer(rf_model, feature_columns)
-        
-        # Generate reports
-        output_dir = Path("outputs/explainability")
-        output_dir.mkdir(parents=True, exist_ok=True)
-        
-        explainer.plot_feature_importance(output_dir / "feature_importance.png")
-        
-        ml_pred = pd.read_csv("outputs/anomaly_predictions.csv")
-        df = pd.read_csv(feature_path)
-        
-        anomaly_report = explainer.generate_anomaly_report(
-            df.iloc[:len(ml_pred)],
-            ml_pred['anomaly'].values,
-            ml_pred['ensemble_score'].values,
-            output_dir / "anomaly_report.csv"
-        )
-        
-        alert_summary = explainer.create_alert_summary(
-            df.iloc[:len(ml_pred)],
-            ml_pred['anomaly'].values,
-            ml_pred['ensemble_score'].values
-        )
-        alert_summary.to_csv(output_dir / "alert_summary.csv", index=False)
-        
-        logger.info(f"✓ Explainability analysis complete: {len(alert_summary)} high-risk vessels identified")
-    except Exception as e:
-        logger.error(f"✗ Explainability analysis failed: {e}")
-    
-    # Step 9: Real-time Detection Test
-    logger.info("\n[9/9] Real-time Detection System Test")
-    try:
-        from src.models.realtime_detector import RealtimeIUUDetector
-        
-        detector = RealtimeIUUDetector(config)
-        
-        # Test with sample data
-        df = pd.read_csv(feature_path, parse_dates=['timestamp'])
-        test_stream = df.head(500)
-        
-        results = detector.process_stream(test_stream)
-        
-        output_dir = Path("outputs/realtime")
-        output_dir.mkdir(parents=True, exist_ok=True)
-        
-        results.to_csv(output_dir / "realtime_detections.csv", index=False)
-        detector.export_alerts(output_dir / "realtime_alerts.csv")
-        
-        report = detector.generate_daily_report()
-        with open(output_dir / "daily_report.txt", 'w') as f:
-            f.write(report)
-        
-        logger.info(f"✓ Real-time detection test complete: {len(detector.alerts)} alerts generated")
-    except Exception as e:
-        logger.error(f"✗ Real-time detection test failed: {e}")
+    # Steps 3 and 5-9: spatio-temporal features, predictions, evaluation,
+    # explainability and the real-time test
+    logger.info("\n[3, 5-9/9] Feature extraction, prediction and evaluation stages")
+    dag = build_pipeline(config, use_cache, max_workers)
+    dag.run()
+    dag.cache.summary()
+    dag.log_report()
     
     # Final Summary
     logger.info("\n" + "=" * 70)
@@ -188,9 +199,13 @@ def run_enhanced_pipeline():
     logger.info("=" * 70)
     
     try:
-        # Load final results
-        ml_pred = pd.read_csv("outputs/anomaly_predictions.csv")
-        alert_summary = pd.read_csv("outputs/explainability/alert_summary.csv")
+        # Final results, from this run or the last one that produced them
+        ml_pred = dag.artifacts.get('ml_predictions')
+        if ml_pred is None:
+            ml_pred = pd.read_csv("outputs/anomaly_predictions.csv")
+        alert_summary = dag.artifacts.get('alert_summary')
+        if alert_summary is None:
+            alert_summary = pd.read_csv("outputs/explainability/alert_summary.csv")
         
         logger.info(f"\nTotal Records Processed: {len(ml_pred)}")
         logger.info(f"Anomalies Detected: {ml_pred['anomaly'].sum()} ({ml_pred['anomaly'].sum()/len(ml_pred)*100:.2f}%)")
@@ -212,7 +227,7 @@ def run_enhanced_pipeline():
         logger.info("  3. Launch dashboard: python src/dashboard/app.py")
         logger.info("  4. Deploy real-time detection system")
         logger.info("  5. Integrate with maritime authority systems")
-        
+    
     except Exception as e:
         logger.error(f"Error generating summary: {e}")
     
@@ -221,4 +236,9 @@ def run_enhanced_pipeline():
     logger.info("=" * 70)
 
 if __name__ == "__main__":
-    run_enhanced_pipeline()
+    parser = argparse.ArgumentParser(description='Run the enhanced IUU detection pipeline')
+    parser.add_argument('--no-cache', action='store_true', help='Recompute the spatio-temporal features')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Stages run concurrently (default: pipeline.max_workers)')
+    args = parser.parse_args()
+    run_enhanced_pipeline(use_cache=False if args.no_cache else None, max_workers=args.workers)
@@ -1,68 +1,89 @@
 """Run complete end-to-end pipeline"""
 import sys
+import argparse
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
+from src.utils.config_loader import load_config
 from src.utils.logger import setup_logger
-from src.preprocessing.clean_ais import main as clean_ais
-from src.preprocessing.eez_filter import main as filter_eez
-from src.features.extract_features import main as extract_features
-from src.models.train import main as train_models
-from src.evaluation.baseline import main as run_baseline
-from src.models.ensemble import main as run_ensemble
-from src.evaluation.metrics import main as evaluate
+from src.utils.storage import StageStore
+from src.utils.cache import StageCache
+from src.utils.dag import PipelineDAG
+from src.preprocessing import clean_ais, eez_filter
+from src.features import extract_features
+from src.models import train, ensemble
+from src.evaluation import baseline, metrics
 
 logger = setup_logger(__name__, "logs/pipeline.log")
 
-def run_full_pipeline():
-    """Execute complete pipeline"""
+MODEL_DIR = "outputs/models"
+
+def build_pipeline(config, use_cache=None, max_workers=None):
+    """Pipeline stages and the artifacts they exchange
+    
+    Training and the rule-based baseline only need the features, so they
+    run side by side; ensemble prediction waits for the trained models and
+    evaluation for both prediction sets and the training labels.
+    """
+    store = StageStore(config)
+    cache = StageCache(config, store, enabled=use_cache)
+    dag = PipelineDAG(config, store=store, cache=cache, max_workers=max_workers)
+    
+    def train_models(ais_all_features):
+        return train.run_stage(config, ais_all_features), MODEL_DIR
+    
+    dag.add('clean_ais', lambda: clean_ais.run_stage(config),
+            outputs=['ais_cleaned'], cache_step='clean_ais')
+    dag.add('filter_eez', lambda ais_cleaned: eez_filter.run_stage(config, ais_cleaned),
+            inputs=['ais_cleaned'], outputs=['ais_eez_filtered'], cache_step='filter_eez')
+    dag.add('extract_features', lambda ais_eez_filtered: extract_features.run_stage(config, ais_eez_filtered),
+            inputs=['ais_eez_filtered'], outputs=['ais_all_features'], cache_step='extract_features')
+    dag.add('train_models', train_models,
+            inputs=['ais_all_features'], outputs=['training_labels', 'models'])
+    dag.add('baseline', lambda ais_all_features: baseline.run_stage(config, ais_all_features),
+            inputs=['ais_all_features'], outputs=['rule_predictions'])
+    dag.add('ensemble', lambda ais_all_features, models: ensemble.run_stage(config, ais_all_features),
+            inputs=['ais_all_features', 'models'], outputs=['ml_predictions'])
+    dag.add('evaluate', lambda ml_predictions, rule_predictions, training_labels: metrics.run_stage(
+                config, ml_predictions, rule_predictions, training_labels),
+            inputs=['ml_predictions', 'rule_predictions', 'training_labels'])
+    return dag
+
+def run_full_pipeline(use_cache=None, max_workers=None):
+    """Execute complete pipeline
+    
+    Preprocessing and feature stages are skipped when the stage cache holds
+    their outputs for the current inputs, config and code.
+    """
     logger.info("=" * 70)
     logger.info("STARTING FULL IUU FISHING DETECTION PIPELINE")
     logger.info("=" * 70)
     
-    try:
-        # Step 1: Data Preprocessing
-        logger.info("\n[STEP 1/7] Cleaning AIS data...")
-        clean_ais()
-        
-        # Step 2: EEZ Filtering
-        logger.info("\n[STEP 2/7] Filtering data within EEZ...")
-        filter_eez()
-        
-        # Step 3: Feature Extraction
-        logger.info("\n[STEP 3/7] Extracting features...")
-        extract_features()
-        
-        # Step 4: Model Training
-        logger.info("\n[STEP 4/7] Training ML models...")
-        train_models()
-        
-        # Step 5: Baseline Detection
-        logger.info("\n[STEP 5/7] Running rule-based baseline...")
-        run_baseline()
-        
-        # Step 6: Ensemble Prediction
-        logger.info("\n[STEP 6/7] Running ensemble prediction...")
-        run_ensemble()
-        
-        # Step 7: Evaluation
-        logger.info("\n[STEP 7/7] Evaluating models...")
-        evaluate()
-        
-        logger.info("\n" + "=" * 70)
-        logger.info("PIPELINE COMPLETED SUCCESSFULLY")
-        logger.info("=" * 70)
-        logger.info("\nOutputs saved to:")
-        logger.info("  - Processed data: data/processed/")
-        logger.info("  - Trained models: outputs/models/")
-        logger.info("  - Predictions: outputs/anomaly_predictions.csv")
-        logger.info("  - Evaluation: outputs/evaluation/")
-        logger.info("\nTo launch dashboard, run:")
-        logger.info("  python src/dashboard/app.py")
-        
-    except Exception as e:
-        logger.error(f"Pipeline failed: {e}", exc_info=True)
-        raise
+    dag = build_pipeline(load_config(), use_cache, max_workers)
+    dag.run()
+    dag.cache.summary()
+    dag.log_report()
+    
+    failed = dag.failed()
+    if failed:
+        logger.error(f"Pipeline failed: {', '.join(failed)} did not complete")
+        raise RuntimeError(f"Pipeline stages failed: {', '.join(failed)}")
+    
+    logger.info("\n" + "=" * 70)
+    logger.info("PIPELINE COMPLETED SUCCESSFULLY")
+    logger.info("=" * 70)
+    logger.info("\nOutputs saved to:")
+    logger.info("  - Processed data: data/processed/")
+    logger.info("  - Trained models: outputs/models/")
+    logger.info("  - Predictions: outputs/anomaly_predictions.csv")
+    logger.info("  - Evaluation: outputs/evaluation/")
+    logger.info("\nTo launch dashboard, run:")
+    logger.info("  python src/dashboard/app.py")
 
 if __name__ == "__main__":
-    run_full_pipeline()
+    parser = argparse.ArgumentParser(description='Run the full IUU detection pipeline')
+    parser.add_argument('--no-cache', action='store_true', help='Recompute every stage')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Stages run concurrently (default: pipeline.max_workers)')
+    args = parser.parse_args()
+    run_full_pipeline(use_cache=False if args.no_cache else None, max_workers=args.workers)
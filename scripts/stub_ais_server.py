@@ -0,0 +1,162 @@
+"""Local stub of the AIS HTTP provider APIs for testing AISDataManager offline
+
+Serves AISHub, VesselFinder and MarineTraffic style responses on
+/aishub, /vesselfinder and /marinetraffic/... with a configurable delay and
+failure mode per provider. Point the providers at it through
+data_fetching.base_urls in config/api_keys.yaml or the base_url argument.
+"""
+import sys
+import json
+import time
+import argparse
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+
+
+def sample_vessels(n_vessels, seed=42):
+    """Random vessel positions inside the Indian EEZ bounding box"""
+    rng = np.random.default_rng(seed)
+    now = int(time.time())
+    return [{
+        'MMSI': int(400000000 + i),
+        'TIME': now - int(rng.integers(0, 600)),
+        'LAT': float(rng.uniform(6.5, 21.5)),
+        'LON': float(rng.uniform(68.5, 87.5)),
+        'SOG': float(rng.uniform(0, 15)),
+        'COG': float(rng.uniform(0, 360)),
+        'HEADING': float(rng.uniform(0, 360)),
+        'NAME': f'STUB VESSEL {i}',
+        'TYPE': 30
+    } for i in range(n_vessels)]
+
+
+def render(provider, vessels):
+    """Encode vessels in the given provider's response format"""
+    if provider == 'aishub':
+        return [[{
+            'MMSI': v['MMSI'], 'TIME': v['TIME'], 'LATITUDE': v['LAT'], 'LONGITUDE': v['LON'],
+            'SOG': v['SOG'], 'COG': v['COG'], 'HEADING': v['HEADING'],
+            'NAME': v['NAME'], 'TYPE': v['TYPE']
+        } for v in vessels]]
+    
+    records = [{
+        'MMSI': v['MMSI'], 'LAT': v['LAT'], 'LON': v['LON'], 'SPEED': v['SOG'],
+        'COURSE': v['COG'], 'HEADING': v['HEADING'], 'SHIPNAME': v['NAME'],
+        'NAME': v['NAME'], 'TYPE': v['TYPE'],
+        'TIMESTAMP': (datetime.fromtimestamp(v['TIME']).strftime('%Y-%m-%d %H:%M:%S')
+                      if provider == 'marinetraffic' else v['TIME'])
+    } for v in vessels]
+    return records if provider == 'marinetraffic' else {'vessels': records}
+
+
+class StubAISServer:
+    """Threaded HTTP server answering like the real AIS providers
+    
+    ``behaviour`` maps a provider name to ``{'delay': seconds, 'fail': bool}``.
+    The server counts requests and TCP connections so callers can check that
+    keep-alive sessions are reused.
+    """
+    
+    PROVIDERS = ('aishub', 'vesselfinder', 'marinetraffic')
+    
+    def __init__(self, host='127.0.0.1', port=0, n_vessels=200, behaviour=None):
+        self.vessels = sample_vessels(n_vessels)
+        self.behaviour = behaviour or {}
+        self.requests = {name: 0 for name in self.PROVIDERS}
+        self.connections = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+    
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def base_urls(self):
+        return {name: f"{self.url}/{name}" for name in self.PROVIDERS}
+    
+    def _handler(self):
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+            
+            def do_GET(self):
+                provider = self.path.lstrip('/').split('/')[0].split('?')[0]
+                if provider not in server.PROVIDERS:
+                    self.send_error(404)
+                    return
+                
+                with server._lock:
+                    server.requests[provider] += 1
+                behaviour = server.behaviour.get(provider, {})
+                time.sleep(behaviour.get('delay', 0))
+                
+                if behaviour.get('fail'):
+                    body, status = b'{"error": "stub failure"}', 503
+                else:
+                    body, status = json.dumps(render(provider, server.vessels)).encode(), 200
+                
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        return Handler
+    
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve stub AIS provider APIs')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--vessels', type=int, default=200)
+    for name in StubAISServer.PROVIDERS:
+        parser.add_argument(f'--{name}-delay', type=float, default=0.0)
+        parser.add_argument(f'--{name}-fail', action='store_true')
+    args = parser.parse_args()
+    
+    behaviour = {name: {'delay': getattr(args, f'{name}_delay'), 'fail': getattr(args, f'{name}_fail')}
+                 for name in StubAISServer.PROVIDERS}
+    server = StubAISServer(port=args.port, n_vessels=args.vessels, behaviour=behaviour)
+    print(f"Stub AIS providers at {server.url}:")
+    for name, url in server.base_urls().items():
+        print(f"  {name:<14} {url}")
+    
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
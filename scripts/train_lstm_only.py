@@ -3,11 +3,11 @@ import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
-import pandas as pd
 import numpy as np
 from src.models.lstm_model import LSTMTrainer
 from src.utils.config_loader import load_config
 from src.utils.logger import setup_logger
+from src.utils.storage import StageStore
 
 logger = setup_logger(__name__, "logs/lstm_training.log")
 
@@ -20,15 +20,14 @@ def main():
     config = load_config()
     
     # Load feature data
-    feature_path = Path("data/processed/ais_all_features.csv")
+    store = StageStore(config)
     
-    if not feature_path.exists():
-        logger.error(f"Feature file not found: {feature_path}")
+    if not store.exists('ais_all_features'):
+        logger.error(f"Feature data not found in {store.output_dir}")
         logger.error("Please run the basic pipeline first: python scripts/run_pipeline.py")
         return
     
-    logger.info(f"Loading features from {feature_path}")
-    df = pd.read_csv(feature_path, parse_dates=['timestamp'])
+    df = store.load('ais_all_features')
     logger.info(f"Loaded {len(df)} records")
     
     # Create synthetic labels for training
@@ -12,6 +12,7 @@ sys.path.append(str(Path(__file__).parent.parent.parent))
 
 from src.utils.config_loader import load_config
 from src.utils.logger import setup_logger
+from src.utils.schema import apply_schema
 
 logger = setup_logger(__name__, "logs/dashboard.log")
 
@@ -681,17 +682,18 @@ app.layout = html.Div([
 )
 def update_data(n_clicks, n_intervals):
     """Load and update data"""
-    df = load_data()
+    df = apply_schema(load_data(), config)
     
     if df.empty:
         return {}, [], "No data"
     
     vessels = sorted(df['MMSI'].unique())
-    vessel_options = [{'label': f'🚢 MMSI: {v}', 'value': v} for v in vessels]
+    vessel_options = [{'label': f'🚢 MMSI: {v}', 'value': int(v)} for v in vessels]
     
     last_update = datetime.now().strftime("%H:%M:%S")
     
-    return df.to_dict('records'), vessel_options, f"Updated: {last_update}"
+    # Column lists rather than one dict per row (no repeated keys in the store)
+    return df.to_dict('list'), vessel_options, f"Updated: {last_update}"
 
 @app.callback(
     [Output('total-vessels', 'children'),
@@ -3,25 +3,119 @@ Real-time AIS Data API Integration
 Supports multiple AIS data providers for live vessel tracking
 """
 import requests
+import time
+import threading
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 from pathlib import Path
 import sys
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
 from src.utils.config_loader import load_config
 from src.utils.logger import setup_logger
+from src.data.ais_stream import AISStreamConsumer
+from src.data.ais_decoders import decode_payload
 
 logger = setup_logger(__name__, "logs/ais_api.log")
 
+# Upper bounds (seconds) of the provider latency histogram buckets
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, float('inf')]
+
+
+class LatencyHistogram:
+    """Thread-safe fixed-bucket histogram of request latencies"""
+    
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = list(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.failures = 0
+        self._lock = threading.Lock()
+    
+    def observe(self, seconds, success=True):
+        """Record one request duration"""
+        with self._lock:
+            index = next(i for i, bound in enumerate(self.buckets) if seconds <= bound)
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+            if not success:
+                self.failures += 1
+    
+    def quantile(self, q):
+        """Upper bucket bound containing the q-th quantile"""
+        with self._lock:
+            if self.count == 0:
+                return None
+            target = q * self.count
+            cumulative = 0
+            for bound, count in zip(self.buckets, self.counts):
+                cumulative += count
+                if cumulative >= target:
+                    return min(bound, self.max)
+        return self.max
+    
+    def snapshot(self):
+        """Bucket counts and summary statistics as a plain dict"""
+        with self._lock:
+            buckets = {f"le_{bound:g}": count for bound, count in zip(self.buckets, self.counts)}
+            count, total, max_seconds, failures = self.count, self.total, self.max, self.failures
+        return {
+            'count': count,
+            'failures': failures,
+            'mean_seconds': total / count if count else None,
+            'p50_seconds': self.quantile(0.5),
+            'p95_seconds': self.quantile(0.95),
+            'max_seconds': max_seconds,
+            'buckets': buckets
+        }
+
 
 class AISDataProvider:
-    """Base class for AIS data providers"""
+    """Base class for AIS data providers
+    
+    HTTP providers share one keep-alive ``requests.Session`` per provider
+    instance, so repeated polling reuses pooled connections instead of
+    opening a new one per request.
+    """
     
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, base_url=None, timeout=30, pool_size=4, json_backend='auto'):
         self.api_key = api_key
         self.config = load_config()
+        self.base_url = base_url
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.json_backend = json_backend
+        self._session = None
+    
+    # Fetches that consume what they return (stream buffers) cannot be repeated
+    drains = False
+    
+    @property
+    def session(self):
+        """Pooled keep-alive session, created on first use"""
+        if self._session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._session = session
+        return self._session
+    
+    def get(self, url, params=None):
+        """GET through the provider's pooled session"""
+        return self.session.get(url, params=params, timeout=self.timeout)
+    
+    def close(self):
+        """Close pooled connections"""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
     
     def fetch_data(self, bbox=None, time_range=None):
         """Fetch AIS data - to be implemented by subclasses"""
@@ -35,9 +129,8 @@ class AISHubProvider(AISDataProvider):
     No API key required for basic access
     """
     
-    def __init__(self):
-        super().__init__()
-        self.base_url = "http://data.aishub.net/ws.php"
+    def __init__(self, base_url=None, **kwargs):
+        super().__init__(base_url=base_url or "http://data.aishub.net/ws.php", **kwargs)
     
     def fetch_data(self, bbox=None, time_range=None):
         """
@@ -74,51 +167,23 @@ class AISHubProvider(AISDataProvider):
             logger.info(f"Fetching AIS data from AISHub for bbox: {bbox}")
             logger.info("Note: AISHub rate limit - once per minute")
             
-            response = requests.get(self.base_url, params=params, timeout=30)
+            response = self.get(self.base_url, params=params)
             response.raise_for_status()
             
-            # Try to parse as JSON
+            # Decode the whole payload into columns at once
             try:
-                data = response.json()
-            except:
-                # If JSON fails, try parsing text response
-                text = response.text
-                logger.debug(f"Response text: {text[:200]}")
+                df = decode_payload('aishub', response.content, backend=self.json_backend)
+            except ValueError:
+                logger.debug(f"Response text: {response.text[:200]}")
                 return pd.DataFrame()
             
-            if data and isinstance(data, list) and len(data) > 0:
-                # Parse AISHub format - data is array of arrays
-                vessels = []
-                vessel_data = data[0] if isinstance(data[0], list) else data
-                
-                for vessel in vessel_data:
-                    try:
-                        vessels.append({
-                            'MMSI': int(vessel.get('MMSI', 0)),
-                            'timestamp': datetime.fromtimestamp(int(vessel.get('TIME', 0))),
-                            'lat': float(vessel.get('LATITUDE', 0)),
-                            'lon': float(vessel.get('LONGITUDE', 0)),
-                            'SOG': float(vessel.get('SOG', 0)),
-                            'COG': float(vessel.get('COG', 0)),
-                            'heading': float(vessel.get('HEADING', 0)),
-                            'vessel_name': vessel.get('NAME', 'Unknown'),
-                            'vessel_type': int(vessel.get('TYPE', 0))
-                        })
-                    except Exception as e:
-                        logger.debug(f"Error parsing vessel: {e}")
-                        continue
-                
-                if vessels:
-                    df = pd.DataFrame(vessels)
-                    logger.info(f"Successfully fetched {len(df)} vessel records from AISHub")
-                    return df
-                else:
-                    logger.warning("No valid vessels parsed from AISHub")
-                    return pd.DataFrame()
+            if not df.empty:
+                logger.info(f"Successfully fetched {len(df)} vessel records from AISHub")
+                return df
             else:
                 logger.warning("No data returned from AISHub")
                 return pd.DataFrame()
-                
+        
         except Exception as e:
             logger.error(f"Error fetching from AISHub: {e}")
             return pd.DataFrame()
@@ -132,9 +197,8 @@ class MarineTrafficProvider(AISDataProvider):
     Requires API key (paid service)
     """
     
-    def __init__(self, api_key):
-        super().__init__(api_key)
-        self.base_url = "https://services.marinetraffic.com/api"
+    def __init__(self, api_key, base_url=None, **kwargs):
+        super().__init__(api_key, base_url=base_url or "https://services.marinetraffic.com/api", **kwargs)
     
     def fetch_data(self, bbox=None, time_range=None):
         """
@@ -168,33 +232,18 @@ class MarineTrafficProvider(AISDataProvider):
             }
             
             logger.info(f"Fetching AIS data from MarineTraffic for bbox: {bbox}")
-            response = requests.get(endpoint, params=params, timeout=30)
+            response = self.get(endpoint, params=params)
             response.raise_for_status()
             
-            data = response.json()
+            df = decode_payload('marinetraffic', response.content, backend=self.json_backend)
             
-            if data and len(data) > 0:
-                vessels = []
-                for vessel in data:
-                    vessels.append({
-                        'MMSI': vessel.get('MMSI'),
-                        'timestamp': datetime.strptime(vessel.get('TIMESTAMP'), '%Y-%m-%d %H:%M:%S'),
-                        'lat': float(vessel.get('LAT', 0)),
-                        'lon': float(vessel.get('LON', 0)),
-                        'SOG': float(vessel.get('SPEED', 0)),
-                        'COG': float(vessel.get('COURSE', 0)),
-                        'heading': float(vessel.get('HEADING', 0)),
-                        'vessel_name': vessel.get('SHIPNAME', 'Unknown'),
-                        'vessel_type': vessel.get('TYPE', 0)
-                    })
-                
-                df = pd.DataFrame(vessels)
+            if not df.empty:
                 logger.info(f"Successfully fetched {len(df)} vessel records from MarineTraffic")
                 return df
             else:
                 logger.warning("No data returned from MarineTraffic")
                 return pd.DataFrame()
-                
+        
         except Exception as e:
             logger.error(f"Error fetching from MarineTraffic: {e}")
             return pd.DataFrame()
@@ -207,9 +256,8 @@ class VesselFinderProvider(AISDataProvider):
     Requires API key
     """
     
-    def __init__(self, api_key):
-        super().__init__(api_key)
-        self.base_url = "https://api.vesselfinder.com/vesselslist"
+    def __init__(self, api_key, base_url=None, **kwargs):
+        super().__init__(api_key, base_url=base_url or "https://api.vesselfinder.com/vesselslist", **kwargs)
     
     def fetch_data(self, bbox=None, time_range=None):
         """Fetch AIS data from VesselFinder"""
@@ -231,33 +279,18 @@ class VesselFinderProvider(AISDataProvider):
             }
             
             logger.info(f"Fetching AIS data from VesselFinder for bbox: {bbox}")
-            response = requests.get(self.base_url, params=params, timeout=30)
+            response = self.get(self.base_url, params=params)
             response.raise_for_status()
             
-            data = response.json()
+            df = decode_payload('vesselfinder', response.content, backend=self.json_backend)
             
-            if data and 'vessels' in data:
-                vessels = []
-                for vessel in data['vessels']:
-                    vessels.append({
-                        'MMSI': vessel.get('MMSI'),
-                        'timestamp': datetime.fromtimestamp(vessel.get('TIMESTAMP', 0)),
-                        'lat': float(vessel.get('LAT', 0)),
-                        'lon': float(vessel.get('LON', 0)),
-                        'SOG': float(vessel.get('SPEED', 0)),
-                        'COG': float(vessel.get('COURSE', 0)),
-                        'heading': float(vessel.get('HEADING', 0)),
-                        'vessel_name': vessel.get('NAME', 'Unknown'),
-                        'vessel_type': vessel.get('TYPE', 0)
-                    })
-                
-                df = pd.DataFrame(vessels)
+            if not df.empty:
                 logger.info(f"Successfully fetched {len(df)} vessel records from VesselFinder")
                 return df
             else:
                 logger.warning("No data returned from VesselFinder")
                 return pd.DataFrame()
-                
+        
         except Exception as e:
             logger.error(f"Error fetching from VesselFinder: {e}")
             return pd.DataFrame()
@@ -270,129 +303,109 @@ class AISStreamProvider(AISDataProvider):
     Website: https://aisstream.io/
     Free tier available with API key
     Uses WebSocket for real-time data
+    
+    A persistent AISStreamConsumer keeps the subscription open between
+    fetches; each fetch drains the reports buffered since the last one.
     """
     
-    def __init__(self, api_key):
-        super().__init__(api_key)
-        self.ws_url = "wss://stream.aisstream.io/v0/stream"
+    drains = True
+    
+    def __init__(self, api_key, ws_url=None, buffer_size=100000, first_fetch_wait=10,
+                 backoff_max=60, json_backend='auto'):
+        super().__init__(api_key, json_backend=json_backend)
+        self.ws_url = ws_url or "wss://stream.aisstream.io/v0/stream"
+        self.buffer_size = buffer_size
+        self.first_fetch_wait = first_fetch_wait
+        self.backoff_max = backoff_max
+        self.consumer = None
+    
+    def start_stream(self, bbox):
+        """Start (or re-subscribe) the background consumer for a bounding box"""
+        if self.consumer is not None and self.consumer.bbox != list(bbox):
+            logger.info(f"Bounding box changed to {bbox}, re-subscribing")
+            self.consumer.stop()
+            self.consumer = None
+        
+        if self.consumer is None:
+            self.consumer = AISStreamConsumer(
+                self.api_key, bbox, ws_url=self.ws_url,
+                buffer_size=self.buffer_size, backoff_max=self.backoff_max,
+                json_backend=self.json_backend
+            )
+        return self.consumer.start()
     
     def fetch_data(self, bbox=None, time_range=None):
         """
-        Fetch AIS data from AIS Stream using WebSocket
+        Drain position reports buffered by the persistent AIS Stream consumer
+        
+        The first call starts the consumer and waits up to first_fetch_wait
+        seconds for data; later calls return immediately.
         """
         if not self.api_key:
             logger.error("AIS Stream API key required")
             return pd.DataFrame()
         
         try:
-            import asyncio
-            import websockets
-            import json
-            
+            import websockets  # noqa: F401
+        except ImportError:
+            logger.error("websockets package not installed. Install with: pip install websockets")
+            return pd.DataFrame()
+        
+        try:
             if bbox is None:
                 bbox = [6, 68, 22, 88]
             
-            logger.info(f"Connecting to AIS Stream WebSocket for bbox: {bbox}")
-            
-            # Create event loop and fetch data
-            vessels_data = []
-            
-            async def connect_aisstream():
-                async with websockets.connect(self.ws_url) as websocket:
-                    # Subscribe to area - AIS Stream uses [[lon_min, lat_min], [lon_max, lat_max]]
-                    subscribe_message = {
-                        "APIKey": self.api_key,
-                        "BoundingBoxes": [[
-                            [bbox[1], bbox[0]],  # [lon_min, lat_min]
-                            [bbox[3], bbox[2]]   # [lon_max, lat_max]
-                        ]]
-                    }
-                    
-                    await websocket.send(json.dumps(subscribe_message))
-                    logger.info(f"Subscribed to AIS Stream for bbox: {bbox}")
-                    logger.info(f"Coordinates: [{bbox[1]}, {bbox[0]}] to [{bbox[3]}, {bbox[2]}]")
-                    
-                    # Collect messages for 10 seconds
-                    import time
-                    start_time = time.time()
-                    
-                    while time.time() - start_time < 10:
-                        try:
-                            message = await asyncio.wait_for(websocket.recv(), timeout=1.0)
-                            data = json.loads(message)
-                            
-                            if 'Message' in data and 'PositionReport' in data['Message']:
-                                pos = data['Message']['PositionReport']
-                                lat = pos.get('Latitude')
-                                lon = pos.get('Longitude')
-                                
-                                # Validate coordinates are within bbox
-                                if not (bbox[0] <= lat <= bbox[2] and bbox[1] <= lon <= bbox[3]):
-                                    logger.debug(f"Skipping vessel outside bbox: lat={lat}, lon={lon}")
-                                    continue
-                                
-                                # Parse timestamp - handle different formats
-                                time_str = data['MetaData']['time_utc']
-                                try:
-                                    # Try parsing with UTC suffix
-                                    if ' UTC' in time_str:
-                                        time_str = time_str.replace(' UTC', '')
-                                    timestamp = datetime.strptime(time_str.split('.')[0], '%Y-%m-%d %H:%M:%S')
-                                except:
-                                    timestamp = datetime.now()
-                                
-                                vessels_data.append({
-                                    'MMSI': data['MetaData'].get('MMSI'),
-                                    'timestamp': timestamp,
-                                    'lat': lat,
-                                    'lon': lon,
-                                    'SOG': pos.get('Sog', 0),
-                                    'COG': pos.get('Cog', 0),
-                                    'heading': pos.get('TrueHeading', 0),
-                                    'vessel_name': data['MetaData'].get('ShipName', 'Unknown'),
-                                    'vessel_type': data['MetaData'].get('ShipType', 0)
-                                })
-                        except asyncio.TimeoutError:
-                            continue
-                        except Exception as e:
-                            logger.error(f"Error processing message: {e}")
-                            continue
+            first_fetch = self.consumer is None
+            consumer = self.start_stream(bbox)
+            if first_fetch and self.first_fetch_wait:
+                consumer.wait_for_data(self.first_fetch_wait)
             
-            # Run async function
-            try:
-                asyncio.run(connect_aisstream())
-            except Exception as e:
-                logger.error(f"WebSocket connection error: {e}")
-                # Fallback: return empty for now
-                logger.warning("AIS Stream WebSocket not available, skipping")
-                return pd.DataFrame()
+            df = consumer.drain()
+            stats = consumer.stats()
             
-            if vessels_data:
-                df = pd.DataFrame(vessels_data)
-                logger.info(f"Successfully fetched {len(df)} vessel records from AIS Stream")
-                return df
+            if not df.empty:
+                logger.info(f"Successfully fetched {len(df)} vessel records from AIS Stream "
+                            f"({stats['dropped']} dropped from full buffer, {stats['connects']} connections)")
             else:
-                logger.warning("No data received from AIS Stream")
-                return pd.DataFrame()
-                
-        except ImportError:
-            logger.error("websockets package not installed. Install with: pip install websockets")
-            return pd.DataFrame()
+                logger.warning(f"No data buffered from AIS Stream (connected: {stats['connected']}, "
+                               f"last error: {stats['last_error']})")
+            return df
+        
         except Exception as e:
             logger.error(f"Error with AIS Stream: {e}")
             return pd.DataFrame()
+    
+    def close(self):
+        """Stop the background consumer"""
+        if self.consumer is not None:
+            self.consumer.stop()
+            self.consumer = None
+        super().close()
 
 
 class AISDataManager:
     """
     Manager class to handle multiple AIS data providers
-    Automatically falls back to alternative providers if primary fails
+    Automatically falls back to alternative providers if primary fails,
+    or queries all of them concurrently when a fan-out mode is configured
     """
     
-    def __init__(self, config_path=None):
+    FETCH_MODES = ('sequential', 'first', 'merge')
+    
+    def __init__(self, config_path=None, providers=None, fetch_settings=None):
         self.config = load_config() if config_path is None else load_config(config_path)
         self.providers = []
-        self._initialize_providers()
+        self.fetch_settings = {}
+        self.latency = {}
+        self._latency_lock = threading.Lock()
+        
+        if providers is None:
+            self._initialize_providers()
+        else:
+            self.providers = providers
+        
+        if fetch_settings:
+            self.fetch_settings.update(fetch_settings)
     
     def _initialize_providers(self):
         """Initialize available AIS data providers based on configuration"""
@@ -410,13 +423,25 @@ class AISDataManager:
                     if api_config and 'api_keys' in api_config:
                         api_keys = api_config['api_keys']
                         logger.info(f"Loaded API keys from {api_config_path}")
+                    if api_config and api_config.get('data_fetching'):
+                        self.fetch_settings = dict(api_config['data_fetching'])
+            
+            # Shared HTTP options; base URLs can be overridden (e.g. a local stub server)
+            base_urls = self.fetch_settings.get('base_urls') or {}
+            http_options = {
+                'timeout': self.fetch_settings.get('request_timeout', 30),
+                'pool_size': self.fetch_settings.get('pool_size', 4),
+                'json_backend': self.fetch_settings.get('json_backend', 'auto')
+            }
+            stream_options = self.fetch_settings.get('aisstream') or {}
             
             # AIS Stream (if API key available) - Try first as it's most reliable
             as_key = api_keys.get('aisstream')
             if as_key and as_key != 'null' and as_key is not None:
                 self.providers.append({
                     'name': 'AISStream',
-                    'provider': AISStreamProvider(as_key),
+                    'provider': AISStreamProvider(as_key, ws_url=base_urls.get('aisstream'),
+                                                  json_backend=http_options['json_backend'], **stream_options),
                     'priority': 1,
                     'free': False
                 })
@@ -425,7 +450,7 @@ class AISDataManager:
             # AISHub (free, no key required)
             self.providers.append({
                 'name': 'AISHub',
-                'provider': AISHubProvider(),
+                'provider': AISHubProvider(base_url=base_urls.get('aishub'), **http_options),
                 'priority': 2,
                 'free': True
             })
@@ -436,7 +461,7 @@ class AISDataManager:
             if vf_key and vf_key != 'null' and vf_key is not None:
                 self.providers.append({
                     'name': 'VesselFinder',
-                    'provider': VesselFinderProvider(vf_key),
+                    'provider': VesselFinderProvider(vf_key, base_url=base_urls.get('vesselfinder'), **http_options),
                     'priority': 3,
                     'free': False
                 })
@@ -447,12 +472,12 @@ class AISDataManager:
             if mt_key and mt_key != 'null' and mt_key is not None:
                 self.providers.append({
                     'name': 'MarineTraffic',
-                    'provider': MarineTrafficProvider(mt_key),
+                    'provider': MarineTrafficProvider(mt_key, base_url=base_urls.get('marinetraffic'), **http_options),
                     'priority': 4,
                     'free': False
                 })
                 logger.info("Initialized MarineTraffic provider")
-            
+        
         except Exception as e:
             logger.error(f"Error initializing providers: {e}")
             import traceback
@@ -490,7 +515,87 @@ class AISDataManager:
         
         return df_filtered
     
-    def fetch_live_data(self, bbox=None, time_range=None, provider_name=None):
+    def _histogram(self, name):
+        with self._latency_lock:
+            if name not in self.latency:
+                self.latency[name] = LatencyHistogram()
+            return self.latency[name]
+    
+    def _fetch_from(self, p, bbox, time_range):
+        """Fetch from one provider, record its latency and validate the bbox"""
+        start = time.perf_counter()
+        try:
+            df = p['provider'].fetch_data(bbox, time_range)
+        except Exception as e:
+            logger.error(f"Error with {p['name']}: {e}")
+            df = pd.DataFrame()
+        elapsed = time.perf_counter() - start
+        self._histogram(p['name']).observe(elapsed, success=not df.empty)
+        
+        if df.empty:
+            logger.warning(f"No data from {p['name']} ({elapsed:.2f}s)")
+            return df
+        
+        logger.info(f"Fetched {len(df)} records from {p['name']} in {elapsed:.2f}s")
+        
+        # Validate that data is within bbox
+        df = self._validate_bbox(df, bbox)
+        if df.empty:
+            logger.warning(f"❌ All data from {p['name']} was outside bbox")
+        else:
+            df['data_source'] = p['name']
+        return df
+    
+    def _fetch_concurrent(self, providers, bbox, time_range, merge):
+        """Query all providers in parallel and return the first or merged result
+        
+        In 'first' mode the call returns as soon as one provider delivers data;
+        slower requests finish in the background and still count towards the
+        latency histograms. Draining providers (stream buffers) never take
+        part in that race: their reports cannot be fetched again, so they are
+        always waited for and added to the result.
+        """
+        # Draining providers are submitted first so they never queue behind slow requests
+        providers = sorted(providers, key=lambda p: not getattr(p['provider'], 'drains', False))
+        max_workers = self.fetch_settings.get('max_workers') or len(providers)
+        executor = ThreadPoolExecutor(max_workers=min(max_workers, len(providers)),
+                                      thread_name_prefix='ais-fetch')
+        futures = {executor.submit(self._fetch_from, p, bbox, time_range): p for p in providers}
+        drained = [f for f, p in futures.items() if getattr(p['provider'], 'drains', False)]
+        results = []
+        
+        try:
+            for future in as_completed([f for f in futures if f not in drained]):
+                df = future.result()
+                if df.empty:
+                    continue
+                
+                p = futures[future]
+                results.append((p['priority'], df))
+                if not merge:
+                    logger.info(f"✅ First result: {len(df)} records from {p['name']}")
+                    break
+            
+            for future in drained:
+                df = future.result()
+                if not df.empty:
+                    results.append((futures[future]['priority'], df))
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        if not results:
+            return pd.DataFrame()
+        if not merge and len(results) == 1:
+            return results[0][1]
+        
+        # Higher-priority providers win when the same position report is seen twice
+        results.sort(key=lambda r: r[0])
+        df = pd.concat([df for _, df in results], ignore_index=True)
+        df = df.drop_duplicates(subset=['MMSI', 'timestamp'], keep='first').reset_index(drop=True)
+        logger.info(f"✅ Merged {len(df)} records from {len(results)} providers")
+        return df
+    
+    def fetch_live_data(self, bbox=None, time_range=None, provider_name=None, mode=None):
         """
         Fetch live AIS data from available providers
         
@@ -499,6 +604,9 @@ class AISDataManager:
                   Default: Indian EEZ [6, 68, 22, 88]
             time_range: Time range in minutes
             provider_name: Specific provider to use (optional)
+            mode: 'sequential' (priority order with fallback), 'first' (parallel,
+                  first non-empty result) or 'merge' (parallel, all results merged).
+                  Default: data_fetching.fetch_mode, else 'sequential'
         
         Returns:
             DataFrame with AIS data
@@ -506,6 +614,10 @@ class AISDataManager:
         if bbox is None:
             bbox = [6, 68, 22, 88]  # Indian EEZ
         
+        mode = mode or self.fetch_settings.get('fetch_mode', 'sequential')
+        if mode not in self.FETCH_MODES:
+            raise ValueError(f"Unknown fetch mode: {mode}")
+        
         logger.info(f"Fetching data for bounding box: {bbox}")
         logger.info(f"Region: {bbox[0]}°N-{bbox[2]}°N, {bbox[1]}°E-{bbox[3]}°E")
         
@@ -514,42 +626,58 @@ class AISDataManager:
             for p in self.providers:
                 if p['name'].lower() == provider_name.lower():
                     logger.info(f"Using requested provider: {p['name']}")
-                    df = p['provider'].fetch_data(bbox, time_range)
-                    # Validate bbox
-                    df = self._validate_bbox(df, bbox)
-                    if not df.empty:
-                        df['data_source'] = p['name']
-                    return df
+                    return self._fetch_from(p, bbox, time_range)
             logger.warning(f"Provider {provider_name} not found, using default")
         
+        providers = sorted(self.providers, key=lambda x: x['priority'])
+        
+        if mode != 'sequential' and len(providers) > 1:
+            logger.info(f"Querying {len(providers)} providers concurrently ({mode})")
+            df = self._fetch_concurrent(providers, bbox, time_range, merge=(mode == 'merge'))
+            if df.empty:
+                logger.error("All providers failed or returned no data in bbox, returning empty DataFrame")
+            return df
+        
         # Try providers in priority order
-        for p in sorted(self.providers, key=lambda x: x['priority']):
-            try:
-                logger.info(f"Attempting to fetch data from {p['name']}")
-                df = p['provider'].fetch_data(bbox, time_range)
-                
-                if not df.empty:
-                    logger.info(f"Fetched {len(df)} records from {p['name']}")
-                    
-                    # Validate that data is within bbox
-                    df = self._validate_bbox(df, bbox)
-                    
-                    if not df.empty:
-                        logger.info(f"✅ Successfully validated {len(df)} records from {p['name']}")
-                        df['data_source'] = p['name']
-                        return df
-                    else:
-                        logger.warning(f"❌ All data from {p['name']} was outside bbox, trying next provider")
-                else:
-                    logger.warning(f"No data from {p['name']}, trying next provider")
-                    
-            except Exception as e:
-                logger.error(f"Error with {p['name']}: {e}")
-                continue
+        for p in providers:
+            logger.info(f"Attempting to fetch data from {p['name']}")
+            df = self._fetch_from(p, bbox, time_range)
+            
+            if not df.empty:
+                logger.info(f"✅ Successfully validated {len(df)} records from {p['name']}")
+                return df
+            logger.warning(f"Trying next provider after {p['name']}")
         
         logger.error("All providers failed or returned no data in bbox, returning empty DataFrame")
         return pd.DataFrame()
     
+    def latency_histograms(self):
+        """Per-provider request latency histograms"""
+        with self._latency_lock:
+            histograms = dict(self.latency)
+        return {name: histogram.snapshot() for name, histogram in histograms.items()}
+    
+    def start_streams(self, bbox=None):
+        """Start background consumers of streaming providers ahead of the first fetch"""
+        if bbox is None:
+            bbox = [6, 68, 22, 88]
+        for p in self.providers:
+            if hasattr(p['provider'], 'start_stream') and p['provider'].api_key:
+                p['provider'].start_stream(bbox)
+    
+    def stream_stats(self):
+        """Connection and buffer counters of running stream consumers"""
+        return {
+            p['name']: p['provider'].consumer.stats()
+            for p in self.providers
+            if getattr(p['provider'], 'consumer', None) is not None
+        }
+    
+    def close(self):
+        """Release pooled HTTP connections and stop stream consumers"""
+        for p in self.providers:
+            p['provider'].close()
+    
     def save_to_file(self, df, output_path='data/raw/ais_live_data.csv'):
         """Save fetched AIS data to file"""
         try:
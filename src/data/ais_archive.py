@@ -0,0 +1,303 @@
+"""
+Partitioned AIS archive
+Parquet files laid out by day and coarse lat/lon tile, so time-range and
+bounding-box queries read only the partitions they overlap
+"""
+import os
+import time
+import uuid
+import shutil
+from datetime import datetime, timedelta
+from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+import numpy as np
+import pandas as pd
+
+from src.utils.logger import setup_logger
+from src.utils.schema import apply_schema
+
+logger = setup_logger(__name__, "logs/ais_archive.log")
+
+DUPLICATE_KEYS = ['MMSI', 'timestamp', 'lat', 'lon']
+
+
+def load_storage_settings(path="config/api_keys.yaml"):
+    """The ``storage`` section of the API config (empty if the file is missing)"""
+    import yaml
+    path = Path(path)
+    if not path.exists():
+        return {}
+    with open(path, 'r') as f:
+        api_config = yaml.safe_load(f) or {}
+    return api_config.get('storage') or {}
+
+
+def _corner(index, tile_degrees, width):
+    """Absolute corner coordinate of a tile index, zero-padded, with decimals only when it has some"""
+    value = round(abs(index * tile_degrees), 6)
+    whole = int(value)
+    fraction = f"{value - whole:.6f}".rstrip('0').rstrip('.')[1:]
+    return f"{whole:0{width}d}{fraction}"
+
+
+def _tile_name(lat_index, lon_index, tile_degrees):
+    return (f"{'N' if lat_index >= 0 else 'S'}{_corner(lat_index, tile_degrees, 2)}"
+            f"{'E' if lon_index >= 0 else 'W'}{_corner(lon_index, tile_degrees, 3)}")
+
+
+class AISArchive:
+    """Hive-style Parquet dataset: ``<root>/<dataset>/date=YYYY-MM-DD/tile=N06E068/part-*.parquet``
+    
+    A tile is the ``tile_degrees`` x ``tile_degrees`` cell containing a
+    report, named after its south-west corner. Every append writes one new
+    part per (day, tile) it touches, so concurrent writers never rewrite
+    each other's files; ``compact`` later merges the parts of closed days.
+    Day partitions older than ``retention_days`` are removed by
+    ``apply_retention`` (``storage.retention_days`` in config/api_keys.yaml).
+    """
+    
+    def __init__(self, config=None, root=None, tile_degrees=None, retention_days=None,
+                 api_config_path="config/api_keys.yaml"):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError("pyarrow is required for the AIS archive. Install with: pip install pyarrow")
+        
+        settings = load_storage_settings(api_config_path)
+        self.config = config
+        self.root = Path(root or settings.get('archive_dir', 'data/archive'))
+        self.tile_degrees = tile_degrees or settings.get('tile_degrees', 2)
+        self.retention_days = retention_days if retention_days is not None else settings.get('retention_days', 7)
+    
+    # Layout
+    
+    def tile_ids(self, lat, lon):
+        """Tile name of every position"""
+        lat_index = np.floor(np.asarray(lat, dtype=float) / self.tile_degrees).astype(int)
+        lon_index = np.floor(np.asarray(lon, dtype=float) / self.tile_degrees).astype(int)
+        cells, inverse = np.unique(np.column_stack([lat_index, lon_index]), axis=0, return_inverse=True)
+        names = np.array([_tile_name(i, j, self.tile_degrees) for i, j in cells], dtype=object)
+        return names[inverse.ravel()]
+    
+    def tiles_in_bbox(self, bbox):
+        """Names of the tiles overlapping ``[min_lat, min_lon, max_lat, max_lon]``"""
+        min_lat, min_lon, max_lat, max_lon = bbox
+        lat_range = range(int(np.floor(min_lat / self.tile_degrees)), int(np.floor(max_lat / self.tile_degrees)) + 1)
+        lon_range = range(int(np.floor(min_lon / self.tile_degrees)), int(np.floor(max_lon / self.tile_degrees)) + 1)
+        return {_tile_name(i, j, self.tile_degrees) for i in lat_range for j in lon_range}
+    
+    def dataset_dir(self, dataset):
+        return self.root / dataset
+    
+    def partitions(self, dataset='positions'):
+        """One row per (date, tile) partition with its directory and part count"""
+        rows = []
+        base = self.dataset_dir(dataset)
+        if base.is_dir():
+            for date_dir in sorted(base.glob('date=*')):
+                for tile_dir in sorted(date_dir.glob('tile=*')):
+                    parts = list(tile_dir.glob('part-*.parquet'))
+                    if parts:
+                        rows.append({
+                            'date': pd.Timestamp(date_dir.name.split('=', 1)[1]),
+                            'tile': tile_dir.name.split('=', 1)[1],
+                            'path': tile_dir,
+                            'parts': len(parts)
+                        })
+        return pd.DataFrame(rows, columns=['date', 'tile', 'path', 'parts'])
+    
+    # Writing
+    
+    def _write_part(self, df, directory):
+        directory.mkdir(parents=True, exist_ok=True)
+        name = f"part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet"
+        tmp = directory / f".{name}.tmp"
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, directory / name)  # readers never see a half-written part
+        return directory / name
+    
+    def append(self, df, dataset='positions'):
+        """Write reports into their day/tile partitions; returns the new part files"""
+        if df is None or df.empty:
+            return []
+        
+        df = df.copy(deep=False)
+        df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
+        valid = df['timestamp'].notna() & df['lat'].notna() & df['lon'].notna()
+        if not valid.all():
+            logger.warning(f"Skipping {(~valid).sum()} reports without timestamp or position")
+            df = df[valid]
+        if self.config is not None:
+            df = apply_schema(df, self.config)
+        
+        dates = df['timestamp'].dt.strftime('%Y-%m-%d').to_numpy()
+        tiles = self.tile_ids(df['lat'], df['lon'])
+        
+        paths = []
+        base = self.dataset_dir(dataset)
+        for (date, tile), rows in df.groupby([dates, tiles], sort=True).indices.items():
+            part = df.iloc[rows]
+            paths.append(self._write_part(part, base / f"date={date}" / f"tile={tile}"))
+        
+        logger.info(f"Archived {len(df)} reports to {len(paths)} partitions of {base}")
+        return paths
+    
+    # Reading
+    
+    def matching_partitions(self, dataset='positions', start=None, end=None, bbox=None):
+        """Partitions overlapping a time range (inclusive) and bounding box
+        
+        Only the day directories in range are listed, and with a bounding box
+        only its tile directories are looked up, so the cost does not grow
+        with the size of the archive.
+        """
+        base = self.dataset_dir(dataset)
+        first = pd.Timestamp(start).normalize() if start is not None else None
+        last = pd.Timestamp(end).normalize() if end is not None else None
+        tiles = sorted(self.tiles_in_bbox(bbox)) if bbox is not None else None
+        
+        rows = []
+        for date_dir in sorted(base.glob('date=*')) if base.is_dir() else []:
+            date = pd.Timestamp(date_dir.name.split('=', 1)[1])
+            if (first is not None and date < first) or (last is not None and date > last):
+                continue
+            if tiles is None:
+                tile_dirs = sorted(date_dir.glob('tile=*'))
+            else:
+                tile_dirs = [date_dir / f"tile={tile}" for tile in tiles]
+            for tile_dir in tile_dirs:
+                parts = list(tile_dir.glob('part-*.parquet')) if tile_dir.is_dir() else []
+                if parts:
+                    rows.append({'date': date, 'tile': tile_dir.name.split('=', 1)[1],
+                                 'path': tile_dir, 'parts': len(parts)})
+        return pd.DataFrame(rows, columns=['date', 'tile', 'path', 'parts'])
+    
+    def load(self, dataset='positions', start=None, end=None, bbox=None, columns=None, deduplicate=True):
+        """Reports inside a time range and bounding box, reading only overlapping partitions
+        
+        ``bbox`` is ``[min_lat, min_lon, max_lat, max_lon]``; ``start`` and
+        ``end`` are inclusive, and a date-only ``end`` (midnight) covers that
+        whole day. Rows are filtered exactly after the partition pruning. Reports appended twice (overlapping live fetches) are
+        returned once.
+        """
+        partitions = self.matching_partitions(dataset, start, end, bbox)
+        files = [part for directory in partitions['path'] for part in sorted(directory.glob('part-*.parquet'))]
+        if not files:
+            return pd.DataFrame(columns=columns)
+        
+        read_columns = None
+        if columns is not None:
+            read_columns = list(dict.fromkeys(list(columns) + ['timestamp', 'lat', 'lon']))
+        df = pd.concat([pd.read_parquet(f, columns=read_columns) for f in files], ignore_index=True)
+        
+        mask = np.ones(len(df), dtype=bool)
+        if start is not None:
+            mask &= (df['timestamp'] >= pd.Timestamp(start)).to_numpy()
+        if end is not None:
+            end = pd.Timestamp(end)
+            if end == end.normalize():
+                mask &= (df['timestamp'] < end + timedelta(days=1)).to_numpy()
+            else:
+                mask &= (df['timestamp'] <= end).to_numpy()
+        if bbox is not None:
+            min_lat, min_lon, max_lat, max_lon = bbox
+            mask &= (df['lat'].between(min_lat, max_lat) & df['lon'].between(min_lon, max_lon)).to_numpy()
+        df = df[mask]
+        
+        if deduplicate and set(DUPLICATE_KEYS) <= set(df.columns):
+            df = df.drop_duplicates(subset=DUPLICATE_KEYS)
+        df = df.sort_values('timestamp', kind='stable').reset_index(drop=True)
+        if self.config is not None:
+            df = apply_schema(df, self.config)
+        
+        logger.info(f"Loaded {len(df)} reports from {len(files)} part files in {len(partitions)} partitions")
+        return df[list(columns)] if columns is not None else df
+    
+    # Maintenance
+    
+    def compact(self, dataset='positions', before=None):
+        """Merge the parts of each partition dated before ``before`` (default: today) into one"""
+        before = pd.Timestamp(before or datetime.now().date())
+        partitions = self.partitions(dataset)
+        merged = 0
+        for row in partitions[(partitions['date'] < before) & (partitions['parts'] > 1)].itertuples():
+            parts = sorted(row.path.glob('part-*.parquet'))
+            df = pd.concat([pd.read_parquet(p) for p in parts], ignore_index=True)
+            if set(DUPLICATE_KEYS) <= set(df.columns):
+                df = df.drop_duplicates(subset=DUPLICATE_KEYS)
+            self._write_part(df.sort_values('timestamp', kind='stable'), row.path)
+            for p in parts:
+                p.unlink()
+            merged += 1
+        if merged:
+            logger.info(f"Compacted {merged} partitions of {dataset}")
+        return merged
+    
+    def apply_retention(self, dataset=None, now=None):
+        """Delete day partitions older than ``retention_days``; returns the removed dates"""
+        if not self.retention_days:
+            return []
+        cutoff = pd.Timestamp(now or datetime.now()).normalize() - timedelta(days=self.retention_days)
+        if dataset is not None:
+            datasets = [dataset]
+        else:
+            datasets = [d.name for d in self.root.iterdir() if d.is_dir()] if self.root.is_dir() else []
+        
+        removed = []
+        for name in datasets:
+            for date_dir in sorted(self.dataset_dir(name).glob('date=*')):
+                if pd.Timestamp(date_dir.name.split('=', 1)[1]) < cutoff:
+                    shutil.rmtree(date_dir)
+                    removed.append((name, date_dir.name.split('=', 1)[1]))
+        if removed:
+            logger.info(f"Retention ({self.retention_days} days): removed {len(removed)} day partitions")
+        return removed
+    
+    def maintain(self):
+        """Compact closed days and apply retention for every dataset"""
+        if not self.root.is_dir():
+            return
+        for dataset in [d.name for d in self.root.iterdir() if d.is_dir()]:
+            self.compact(dataset)
+        self.apply_retention()
+
+
+def main():
+    """Import a flat AIS file into the archive or query it"""
+    import argparse
+    from src.utils.config_loader import load_config
+    
+    parser = argparse.ArgumentParser(description='Partitioned AIS archive')
+    parser.add_argument('--import', dest='import_path', help='CSV or Parquet file of AIS reports to archive')
+    parser.add_argument('--dataset', default='positions')
+    parser.add_argument('--start', help='Query start (inclusive), e.g. 2024-01-01')
+    parser.add_argument('--end', help='Query end (inclusive)')
+    parser.add_argument('--bbox', type=float, nargs=4, metavar=('MIN_LAT', 'MIN_LON', 'MAX_LAT', 'MAX_LON'))
+    parser.add_argument('--maintain', action='store_true', help='Compact closed days and apply retention')
+    args = parser.parse_args()
+    
+    archive = AISArchive(load_config())
+    
+    if args.import_path:
+        path = Path(args.import_path)
+        df = pd.read_parquet(path) if path.suffix == '.parquet' else pd.read_csv(path)
+        archive.append(df, args.dataset)
+    if args.maintain:
+        archive.maintain()
+    
+    partitions = archive.partitions(args.dataset)
+    print(f"{args.dataset}: {len(partitions)} partitions, {partitions['parts'].sum() if len(partitions) else 0} part files "
+          f"in {archive.dataset_dir(args.dataset)} (tiles of {archive.tile_degrees} degrees, "
+          f"retention {archive.retention_days} days)")
+    
+    if args.start or args.end or args.bbox:
+        matching = archive.matching_partitions(args.dataset, args.start, args.end, args.bbox)
+        df = archive.load(args.dataset, args.start, args.end, args.bbox)
+        print(f"Query read {len(matching)} of {len(partitions)} partitions: "
+              f"{len(df)} reports from {df['MMSI'].nunique() if len(df) else 0} vessels")
+
+
+if __name__ == '__main__':
+    main()
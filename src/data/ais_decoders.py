@@ -0,0 +1,248 @@
+"""
+Batch decoders for AIS provider payloads
+Parse a whole response (or a batch of AIS Stream messages) into columnar
+arrays instead of building one Python dict per vessel
+"""
+import json
+import numpy as np
+import pandas as pd
+from datetime import datetime, timezone
+from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__, "logs/ais_api.log")
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Output column, payload key, default for a missing value, conversion
+PROVIDER_FIELDS = {
+    'aishub': [
+        ('MMSI', 'MMSI', 0, 'int'),
+        ('timestamp', 'TIME', 0, 'epoch'),
+        ('lat', 'LATITUDE', 0, 'float'),
+        ('lon', 'LONGITUDE', 0, 'float'),
+        ('SOG', 'SOG', 0, 'float'),
+        ('COG', 'COG', 0, 'float'),
+        ('heading', 'HEADING', 0, 'float'),
+        ('vessel_name', 'NAME', 'Unknown', 'raw'),
+        ('vessel_type', 'TYPE', 0, 'int')
+    ],
+    'marinetraffic': [
+        ('MMSI', 'MMSI', None, 'int'),
+        ('timestamp', 'TIMESTAMP', None, 'datetime'),
+        ('lat', 'LAT', 0, 'float'),
+        ('lon', 'LON', 0, 'float'),
+        ('SOG', 'SPEED', 0, 'float'),
+        ('COG', 'COURSE', 0, 'float'),
+        ('heading', 'HEADING', 0, 'float'),
+        ('vessel_name', 'SHIPNAME', 'Unknown', 'raw'),
+        ('vessel_type', 'TYPE', 0, 'raw')
+    ],
+    'vesselfinder': [
+        ('MMSI', 'MMSI', None, 'int'),
+        ('timestamp', 'TIMESTAMP', 0, 'epoch'),
+        ('lat', 'LAT', 0, 'float'),
+        ('lon', 'LON', 0, 'float'),
+        ('SOG', 'SPEED', 0, 'float'),
+        ('COG', 'COURSE', 0, 'float'),
+        ('heading', 'HEADING', 0, 'float'),
+        ('vessel_name', 'NAME', 'Unknown', 'raw'),
+        ('vessel_type', 'TYPE', 0, 'raw')
+    ]
+}
+
+AISSTREAM_FIELDS = [
+    ('lat', 'Latitude', None, 'float'),
+    ('lon', 'Longitude', None, 'float'),
+    ('SOG', 'Sog', 0, 'float'),
+    ('COG', 'Cog', 0, 'float'),
+    ('heading', 'TrueHeading', 0, 'float')
+]
+
+AISSTREAM_METADATA_FIELDS = [
+    ('MMSI', 'MMSI', None, 'int'),
+    ('vessel_name', 'ShipName', 'Unknown', 'raw'),
+    ('vessel_type', 'ShipType', 0, 'raw')
+]
+
+OUTPUT_COLUMNS = ['MMSI', 'timestamp', 'lat', 'lon', 'SOG', 'COG', 'heading', 'vessel_name', 'vessel_type']
+
+def json_loads(backend='auto'):
+    """JSON parser for the requested backend ('auto' prefers orjson when installed)"""
+    if backend == 'orjson' or (backend == 'auto' and orjson is not None):
+        if orjson is None:
+            raise ImportError("orjson not installed. Install with: pip install orjson")
+        return orjson.loads
+    if backend not in ('auto', 'json'):
+        raise ValueError(f"Unknown JSON backend: {backend}")
+    return json.loads
+
+def _utc_offset(seconds):
+    """Local UTC offset in seconds at an epoch instant"""
+    instant = int(seconds)
+    local = datetime.fromtimestamp(instant)
+    utc = datetime.fromtimestamp(instant, timezone.utc).replace(tzinfo=None)
+    return int((local - utc).total_seconds())
+
+def local_datetimes(seconds):
+    """Vectorized ``datetime.fromtimestamp`` for integer epoch seconds
+    
+    Returns naive local times like the per-record parsers did. Batches that
+    span a DST change fall back to one offset lookup per distinct second.
+    """
+    seconds = np.asarray(seconds, dtype='int64')
+    if len(seconds) == 0:
+        return pd.to_datetime(seconds, unit='s')
+    
+    lo, hi = seconds.min(), seconds.max()
+    offset = _utc_offset(lo)
+    if hi - lo <= 86400 and _utc_offset(hi) == offset:
+        offsets = offset
+    else:
+        unique, inverse = np.unique(seconds, return_inverse=True)
+        offsets = np.array([_utc_offset(s) for s in unique], dtype='int64')[inverse]
+    return pd.to_datetime(seconds + offsets, unit='s')
+
+def _convert(raw, fields):
+    """Convert raw payload columns; returns converted columns and a row validity mask"""
+    columns = {}
+    valid = np.ones(len(raw), dtype=bool)
+    
+    for output, key, default, kind in fields:
+        values = raw[key]
+        missing = values.isna().to_numpy()
+        
+        if kind == 'raw':
+            columns[output] = values.where(~missing, default) if default is not None else values
+            continue
+        
+        if kind == 'datetime':
+            converted = pd.to_datetime(values, format='%Y-%m-%d %H:%M:%S', errors='coerce')
+            valid &= converted.notna().to_numpy()
+            columns[output] = converted
+            continue
+        
+        numeric = pd.to_numeric(values, errors='coerce').to_numpy(dtype='float64')
+        if default is not None:
+            numeric = np.where(missing, default, numeric)
+        valid &= ~np.isnan(numeric)
+        
+        if kind == 'float':
+            columns[output] = numeric
+        elif kind == 'int':
+            columns[output] = np.nan_to_num(numeric).astype('int64')
+        elif kind == 'epoch':
+            columns[output] = np.nan_to_num(numeric).astype('int64')
+    
+    return columns, valid
+
+def decode_records(records, fields):
+    """Decode a list of per-vessel JSON objects into a DataFrame in one columnar pass
+    
+    Missing or null values take the field default; rows with unparseable
+    values are dropped.
+    """
+    if not records:
+        return pd.DataFrame()
+    
+    raw = pd.DataFrame.from_records(records, columns=[key for _, key, _, _ in fields])
+    columns, valid = _convert(raw, fields)
+    
+    for output, _, _, kind in fields:
+        if kind == 'epoch':
+            # Only valid seconds are converted; invalid rows are dropped below
+            seconds = np.where(valid, columns[output], 0)
+            columns[output] = local_datetimes(seconds)
+    
+    df = pd.DataFrame({output: columns[output] for output, _, _, _ in fields})
+    if not valid.all():
+        logger.debug(f"Dropped {(~valid).sum()} unparseable vessel records")
+        df = df[valid].reset_index(drop=True)
+    return df
+
+def _vessel_list(provider, data):
+    """Locate the list of vessel objects inside a parsed provider payload"""
+    if provider == 'vesselfinder':
+        return data.get('vessels', []) if isinstance(data, dict) else []
+    if not isinstance(data, list) or not data:
+        return []
+    if provider == 'aishub':
+        # [[vessels]] or [header, [vessels]]
+        for item in data:
+            if isinstance(item, list):
+                return item
+    return data
+
+def decode_payload(provider, payload, backend='auto'):
+    """Decode a raw HTTP payload (bytes or str) of a provider into a DataFrame"""
+    data = json_loads(backend)(payload)
+    return decode_records(_vessel_list(provider, data), PROVIDER_FIELDS[provider])
+
+def _parse_messages(messages, loads):
+    """Parse a batch of JSON messages with one parser call when possible"""
+    if not messages:
+        return []
+    
+    if isinstance(messages[0], bytes):
+        batch = b'[' + b','.join(messages) + b']'
+    else:
+        batch = '[' + ','.join(messages) + ']'
+    
+    try:
+        return loads(batch)
+    except ValueError:
+        # A malformed message spoils the joined batch; parse one by one
+        parsed = []
+        for message in messages:
+            try:
+                parsed.append(loads(message))
+            except ValueError:
+                continue
+        return parsed
+
+def decode_aisstream(messages, bbox, backend='auto'):
+    """Decode a batch of AIS Stream WebSocket messages into position reports
+    
+    Non-position messages and reports outside the bounding box are dropped.
+    Timestamps are read from MetaData.time_utc; unparseable ones fall back
+    to the current time.
+    """
+    reports, metadata, times = [], [], []
+    for data in _parse_messages(messages, json_loads(backend)):
+        message = data.get('Message') if isinstance(data, dict) else None
+        if not message or 'PositionReport' not in message:
+            continue
+        meta = data.get('MetaData') or {}
+        reports.append(message['PositionReport'])
+        metadata.append(meta)
+        times.append(meta.get('time_utc'))
+    
+    if not reports:
+        return pd.DataFrame()
+    
+    position, valid = _convert(
+        pd.DataFrame.from_records(reports, columns=[f[1] for f in AISSTREAM_FIELDS]), AISSTREAM_FIELDS
+    )
+    meta_columns, meta_valid = _convert(
+        pd.DataFrame.from_records(metadata, columns=[f[1] for f in AISSTREAM_METADATA_FIELDS]),
+        AISSTREAM_METADATA_FIELDS
+    )
+    
+    # "2024-01-01 12:00:00.123456789 +0000 UTC" -> first 19 characters
+    timestamp = pd.to_datetime(pd.Series(times, dtype='object').str.slice(0, 19),
+                               format='%Y-%m-%d %H:%M:%S', errors='coerce')
+    timestamp = timestamp.fillna(pd.Timestamp(datetime.now()))
+    
+    lat, lon = position['lat'], position['lon']
+    in_bbox = (lat >= bbox[0]) & (lat <= bbox[2]) & (lon >= bbox[1]) & (lon <= bbox[3])
+    
+    columns = {**position, **meta_columns, 'timestamp': timestamp.to_numpy()}
+    df = pd.DataFrame({col: columns[col] for col in OUTPUT_COLUMNS})
+    keep = valid & meta_valid & in_bbox
+    return df[keep].reset_index(drop=True) if not keep.all() else df
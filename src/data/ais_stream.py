@@ -0,0 +1,177 @@
+"""
+Persistent AIS Stream consumer
+Keeps one WebSocket subscription open in a background thread and buffers
+raw messages until the monitoring cycle drains and decodes them in a batch
+"""
+import json
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src.utils.logger import setup_logger
+from src.data.ais_decoders import decode_aisstream
+
+logger = setup_logger(__name__, "logs/ais_api.log")
+
+
+class AISStreamConsumer:
+    """Long-lived AIS Stream subscription feeding a bounded ring buffer
+    
+    The consumer runs its own asyncio loop in a daemon thread, reconnects
+    with exponential backoff (with jitter) when the connection drops, and
+    appends raw messages to a ``deque(maxlen=buffer_size)``. When the buffer
+    is full the oldest messages are overwritten. ``drain`` never blocks and
+    decodes everything it takes out in one batch.
+    """
+    
+    def __init__(self, api_key, bbox, ws_url="wss://stream.aisstream.io/v0/stream",
+                 buffer_size=100000, backoff_initial=1.0, backoff_max=60.0, json_backend='auto'):
+        self.api_key = api_key
+        self.bbox = list(bbox)
+        self.ws_url = ws_url
+        self.buffer = deque(maxlen=buffer_size)
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.json_backend = json_backend
+        
+        self.received = 0
+        self.dropped = 0
+        self.connects = 0
+        self.connected = False
+        self.last_error = None
+        
+        self._loop = None
+        self._stop = None
+        self._thread = None
+    
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self):
+        """Start the background consumer thread (no-op if already running)"""
+        if self.running:
+            return self
+        
+        ready = threading.Event()
+        
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._stop = asyncio.Event()
+            ready.set()
+            try:
+                self._loop.run_until_complete(self._consume())
+            finally:
+                self._loop.close()
+        
+        self._thread = threading.Thread(target=run, name='aisstream-consumer', daemon=True)
+        self._thread.start()
+        ready.wait()
+        logger.info(f"Started AIS Stream consumer for bbox {self.bbox} ({self.ws_url})")
+        return self
+    
+    def stop(self, timeout=5.0):
+        """Signal the consumer to close its connection and wait for the thread"""
+        if not self.running:
+            return
+        self._loop.call_soon_threadsafe(self._stop.set)
+        self._thread.join(timeout)
+        logger.info(f"Stopped AIS Stream consumer ({self.received} messages received, {self.dropped} dropped)")
+    
+    def wait_for_data(self, timeout):
+        """Block up to ``timeout`` seconds until at least one message is buffered"""
+        deadline = time.monotonic() + timeout
+        while not self.buffer and self.running and time.monotonic() < deadline:
+            time.sleep(0.1)
+        return len(self.buffer) > 0
+    
+    def drain(self, max_items=None):
+        """Remove buffered messages and return their position reports as a DataFrame"""
+        messages = []
+        limit = len(self.buffer) if max_items is None else min(max_items, len(self.buffer))
+        for _ in range(limit):
+            try:
+                messages.append(self.buffer.popleft())
+            except IndexError:
+                break
+        return decode_aisstream(messages, self.bbox, backend=self.json_backend)
+    
+    def stats(self):
+        """Connection and buffer counters"""
+        return {
+            'connected': self.connected,
+            'connects': self.connects,
+            'received': self.received,
+            'dropped': self.dropped,
+            'buffered': len(self.buffer),
+            'last_error': self.last_error
+        }
+    
+    async def _consume(self):
+        try:
+            import websockets
+        except ImportError:
+            self.last_error = "websockets package not installed"
+            logger.error("websockets package not installed. Install with: pip install websockets")
+            return
+        
+        backoff = self.backoff_initial
+        subscribe_message = json.dumps({
+            "APIKey": self.api_key,
+            # AIS Stream uses [[lon_min, lat_min], [lon_max, lat_max]]
+            "BoundingBoxes": [[
+                [self.bbox[1], self.bbox[0]],
+                [self.bbox[3], self.bbox[2]]
+            ]]
+        })
+        
+        while not self._stop.is_set():
+            try:
+                async with websockets.connect(self.ws_url) as websocket:
+                    await websocket.send(subscribe_message)
+                    self.connected = True
+                    self.connects += 1
+                    logger.info(f"Subscribed to AIS Stream for bbox: {self.bbox}")
+                    
+                    stop_task = asyncio.ensure_future(self._stop.wait())
+                    try:
+                        while not self._stop.is_set():
+                            recv_task = asyncio.ensure_future(websocket.recv())
+                            done, _ = await asyncio.wait(
+                                {recv_task, stop_task}, return_when=asyncio.FIRST_COMPLETED
+                            )
+                            if recv_task not in done:
+                                recv_task.cancel()
+                                break
+                            self._append(recv_task.result())
+                            # Only a connection that delivers data resets the backoff
+                            backoff = self.backoff_initial
+                    finally:
+                        stop_task.cancel()
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning(f"AIS Stream connection lost: {e}; reconnecting in {backoff:.1f}s")
+            finally:
+                self.connected = False
+            
+            if self._stop.is_set():
+                break
+            
+            # Exponential backoff with jitter, interrupted early by stop()
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=backoff * random.uniform(0.5, 1.0))
+            except asyncio.TimeoutError:
+                pass
+            backoff = min(backoff * 2, self.backoff_max)
+    
+    def _append(self, message):
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+        self.buffer.append(message)
+        self.received += 1
@@ -1,5 +1,4 @@
 """Rule-based baseline for comparison"""
-import pandas as pd
 import numpy as np
 from pathlib import Path
 import sys
@@ -7,12 +6,17 @@ sys.path.append(str(Path(__file__).parent.parent.parent))
 
 from src.utils.config_loader import load_config
 from src.utils.logger import setup_logger
+from src.utils.storage import StageStore
 
 logger = setup_logger(__name__, "logs/evaluation.log")
 
 class RuleBasedDetector:
     """Traditional rule-based anomaly detection"""
     
+    # Columns needed to apply the rules and report detections
+    INPUT_COLUMNS = ['MMSI', 'timestamp', 'lat', 'lon', 'SOG', 'time_gap',
+                     'fishing_speed', 'position_jump', 'loitering']
+    
     def __init__(self, config):
         self.config = config
         
@@ -54,14 +58,15 @@ class RuleBasedDetector:
         
         return df
 
-def main():
-    """Run rule-based baseline"""
-    config = load_config()
+def run_stage(config, df=None, stage='ais_all_features'):
+    """Rule-based predictions for ``df`` (or a feature stage), saved to outputs/"""
     detector = RuleBasedDetector(config)
     
-    # Load features
-    input_path = Path(config.get('data', 'output_dir')) / "ais_all_features.csv"
-    df = pd.read_csv(input_path, parse_dates=['timestamp'])
+    # Load features (only the rule inputs; a subset never aliases the caller's frame)
+    if df is None:
+        df = StageStore(config).load(stage, columns=RuleBasedDetector.INPUT_COLUMNS)
+    else:
+        df = df[[col for col in RuleBasedDetector.INPUT_COLUMNS if col in df.columns]].copy()
     
     # Detect anomalies
     df = detector.detect_anomalies(df)
@@ -69,8 +74,14 @@ def main():
     # Save results
     output_path = Path("outputs") / "rule_based_predictions.csv"
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    df[['MMSI', 'timestamp', 'lat', 'lon', 'rule_anomaly']].to_csv(output_path, index=False)
+    predictions = df[['MMSI', 'timestamp', 'lat', 'lon', 'rule_anomaly']]
+    predictions.to_csv(output_path, index=False)
     logger.info(f"Saved rule-based predictions to {output_path}")
+    return predictions
+
+def main():
+    """Run rule-based baseline"""
+    run_stage(load_config())
 
 if __name__ == "__main__":
     main()
@@ -14,6 +14,7 @@ sys.path.append(str(Path(__file__).parent.parent.parent))
 
 from src.utils.config_loader import load_config
 from src.utils.logger import setup_logger
+from src.utils.storage import StageStore
 
 logger = setup_logger(__name__, "logs/evaluation.log")
 
@@ -251,6 +252,8 @@ class ComprehensiveEvaluator:
         self._generate_summary_report(comparison_df)
         
         logger.info(f"Comprehensive evaluation complete. Results saved to {self.output_dir}")
+        
+        return comparison_df
     
     def _generate_summary_report(self, comparison_df):
         """Generate text summary report"""
@@ -297,8 +300,7 @@ def main():
     evaluator = ComprehensiveEvaluator(config)
     
     # Load data
-    features_path = Path(config.get('data', 'output_dir')) / "ais_all_features.csv"
-    df = pd.read_csv(features_path)
+    df = StageStore(config).load('ais_all_features', columns=['anomaly'])
     y_true = df['anomaly'].values
     
     # Load predictions from different models
@@ -13,6 +13,7 @@ sys.path.append(str(Path(__file__).parent.parent.parent))
 
 from src.utils.config_loader import load_config
 from src.utils.logger import setup_logger
+from src.utils.storage import StageStore
 
 logger = setup_logger(__name__, "logs/evaluation.log")
 
@@ -132,21 +133,22 @@ class ModelEvaluator:
         
         return ml_metrics, rule_metrics
 
-def main():
-    """Run evaluation"""
-    config = load_config()
+def run_stage(config, ml_df=None, rule_df=None, labels=None):
+    """Evaluate ML and rule-based predictions against the training labels
+    
+    Predictions default to the CSVs in outputs/ and labels (a frame with an
+    ``anomaly`` column in prediction order) to the ais_all_features stage.
+    """
     evaluator = ModelEvaluator(config)
     
     # Load predictions
-    ml_pred_path = Path("outputs/anomaly_predictions.csv")
-    rule_pred_path = Path("outputs/rule_based_predictions.csv")
-    
-    ml_df = pd.read_csv(ml_pred_path)
-    rule_df = pd.read_csv(rule_pred_path)
+    if ml_df is None:
+        ml_df = pd.read_csv(Path("outputs/anomaly_predictions.csv"))
+    if rule_df is None:
+        rule_df = pd.read_csv(Path("outputs/rule_based_predictions.csv"))
     
     # Load ground truth (using synthetic labels from training)
-    features_path = Path(config.get('data', 'output_dir')) / "ais_all_features.csv"
-    df = pd.read_csv(features_path)
+    df = labels if labels is not None else StageStore(config).load('ais_all_features', columns=['anomaly'])
     
     # Align data
     y_true = df['anomaly'].values[:len(ml_df)]
@@ -155,7 +157,11 @@ def main():
     rule_pred = rule_df['rule_anomaly'].values[:len(ml_df)]
     
     # Generate report
-    evaluator.generate_report(y_true, ml_pred, rule_pred, ml_proba)
+    return evaluator.generate_report(y_true, ml_pred, rule_pred, ml_proba)
+
+def main():
+    """Run evaluation"""
+    run_stage(load_config())
 
 if __name__ == "__main__":
     main()
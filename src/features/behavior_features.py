@@ -1,4 +1,3 @@
-import pandas as pd
 import numpy as np
 from pathlib import Path
 import sys
@@ -6,6 +5,11 @@ sys.path.append(str(Path(__file__).parent.parent.parent))
 
 from src.utils.config_loader import load_config
 from src.utils.logger import setup_logger
+from src.utils.storage import StageStore
+from src.features.kernels import (
+    angle_diff, course_change, haversine_km, resolve_backend, rolling_track_stats, window_radius_counts,
+    weighted_window_radius_counts, point_weights, step_weights
+)
 
 logger = setup_logger(__name__, "logs/features.log")
 
@@ -17,76 +21,86 @@ class BehaviorFeatureExtractor:
         self.loitering_time = config.get('features', 'behavior', 'loitering_time_hours', default=2)
         self.fishing_speed_min = config.get('features', 'behavior', 'fishing_speed_min', default=1)
         self.fishing_speed_max = config.get('features', 'behavior', 'fishing_speed_max', default=5)
+        self.kernel_backend = resolve_backend(config)
+    
+    def rolling(self, values, starts=None, stats=('mean',), weights=None):
+        """Trailing ``speed_window`` statistics of one track (or of sorted tracks)"""
+        return rolling_track_stats(np.asarray(values, dtype=float), starts, self.speed_window,
+                                   stats=stats, backend=self.kernel_backend, weights=weights)
     
     def calculate_speed_features(self, group):
         """Calculate speed-based features"""
-        group['speed_mean'] = group['SOG'].rolling(window=self.speed_window, min_periods=1).mean()
-        group['speed_std'] = group['SOG'].rolling(window=self.speed_window, min_periods=1).std()
+        speed = self.rolling(group['SOG'], stats=('mean', 'std', 'max', 'min'), weights=point_weights(group))
+        group['speed_mean'] = speed['mean']
+        group['speed_std'] = speed['std']
         group['speed_variance'] = group['speed_std'] ** 2
-        group['speed_max'] = group['SOG'].rolling(window=self.speed_window, min_periods=1).max()
-        group['speed_min'] = group['SOG'].rolling(window=self.speed_window, min_periods=1).min()
+        group['speed_max'] = speed['max']
+        group['speed_min'] = speed['min']
         return group
     
     def calculate_course_features(self, group):
         """Calculate course and heading features"""
         # Course change (turn rate)
-        group['course_change'] = group['COG'].diff().abs()
-        group['course_change'] = group['course_change'].apply(
-            lambda x: min(x, 360 - x) if pd.notna(x) else x
-        )
-        group['turn_rate'] = group['course_change'].rolling(window=self.speed_window, min_periods=1).mean()
+        group['course_change'] = course_change(group['COG'].to_numpy(dtype=float))
+        # Per report: on compressed tracks a course change spans several reports
+        weights = point_weights(group)
+        steps = None if weights is None else step_weights(weights)
+        turn = group['course_change'].to_numpy(dtype=float)
+        group['turn_rate'] = self.rolling(turn if steps is None else turn / steps, weights=steps)['mean']
         
         # Heading deviation
         if 'heading' in group.columns:
-            group['heading_deviation'] = (group['heading'] - group['COG']).abs()
-            group['heading_deviation'] = group['heading_deviation'].apply(
-                lambda x: min(x, 360 - x) if pd.notna(x) else x
-            )
+            group['heading_deviation'] = angle_diff(group['heading'].to_numpy(dtype=float),
+                                                    group['COG'].to_numpy(dtype=float))
         
         return group
 
     def calculate_distance(self, lat1, lon1, lat2, lon2):
         """Calculate distance between two points using Haversine formula (km)"""
-        R = 6371  # Earth radius in km
-        
-        lat1, lon1, lat2, lon2 = map(np.radians, [lat1, lon1, lat2, lon2])
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        
-        a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
-        c = 2 * np.arcsin(np.sqrt(a))
-        
-        return R * c
+        return haversine_km(lat1, lon1, lat2, lon2)
     
     def detect_loitering(self, group):
         """Detect loitering behavior"""
-        loitering_flags = []
+        group['loitering'] = self.loitering_flags(
+            group['lat'].to_numpy(dtype=float),
+            group['lon'].to_numpy(dtype=float),
+            group['timestamp'].to_numpy(dtype='datetime64[ns]'),
+            weights=point_weights(group)
+        )
+        return group
+    
+    def loitering_flags(self, lat, lon, timestamps, weights=None, starts=None):
+        """Vectorized loitering flags for one time-sorted vessel track
         
-        for i in range(len(group)):
-            if i < self.speed_window:
-                loitering_flags.append(0)
-                continue
-            
-            # Check if vessel stayed within radius for extended time
-            window = group.iloc[max(0, i-self.speed_window):i+1]
-            
-            # Calculate distances from current position
-            distances = self.calculate_distance(
-                window['lat'].iloc[-1], window['lon'].iloc[-1],
-                window['lat'].values, window['lon'].values
+        Every point from index ``speed_window`` onwards is checked against the
+        trailing window of ``speed_window + 1`` positions ending at it. With
+        ``weights`` (compressed tracks, optionally several sorted by vessel
+        with ``starts``) the window covers ``speed_window + 1`` reports, not
+        rows, so a sparse anchorage track is not judged over hours more.
+        """
+        n = len(lat)
+        flags = np.zeros(n, dtype=int)
+        window_len = self.speed_window + 1
+        if weights is not None:
+            within_radius, time_span = weighted_window_radius_counts(
+                lat, lon, timestamps, weights, window_len, self.loitering_radius, starts
             )
-            
-            # Check if all points within radius
-            within_radius = (distances <= self.loitering_radius).sum()
-            time_span = (window['timestamp'].iloc[-1] - window['timestamp'].iloc[0]).total_seconds() / 3600
-            
-            if within_radius >= len(window) * 0.8 and time_span >= self.loitering_time:
-                loitering_flags.append(1)
-            else:
-                loitering_flags.append(0)
+            return ((within_radius >= window_len * 0.8) & (time_span >= self.loitering_time)).astype(int)
+        if n < window_len:
+            return flags
         
-        group['loitering'] = loitering_flags
-        return group
+        # Positions of each window within the radius of its last position. Always
+        # NumPy: numba's scalar trig can differ in the last ulp near the radius,
+        # and these flags must match the original per-row loop exactly
+        within_radius = window_radius_counts(lat, lon, window_len, self.loitering_radius,
+                                             backend='numpy')[window_len - 1:]
+        
+        # Window duration in hours (NaT spans compare as NaN -> False)
+        span = timestamps[window_len - 1:] - timestamps[:n - window_len + 1]
+        time_span = span / np.timedelta64(1, 'ns') / 1e9 / 3600
+        
+        flags[window_len - 1:] = (within_radius >= window_len * 0.8) & (time_span >= self.loitering_time)
+        return flags
     
     def detect_fishing_speed(self, group):
         """Detect fishing speed patterns (1-5 knots)"""
@@ -96,9 +110,7 @@ class BehaviorFeatureExtractor:
         ).astype(int)
         
         # Calculate percentage of time in fishing speed
-        group['fishing_speed_pct'] = group['fishing_speed'].rolling(
-            window=self.speed_window, min_periods=1
-        ).mean()
+        group['fishing_speed_pct'] = self.rolling(group['fishing_speed'], weights=point_weights(group))['mean']
         
         return group
     
@@ -126,17 +138,16 @@ class BehaviorFeatureExtractor:
 def main():
     config = load_config()
     extractor = BehaviorFeatureExtractor(config)
+    store = StageStore(config)
     
     # Load EEZ-filtered data
-    input_path = Path(config.get('data', 'output_dir')) / "ais_eez_filtered.csv"
-    df = pd.read_csv(input_path, parse_dates=['timestamp'])
+    df = store.load('ais_eez_filtered')
     
     # Extract features
     df_features = extractor.extract_features(df)
     
     # Save features
-    output_path = Path(config.get('data', 'output_dir')) / "ais_behavior_features.csv"
-    df_features.to_csv(output_path, index=False)
+    output_path = store.save(df_features, 'ais_behavior_features')
     logger.info(f"Saved behavior features to {output_path}")
 
 if __name__ == "__main__":
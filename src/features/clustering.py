@@ -0,0 +1,164 @@
+"""Track clustering and region-wide fishing hotspot detection"""
+import pandas as pd
+import numpy as np
+from sklearn.cluster import DBSCAN
+from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__, "logs/features.log")
+
+EARTH_RADIUS_KM = 6371
+KM_PER_DEGREE = 111.32
+
+def grid_compress(lat, lon, cell_km):
+    """Snap positions to roughly square cells of ``cell_km``
+    
+    Returns the mean position of each occupied cell, the number of points in
+    it, and the cell index of every input point.
+    """
+    lat_step = cell_km / KM_PER_DEGREE
+    lat_cell = np.floor(lat / lat_step)
+    lon_step = lat_step / np.maximum(np.cos(np.radians((lat_cell + 0.5) * lat_step)), 1e-6)
+    lon_cell = np.floor(lon / lon_step)
+    
+    _, inverse, counts = np.unique(
+        np.column_stack([lat_cell, lon_cell]), axis=0, return_inverse=True, return_counts=True
+    )
+    inverse = inverse.ravel()
+    cell_lat = np.bincount(inverse, weights=lat) / counts
+    cell_lon = np.bincount(inverse, weights=lon) / counts
+    return cell_lat, cell_lon, counts, inverse
+
+def count_revisits(labels, min_gap=10):
+    """Returns to a cluster after more than ``min_gap`` reports elsewhere, summed over clusters"""
+    members = np.flatnonzero(labels != -1)
+    if len(members) < 2:
+        return 0
+    cluster = labels[members]
+    order = np.argsort(cluster, kind='stable')  # keeps time order within a cluster
+    cluster, members = cluster[order], members[order]
+    same_cluster = cluster[1:] == cluster[:-1]
+    return int(((np.diff(members) > min_gap) & same_cluster).sum())
+
+class TrackClusterer:
+    """DBSCAN over vessel positions in great-circle kilometres
+    
+    Uses a ball tree with the haversine metric. Inputs longer than
+    ``compress_above`` are grid-compressed first: occupied cells become
+    points weighted by their report count (``sample_weight``). A vessel
+    fishing in one spot then no longer produces thousands of mutual
+    neighbours; each neighbourhood holds at most the cells within ``eps``,
+    which bounds DBSCAN memory however dense the track is.
+    ``metric: degrees`` keeps the original Euclidean lat/lon clustering.
+    """
+    
+    def __init__(self, config):
+        self.config = config
+        settings = config.get('features', 'clustering', default={}) or {}
+        self.metric = settings.get('metric', 'haversine')
+        self.eps_km = settings.get('eps_km', 5.5)
+        self.eps_degrees = settings.get('eps_degrees', 0.05)
+        self.min_samples = settings.get('min_samples', 3)
+        self.compress_above = settings.get('compress_above', 5000)
+        self.grid_km = settings.get('grid_km', 0.25)
+        
+        hotspots = settings.get('hotspots', {}) or {}
+        self.hotspot_eps_km = hotspots.get('eps_km', 5.5)
+        self.hotspot_min_reports = hotspots.get('min_reports', 50)
+        self.hotspot_min_vessels = hotspots.get('min_vessels', 3)
+        self.hotspot_grid_km = hotspots.get('grid_km', 1.0)
+        
+        behavior = config.get('features', 'behavior', default={}) or {}
+        self.fishing_speed_min = behavior.get('fishing_speed_min', 1)
+        self.fishing_speed_max = behavior.get('fishing_speed_max', 5)
+    
+    def _dbscan(self, lat, lon, eps_km, min_samples, weights=None):
+        coords = np.radians(np.column_stack([lat, lon]))
+        return DBSCAN(
+            eps=eps_km / EARTH_RADIUS_KM, min_samples=min_samples,
+            metric='haversine', algorithm='ball_tree'
+        ).fit(coords, sample_weight=weights).labels_
+    
+    def _compressed_labels(self, lat, lon, eps_km, min_samples, cell_km):
+        """DBSCAN labels per point, clustering weighted grid cells for long inputs"""
+        if len(lat) <= self.compress_above:
+            return self._dbscan(lat, lon, eps_km, min_samples)
+        
+        cell_lat, cell_lon, counts, inverse = grid_compress(lat, lon, cell_km)
+        labels = self._dbscan(cell_lat, cell_lon, eps_km, min_samples, weights=counts)
+        return labels[inverse]
+    
+    def track_labels(self, lat, lon):
+        """Cluster labels (-1 = noise) for one time-ordered track"""
+        if self.metric == 'degrees':
+            return DBSCAN(eps=self.eps_degrees, min_samples=self.min_samples).fit(
+                np.column_stack([lat, lon])
+            ).labels_
+        return self._compressed_labels(lat, lon, self.eps_km, self.min_samples, self.grid_km)
+    
+    def vessel_table(self, df):
+        """spatial_clusters, cluster_time_ratio and cluster_revisits per MMSI"""
+        mmsi = df['MMSI'].to_numpy()
+        order = np.lexsort((df['timestamp'].to_numpy(), mmsi))
+        mmsi = mmsi[order]
+        lat = df['lat'].to_numpy(dtype=float)[order]
+        lon = df['lon'].to_numpy(dtype=float)[order]
+        
+        starts = np.flatnonzero(np.r_[True, mmsi[1:] != mmsi[:-1]])
+        ends = np.r_[starts[1:], len(mmsi)]
+        
+        rows = np.zeros((len(starts), 3))
+        for i, (start, end) in enumerate(zip(starts, ends)):
+            if end - start <= 5:
+                continue
+            labels = self.track_labels(lat[start:end], lon[start:end])
+            clustered = labels != -1
+            rows[i] = (len(np.unique(labels[clustered])), clustered.mean(), count_revisits(labels))
+        
+        table = pd.DataFrame(rows, index=pd.Index(mmsi[starts], name='MMSI'),
+                             columns=['spatial_clusters', 'cluster_time_ratio', 'cluster_revisits'])
+        return table.astype({'spatial_clusters': 'int64', 'cluster_revisits': 'int64'})
+    
+    def hotspots(self, df):
+        """Fishing hotspots shared by several vessels across the whole region
+        
+        Clusters fishing-speed reports of all vessels together and keeps
+        clusters visited by at least ``min_vessels`` distinct vessels.
+        Returns the hotspot table and a hotspot id per report (-1 outside).
+        """
+        hotspot_ids = np.full(len(df), -1, dtype='int64')
+        columns = ['hotspot_id', 'lat', 'lon', 'reports', 'vessels']
+        
+        fishing = df['SOG'].between(self.fishing_speed_min, self.fishing_speed_max).to_numpy()
+        if fishing.sum() < self.hotspot_min_reports:
+            return pd.DataFrame(columns=columns), hotspot_ids
+        
+        lat = df['lat'].to_numpy(dtype=float)[fishing]
+        lon = df['lon'].to_numpy(dtype=float)[fishing]
+        mmsi = df['MMSI'].to_numpy()[fishing]
+        
+        labels = self._compressed_labels(
+            lat, lon, self.hotspot_eps_km, self.hotspot_min_reports, self.hotspot_grid_km
+        )
+        clustered = labels != -1
+        summary = pd.DataFrame({
+            'label': labels[clustered], 'MMSI': mmsi[clustered],
+            'lat': lat[clustered], 'lon': lon[clustered]
+        }).groupby('label').agg(
+            lat=('lat', 'mean'), lon=('lon', 'mean'),
+            reports=('MMSI', 'size'), vessels=('MMSI', 'nunique')
+        )
+        summary = summary[summary['vessels'] >= self.hotspot_min_vessels]
+        
+        # Renumber shared hotspots 0..k-1 by activity
+        summary = summary.sort_values('reports', ascending=False)
+        relabel = np.full(labels.max() + 2, -1, dtype='int64')
+        relabel[summary.index.to_numpy()] = np.arange(len(summary))
+        hotspot_ids[fishing] = relabel[labels]
+        
+        table = summary.reset_index(drop=True).rename_axis('hotspot_id').reset_index()
+        logger.info(f"Found {len(table)} shared fishing hotspots from {fishing.sum()} fishing-speed reports")
+        return table[columns], hotspot_ids
@@ -6,37 +6,59 @@ sys.path.append(str(Path(__file__).parent.parent.parent))
 
 from src.utils.config_loader import load_config
 from src.utils.logger import setup_logger
+from src.utils.storage import StageStore
+from src.utils.schema import apply_schema
 from src.features.behavior_features import BehaviorFeatureExtractor
 from src.features.transmission_features import TransmissionFeatureExtractor
+from src.features.fused_features import FusedFeatureExtractor
+from src.features.parallel import resolve_workers, run_sharded
 
 logger = setup_logger(__name__, "logs/features.log")
 
-def main():
-    """Run complete feature extraction pipeline"""
-    config = load_config()
+def extract_shard(config, df):
+    """Extract behavior and transmission features for a set of vessels"""
+    engine = config.get('features', 'engine', default='fused')
     
-    # Load EEZ-filtered data
-    input_path = Path(config.get('data', 'output_dir')) / "ais_eez_filtered.csv"
-    logger.info(f"Loading data from {input_path}")
-    df = pd.read_csv(input_path, parse_dates=['timestamp'])
+    if engine == 'fused':
+        # Behavior + transmission features in a single sorted pass
+        fused_extractor = FusedFeatureExtractor(config)
+        return fused_extractor.extract_features(df)
     
-    # Extract behavior features
-    logger.info("=" * 50)
-    logger.info("BEHAVIOR FEATURES")
-    logger.info("=" * 50)
     behavior_extractor = BehaviorFeatureExtractor(config)
     df = behavior_extractor.extract_features(df)
     
-    # Extract transmission features
+    transmission_extractor = TransmissionFeatureExtractor(config)
+    return transmission_extractor.extract_features(df)
+
+def extract_all_features(df, config, n_workers=None):
+    """Extract features serially or across MMSI shards in a process pool"""
+    n_workers = resolve_workers(config, n_workers)
+    
     logger.info("=" * 50)
-    logger.info("TRANSMISSION FEATURES")
+    logger.info(f"BEHAVIOR + TRANSMISSION FEATURES ({n_workers} workers)")
     logger.info("=" * 50)
-    transmission_extractor = TransmissionFeatureExtractor(config)
-    df = transmission_extractor.extract_features(df)
+    
+    if n_workers == 1:
+        return apply_schema(extract_shard(config, df), config)
+    
+    # Each vessel lives in one shard and shards come back sorted by vessel,
+    # so a stable sort on MMSI reproduces the serial row order
+    results = run_sharded(df, extract_shard, config, n_workers)
+    return apply_schema(pd.concat(results).sort_values('MMSI', kind='stable'), config)
+
+def run_stage(config, df=None):
+    """Behavior and transmission features of ``df`` (or the ais_eez_filtered stage) into ais_all_features"""
+    store = StageStore(config)
+    
+    # Load EEZ-filtered data
+    if df is None:
+        df = store.load('ais_eez_filtered')
+    
+    # Extract behavior and transmission features
+    df = extract_all_features(df, config)
     
     # Save final features
-    output_path = Path(config.get('data', 'output_dir')) / "ais_all_features.csv"
-    df.to_csv(output_path, index=False)
+    output_path = store.save(df, 'ais_all_features')
     logger.info(f"Saved all features to {output_path}")
     
     # Print feature summary
@@ -47,6 +69,13 @@ def main():
     logger.info(f"Total vessels: {df['MMSI'].nunique()}")
     logger.info(f"Total features: {len(df.columns)}")
     logger.info(f"Feature columns: {list(df.columns)}")
+    
+    df.index = pd.RangeIndex(len(df))
+    return df
+
+def main():
+    """Run complete feature extraction pipeline"""
+    run_stage(load_config())
 
 if __name__ == "__main__":
     main()
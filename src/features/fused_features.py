@@ -0,0 +1,146 @@
+"""Single-pass behavior and transmission feature extraction"""
+import numpy as np
+from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src.utils.logger import setup_logger
+from src.features.behavior_features import BehaviorFeatureExtractor
+from src.features.transmission_features import TransmissionFeatureExtractor
+from src.features.kernels import (
+    track_starts, track_diff, course_change, angle_diff, time_gaps_minutes,
+    gap_flags, step_distances_km, position_jump_flags, rolling_track_stats, point_weights,
+    step_weights
+)
+
+logger = setup_logger(__name__, "logs/features.log")
+
+class FusedFeatureExtractor:
+    """Compute behavior and transmission features in one pass over the frame
+    
+    The frame is sorted once by (MMSI, timestamp) and every column is derived
+    with per-track kernels over the whole frame, producing the
+    same columns as running BehaviorFeatureExtractor followed by
+    TransmissionFeatureExtractor. Rows of compressed tracks are weighted
+    by their ``point_weight`` in the rolling means, sums and deviations.
+    """
+    
+    TRANSMISSION_WINDOW = 20
+    
+    def __init__(self, config):
+        self.config = config
+        self.behavior = BehaviorFeatureExtractor(config)
+        self.transmission = TransmissionFeatureExtractor(config)
+        self.speed_window = self.behavior.speed_window
+        self.max_gap_minutes = self.transmission.max_gap_minutes
+        self.kernel_backend = self.behavior.kernel_backend
+    
+    def sort_tracks(self, df):
+        """Order rows by (MMSI, timestamp), skipping the sort if already ordered"""
+        mmsi = df['MMSI'].to_numpy()
+        timestamps = df['timestamp'].to_numpy()
+        # Compare neighbours rather than np.diff: differences of unsigned MMSIs wrap around
+        new_vessel = mmsi[1:] != mmsi[:-1]
+        already_sorted = (
+            (mmsi[1:] >= mmsi[:-1]).all() and
+            ((np.diff(timestamps) >= np.timedelta64(0)) | new_vessel).all()
+        )
+        if already_sorted:
+            # Shallow copy so new columns never leak into the caller's frame
+            return df.copy(deep=False)
+        return df.sort_values(['MMSI', 'timestamp'], kind='stable')
+    
+    def _rolling(self, values, starts, window, stats=('mean',), weights=None):
+        """Per-vessel trailing window statistics over a frame sorted by vessel"""
+        return rolling_track_stats(np.asarray(values, dtype=float), starts, window,
+                                   stats=stats, backend=self.kernel_backend, weights=weights)
+    
+    def add_behavior_features(self, df, keys):
+        """Speed, course, loitering and fishing-speed features"""
+        w = self.speed_window
+        starts = track_starts(keys.to_numpy())
+        weights = point_weights(df)
+        
+        speed = self._rolling(df['SOG'], starts, w, stats=('mean', 'std', 'max', 'min'), weights=weights)
+        df['speed_mean'] = speed['mean']
+        df['speed_std'] = speed['std']
+        df['speed_variance'] = df['speed_std'] ** 2
+        df['speed_max'] = speed['max']
+        df['speed_min'] = speed['min']
+        
+        df['course_change'] = course_change(df['COG'].to_numpy(dtype=float), starts)
+        turn = df['course_change'].to_numpy(dtype=float)
+        steps = None if weights is None else step_weights(weights, starts)
+        df['turn_rate'] = self._rolling(turn if steps is None else turn / steps, starts, w,
+                                        weights=steps)['mean']
+        
+        if 'heading' in df.columns:
+            df['heading_deviation'] = angle_diff(df['heading'].to_numpy(dtype=float),
+                                                 df['COG'].to_numpy(dtype=float))
+        
+        # Windows that start inside a vessel's track never span two vessels
+        # (weighted windows stop at track starts themselves)
+        flags = self.behavior.loitering_flags(
+            df['lat'].to_numpy(dtype=float),
+            df['lon'].to_numpy(dtype=float),
+            df['timestamp'].to_numpy(dtype='datetime64[ns]'),
+            weights=weights, starts=starts
+        )
+        if weights is None:
+            flags[df.groupby(keys, sort=False).cumcount().to_numpy() < w] = 0
+        df['loitering'] = flags
+        
+        df['fishing_speed'] = (
+            (df['SOG'] >= self.behavior.fishing_speed_min) &
+            (df['SOG'] <= self.behavior.fishing_speed_max)
+        ).astype(int)
+        df['fishing_speed_pct'] = self._rolling(df['fishing_speed'], starts, w, weights=weights)['mean']
+        
+        return df
+    
+    def add_transmission_features(self, df, keys):
+        """Gap, disappearance, position-jump and regularity features"""
+        w = self.TRANSMISSION_WINDOW
+        starts = track_starts(keys.to_numpy())
+        lat = df['lat'].to_numpy(dtype=float)
+        lon = df['lon'].to_numpy(dtype=float)
+        
+        time_gap = time_gaps_minutes(df['timestamp'].to_numpy(), starts)
+        df['time_gap'] = time_gap
+        df['ais_gap'] = gap_flags(time_gap, self.max_gap_minutes)
+        
+        # On compressed tracks a step spans several original report intervals
+        weights = point_weights(df)
+        steps = None if weights is None else step_weights(weights, starts)
+        df['gap_count'] = self._rolling(df['ais_gap'], starts, w, stats=('sum',), weights=steps)['sum']
+        
+        report_gap = time_gap if steps is None else time_gap / steps
+        gap_window = self._rolling(report_gap, starts, w, stats=('mean', 'std'), weights=steps)
+        df['avg_gap_duration'] = gap_window['mean']
+        
+        df['disappeared'] = gap_flags(time_gap, self.max_gap_minutes * 2)
+        
+        df['lat_diff'] = track_diff(lat, starts)
+        df['lon_diff'] = track_diff(lon, starts)
+        
+        # Haversine distance to the previous report of the same vessel
+        distance = step_distances_km(lat, lon, starts, backend=self.kernel_backend)
+        df['position_jump'] = position_jump_flags(distance, time_gap)
+        
+        df['gap_std'] = gap_window['std']
+        df['transmission_freq'] = 60 / df['avg_gap_duration']
+        
+        return df
+    
+    def extract_features(self, df):
+        """Extract all behavior and transmission features"""
+        logger.info("Extracting behavior and transmission features (single pass)...")
+        
+        df = self.sort_tracks(df)
+        keys = df['MMSI']
+        
+        df = self.add_behavior_features(df, keys)
+        df = self.add_transmission_features(df, keys)
+        
+        logger.info(f"Extracted features for {df['MMSI'].nunique()} vessels")
+        return df
@@ -0,0 +1,245 @@
+"""Incremental behavior and transmission features for live AIS streams"""
+import math
+import pandas as pd
+from collections import deque
+from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src.utils.logger import setup_logger
+from src.utils.schema import apply_schema
+from src.features.behavior_features import BehaviorFeatureExtractor
+from src.features.transmission_features import TransmissionFeatureExtractor
+from src.features.fused_features import FusedFeatureExtractor
+
+logger = setup_logger(__name__, "logs/features.log")
+
+EARTH_RADIUS_KM = 6371
+MAX_SPEED_KMH = 50 * 1.852  # 50 knots to km/h
+
+def _haversine(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+def _haversine_radians(lat1, lon1, cos_lat1, lat2, lon2, cos_lat2):
+    """Haversine distance (km) for coordinates already in radians"""
+    a = math.sin((lat2 - lat1) / 2) ** 2 + cos_lat1 * cos_lat2 * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+def _mean(values):
+    """Mean over non-NaN values (NaN if none), like rolling(min_periods=1).mean()"""
+    total, count = 0.0, 0
+    for value in values:
+        if value == value:
+            total += value
+            count += 1
+    return total / count if count else math.nan
+
+def _std(values):
+    """Sample standard deviation over non-NaN values (NaN below two values)"""
+    present = [value for value in values if value == value]
+    if len(present) < 2:
+        return math.nan
+    mean = sum(present) / len(present)
+    return math.sqrt(max(sum((value - mean) ** 2 for value in present) / (len(present) - 1), 0.0))
+
+def _angle_diff(a, b):
+    diff = abs(a - b)
+    return min(diff, 360 - diff)
+
+class VesselState:
+    """Bounded per-vessel history needed to update features for the next report"""
+    
+    __slots__ = ('sog', 'course_change', 'fishing', 'positions', 'time_gap', 'ais_gap',
+                 'last_timestamp', 'last_positions', 'last_lat', 'last_lon', 'last_cog')
+    
+    def __init__(self, speed_window, transmission_window):
+        self.sog = deque(maxlen=speed_window)
+        self.course_change = deque(maxlen=speed_window)
+        self.fishing = deque(maxlen=speed_window)
+        self.positions = deque(maxlen=speed_window + 1)
+        self.time_gap = deque(maxlen=transmission_window)
+        self.ais_gap = deque(maxlen=transmission_window)
+        self.last_timestamp = None
+        self.last_positions = set()  # (lat, lon) of every report folded in at last_timestamp
+        self.last_lat = None
+        self.last_lon = None
+        self.last_cog = None
+
+class IncrementalFeatureEngine:
+    """Update behavior and transmission features one AIS report at a time
+    
+    Keeps ring buffers of the last ``speed_window`` (behavior) and 20
+    (transmission) reports per MMSI plus the last timestamp and position, so
+    each new report costs a constant amount of work regardless of track
+    length. Reports must arrive in time order per vessel; older reports are
+    skipped, as are repeats of any report already processed at the vessel's
+    last timestamp. The resulting columns match BehaviorFeatureExtractor +
+    TransmissionFeatureExtractor run on the full track.
+    """
+    
+    def __init__(self, config):
+        self.config = config
+        behavior = BehaviorFeatureExtractor(config)
+        transmission = TransmissionFeatureExtractor(config)
+        
+        self.speed_window = behavior.speed_window
+        self.loitering_radius = behavior.loitering_radius
+        self.loitering_time = behavior.loitering_time
+        self.fishing_speed_min = behavior.fishing_speed_min
+        self.fishing_speed_max = behavior.fishing_speed_max
+        self.max_gap_minutes = transmission.max_gap_minutes
+        self.transmission_window = FusedFeatureExtractor.TRANSMISSION_WINDOW
+        self.state_ttl = pd.Timedelta(
+            hours=config.get('features', 'incremental', 'state_ttl_hours', default=24)
+        ).value
+        
+        self.vessels = {}
+        self.skipped = 0
+    
+    def update(self, mmsi, timestamp, lat, lon, sog, cog, heading=math.nan):
+        """Fold one report into the vessel's state and return its features
+        
+        Returns None for reports that are older than the vessel's last
+        processed report or repeat one already processed at that timestamp.
+        """
+        return self._update(mmsi, pd.Timestamp(timestamp).value, lat, lon, sog, cog, heading)
+    
+    def _update(self, mmsi, timestamp, lat, lon, sog, cog, heading):
+        """``update`` with the timestamp as integer nanoseconds"""
+        state = self.vessels.get(mmsi)
+        if state is None:
+            state = self.vessels[mmsi] = VesselState(self.speed_window, self.transmission_window)
+        
+        last_timestamp = state.last_timestamp
+        if last_timestamp is not None and (
+            timestamp < last_timestamp or
+            (timestamp == last_timestamp and (lat, lon) in state.last_positions)
+        ):
+            self.skipped += 1
+            return None
+        
+        w = self.speed_window
+        features = {}
+        
+        # Speed
+        state.sog.append(sog)
+        speed_std = _std(state.sog)
+        present = [value for value in state.sog if value == value]
+        features['speed_mean'] = _mean(state.sog)
+        features['speed_std'] = speed_std
+        features['speed_variance'] = speed_std ** 2
+        features['speed_max'] = max(present) if present else math.nan
+        features['speed_min'] = min(present) if present else math.nan
+        
+        # Course and heading
+        course_change = _angle_diff(cog, state.last_cog) if state.last_cog is not None else math.nan
+        state.course_change.append(course_change)
+        features['course_change'] = course_change
+        features['turn_rate'] = _mean(state.course_change)
+        features['heading_deviation'] = _angle_diff(heading, cog)
+        
+        # Loitering over the trailing speed_window + 1 positions; the distance
+        # count is only needed once the window spans the loitering time
+        lat_r, lon_r = math.radians(lat), math.radians(lon)
+        cos_lat = math.cos(lat_r)
+        state.positions.append((lat_r, lon_r, cos_lat, timestamp))
+        loitering = 0
+        if len(state.positions) == w + 1:
+            span_hours = (timestamp - state.positions[0][3]) / 1e9 / 3600
+            if span_hours >= self.loitering_time:
+                within = sum(
+                    1 for p_lat, p_lon, p_cos, _ in state.positions
+                    if _haversine_radians(lat_r, lon_r, cos_lat, p_lat, p_lon, p_cos) <= self.loitering_radius
+                )
+                loitering = int(within >= (w + 1) * 0.8)
+        features['loitering'] = loitering
+        
+        fishing = int(self.fishing_speed_min <= sog <= self.fishing_speed_max)
+        state.fishing.append(fishing)
+        features['fishing_speed'] = fishing
+        features['fishing_speed_pct'] = sum(state.fishing) / len(state.fishing)
+        
+        # Transmission gaps
+        if last_timestamp is None:
+            time_gap = lat_diff = lon_diff = math.nan
+            position_jump = 0
+        else:
+            time_gap = (timestamp - last_timestamp) / 1e9 / 60
+            lat_diff = lat - state.last_lat
+            lon_diff = lon - state.last_lon
+            distance = _haversine(state.last_lat, state.last_lon, lat, lon)
+            position_jump = int(distance > MAX_SPEED_KMH * (time_gap / 60) * 1.5)
+        
+        ais_gap = int(time_gap > self.max_gap_minutes)
+        state.time_gap.append(time_gap)
+        state.ais_gap.append(ais_gap)
+        avg_gap = _mean(state.time_gap)
+        
+        features['time_gap'] = time_gap
+        features['ais_gap'] = ais_gap
+        features['gap_count'] = float(sum(state.ais_gap))
+        features['avg_gap_duration'] = avg_gap
+        features['disappeared'] = int(time_gap > self.max_gap_minutes * 2)
+        features['lat_diff'] = lat_diff
+        features['lon_diff'] = lon_diff
+        features['position_jump'] = position_jump
+        features['gap_std'] = _std(state.time_gap)
+        features['transmission_freq'] = 60 / avg_gap if avg_gap != 0 else math.inf
+        
+        if timestamp != last_timestamp:
+            state.last_positions.clear()
+        state.last_positions.add((lat, lon))
+        state.last_timestamp = timestamp
+        state.last_lat = lat
+        state.last_lon = lon
+        state.last_cog = cog
+        return features
+    
+    def update_frame(self, df):
+        """Process new reports in time order and return them with their features
+        
+        Reports skipped by ``update`` (already processed or out of order) are
+        left out of the result.
+        """
+        if df.empty:
+            return df
+        
+        df = df.sort_values('timestamp', kind='stable')
+        has_heading = 'heading' in df.columns
+        timestamps = pd.to_datetime(df['timestamp']).to_numpy(dtype='datetime64[ns]').view('int64')
+        columns = [df['MMSI'].tolist(), timestamps.tolist()] + [
+            df[col].tolist() for col in ['lat', 'lon', 'SOG', 'COG']
+        ]
+        columns.append(df['heading'].tolist() if has_heading else [math.nan] * len(df))
+        
+        rows, kept = [], []
+        for i, values in enumerate(zip(*columns)):
+            features = self._update(*values)
+            if features is not None:
+                rows.append(features)
+                kept.append(i)
+        
+        if not kept:
+            logger.info(f"Incremental features: no new reports, {len(df)} skipped")
+            return df.iloc[:0]
+        
+        result = df.iloc[kept].copy()
+        feature_frame = pd.DataFrame(rows, index=result.index)
+        if not has_heading:
+            feature_frame = feature_frame.drop(columns=['heading_deviation'])
+        
+        self.evict(timestamps.max())
+        logger.info(f"Incremental features: {len(result)} new reports, "
+                    f"{len(df) - len(result)} skipped, {len(self.vessels)} vessels tracked")
+        return apply_schema(pd.concat([result, feature_frame], axis=1), self.config)
+    
+    def evict(self, now):
+        """Drop state of vessels silent for longer than the state TTL"""
+        now = pd.Timestamp(now).value
+        stale = [mmsi for mmsi, state in self.vessels.items()
+                 if now - state.last_timestamp > self.state_ttl]
+        for mmsi in stale:
+            del self.vessels[mmsi]
+        return len(stale)
@@ -0,0 +1,444 @@
+"""Vectorized circular-angle, gap and distance kernels for track features
+
+All kernels work on NumPy arrays of whole tracks (or of many tracks
+concatenated and sorted by vessel), so feature extractors never loop over
+rows in Python. NaN inputs propagate as NaN; comparisons against NaN are
+False, matching the pandas expressions they replace.
+
+The trajectory kernels (haversine, windowed radius checks, path statistics,
+rolling per-track statistics and dead-reckoning compression) have a numba-compiled backend and a
+pure NumPy/pandas fallback; ``backend=None`` uses numba when installed.
+"""
+import math
+import numpy as np
+import pandas as pd
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+BACKENDS = ('numba', 'numpy')
+
+EARTH_RADIUS_KM = 6371
+MAX_SPEED_KMH = 50 * 1.852  # 50 knots to km/h
+
+WEIGHT_COLUMN = 'point_weight'
+
+def point_weights(df):
+    """Reports each row stands for after trajectory compression (None if uncompressed)"""
+    if WEIGHT_COLUMN not in df.columns:
+        return None
+    return df[WEIGHT_COLUMN].to_numpy(dtype=float)
+
+def angle_diff(a, b):
+    """Smallest absolute difference between two angles in degrees (0-180)"""
+    diff = np.abs(np.asarray(a, dtype=float) - np.asarray(b, dtype=float))
+    return np.minimum(diff, 360 - diff)
+
+def wrap_angle(diff):
+    """Fold absolute angle differences in [0, 360] onto [0, 180]"""
+    diff = np.asarray(diff, dtype=float)
+    return np.minimum(diff, 360 - diff)
+
+def track_starts(keys):
+    """True at the first row of every track in an array sorted by vessel"""
+    keys = np.asarray(keys)
+    starts = np.ones(len(keys), dtype=bool)
+    starts[1:] = keys[1:] != keys[:-1]
+    return starts
+
+def track_diff(values, starts=None):
+    """Difference to the previous row of the same track (NaN at track starts)"""
+    values = np.asarray(values, dtype=float)
+    result = np.empty(len(values))
+    if len(values) == 0:
+        return result
+    result[0] = np.nan
+    np.subtract(values[1:], values[:-1], out=result[1:])
+    if starts is not None:
+        result[starts] = np.nan
+    return result
+
+def track_shift(values, starts=None):
+    """Value of the previous row of the same track (NaN at track starts)"""
+    values = np.asarray(values, dtype=float)
+    result = np.empty(len(values))
+    if len(values) == 0:
+        return result
+    result[0] = np.nan
+    result[1:] = values[:-1]
+    if starts is not None:
+        result[starts] = np.nan
+    return result
+
+def step_weights(weights, starts=None):
+    """Report intervals spanned by the step into each row of compressed tracks
+    
+    A kept row stands for itself and the reports dropped after it, so the
+    step from the previous row covers that row's weight (NaN at track starts).
+    """
+    return track_shift(weights, starts)
+
+def course_change(cog, starts=None):
+    """Turn between consecutive reports of a track in degrees (NaN at track starts)"""
+    return wrap_angle(np.abs(track_diff(cog, starts)))
+
+def time_gaps_minutes(timestamps, starts=None):
+    """Minutes since the previous report of the same track (NaN at track starts)"""
+    ns = np.asarray(timestamps, dtype='datetime64[ns]').view('int64')
+    gaps = np.empty(len(ns))
+    if len(ns) == 0:
+        return gaps
+    gaps[0] = np.nan
+    gaps[1:] = np.diff(ns) / 1e9 / 60
+    if starts is not None:
+        gaps[starts] = np.nan
+    # NaT timestamps
+    gaps[1:][(ns[1:] == np.iinfo('int64').min) | (ns[:-1] == np.iinfo('int64').min)] = np.nan
+    return gaps
+
+def gap_flags(gaps, threshold):
+    """0/1 flags for gaps longer than ``threshold`` (NaN gaps are not flagged)"""
+    return (np.asarray(gaps, dtype=float) > threshold).astype(int)
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km between arrays of points given in degrees"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+def step_distances_km(lat, lon, starts=None, backend=None):
+    """Distance to the previous report of the same track in km (NaN at track starts)"""
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    if _use_numba(backend):
+        return _step_distances_numba(lat, lon, _starts_or_first(starts, len(lat)))
+    return haversine_km(track_shift(lat, starts), track_shift(lon, starts), lat, lon)
+
+def position_jump_flags(distances, gaps_minutes, max_speed_kmh=MAX_SPEED_KMH, tolerance=1.5):
+    """0/1 flags for steps longer than ``max_speed_kmh`` allows in the elapsed time"""
+    expected_max = max_speed_kmh * (np.asarray(gaps_minutes, dtype=float) / 60)
+    return (np.asarray(distances, dtype=float) > expected_max * tolerance).astype(int)
+
+def resolve_backend(config=None, backend=None):
+    """Kernel backend from an explicit name or ``features.kernels.backend``
+    
+    'auto' (the default) picks numba when it is installed. The backends
+    agree only to about ``rtol=1e-9`` (numba uses scalar ``math`` trig and
+    its own rolling sums), so features such as ``speed_mean`` and
+    ``speed_std`` can differ in the last digits between them.
+    """
+    if backend is None and config is not None:
+        backend = config.get('features', 'kernels', 'backend', default='auto')
+    backend = backend or 'auto'
+    if backend == 'auto':
+        return 'numba' if numba is not None else 'numpy'
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown kernel backend: {backend}")
+    if backend == 'numba' and numba is None:
+        raise ImportError("numba not installed. Install with: pip install numba")
+    return backend
+
+def _use_numba(backend):
+    return resolve_backend(backend=backend) == 'numba'
+
+def _starts_or_first(starts, n):
+    if starts is not None:
+        return np.asarray(starts, dtype=bool)
+    starts = np.zeros(n, dtype=bool)
+    starts[:1] = True
+    return starts
+
+def pairwise_haversine_km(lat1, lon1, lat2=None, lon2=None, backend=None):
+    """Distance matrix in km between two point sets (or one set and itself)"""
+    lat1 = np.asarray(lat1, dtype=float)
+    lon1 = np.asarray(lon1, dtype=float)
+    lat2 = lat1 if lat2 is None else np.asarray(lat2, dtype=float)
+    lon2 = lon1 if lon2 is None else np.asarray(lon2, dtype=float)
+    if _use_numba(backend):
+        return _pairwise_numba(lat1, lon1, lat2, lon2)
+    return haversine_km(lat1[:, None], lon1[:, None], lat2[None, :], lon2[None, :])
+
+def window_radius_counts(lat, lon, window, radius_km, backend=None, chunk_size=65536):
+    """Points of each trailing ``window`` within ``radius_km`` of the window's last point
+    
+    Entry ``i`` covers positions ``i - window + 1 .. i`` (0 before the first
+    full window). Windows are not cut at track boundaries. The numba backend
+    uses scalar ``math`` trig, so its distances only approximately equal the
+    NumPy ones and a point right at ``radius_km`` can be counted differently.
+    """
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    if _use_numba(backend):
+        return _window_radius_numba(lat, lon, window, radius_km)
+    
+    counts = np.zeros(len(lat), dtype=np.int64)
+    if len(lat) < window:
+        return counts
+    lat_windows = np.lib.stride_tricks.sliding_window_view(lat, window)
+    lon_windows = np.lib.stride_tricks.sliding_window_view(lon, window)
+    # Chunks keep the temporary distance matrix bounded
+    for start in range(0, len(lat_windows), chunk_size):
+        stop = min(start + chunk_size, len(lat_windows))
+        lat_w, lon_w = lat_windows[start:stop], lon_windows[start:stop]
+        distances = haversine_km(lat_w[:, -1:], lon_w[:, -1:], lat_w, lon_w)
+        counts[start + window - 1:stop + window - 1] = (distances <= radius_km).sum(axis=1)
+    return counts
+
+def weighted_window_radius_counts(lat, lon, timestamps, weights, window, radius_km, starts=None):
+    """``window_radius_counts`` over the trailing ``window`` reports of compressed tracks
+    
+    A row's ``point_weight`` covers itself and the dropped reports after it,
+    so the window ending at row ``i`` counts that row once and earlier rows
+    of the same track with their weight, the oldest one only with the
+    reports still missing. Dropped reports are placed at their kept row and
+    spread evenly in time up to the next row. Returns the reports within
+    ``radius_km`` of row ``i`` and the window span in hours (NaN until a
+    track has ``window`` reports). Runs in NumPy on either backend.
+    """
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    n = len(lat)
+    starts = _starts_or_first(starts, n)
+    track = np.cumsum(starts)
+    weights = np.where(np.isnan(weights), 1.0, np.asarray(weights, dtype=float))
+    ns = np.asarray(timestamps, dtype='datetime64[ns]').view('int64')
+    seconds = np.where(ns == np.iinfo('int64').min, np.nan, ns / 1e9)
+    rows = np.arange(n)
+    next_seconds = seconds[np.minimum(rows + 1, n - 1)]
+    
+    counts = (haversine_km(lat, lon, lat, lon) <= radius_km).astype(float)
+    covered = np.ones(n)
+    oldest = seconds.copy()
+    for k in range(1, min(window, n)):
+        src = np.maximum(rows - k, 0)
+        take = (rows >= k) & (track[src] == track) & (covered < window)
+        w = np.where(take, np.minimum(weights[src], window - covered), 0.0)
+        within = haversine_km(lat, lon, lat[src], lon[src]) <= radius_km
+        counts += np.where(within, w, 0.0)
+        # The included reports of a row are the latest ones it stands for
+        skipped = (weights[src] - w) / weights[src]
+        oldest = np.where(take, seconds[src] + skipped * (next_seconds[src] - seconds[src]), oldest)
+        covered += w
+    
+    span_hours = np.where(covered >= window, (seconds - oldest) / 3600, np.nan)
+    return counts, span_hours
+
+def path_stats(lat, lon, starts, backend=None):
+    """Per-track path length (km) and efficiency (straight-line / path length)
+    
+    Returns arrays with one entry per track, in track order.
+    """
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    starts = np.asarray(starts, dtype=bool)
+    track = np.cumsum(starts) - 1
+    first = np.flatnonzero(starts)
+    last = np.r_[first[1:], len(lat)] - 1
+    
+    steps = np.nan_to_num(step_distances_km(lat, lon, starts, backend=backend))
+    length = np.bincount(track, weights=steps, minlength=len(first))
+    straight = haversine_km(lat[first], lon[first], lat[last], lon[last])
+    return length, straight / (length + 1e-10)
+
+ROLLING_STATS = ('sum', 'mean', 'std', 'max', 'min')
+
+def rolling_track_stats(values, starts=None, window=20, stats=ROLLING_STATS, backend=None, weights=None):
+    """Trailing-window statistics per track, like groupby().rolling(window, min_periods=1)
+    
+    NaNs are skipped; a window without values gives NaN and ``std`` (sample
+    standard deviation) needs two values. With ``weights`` (the
+    ``point_weight`` of compressed tracks, at least 1) each row counts as
+    that many reports and the window covers the last ``window`` reports
+    instead of rows. Returns a dict of arrays.
+    """
+    values = np.asarray(values, dtype=float)
+    starts = _starts_or_first(starts, len(values))
+    if weights is not None:
+        return _weighted_rolling(values, np.asarray(weights, dtype=float), starts, window, stats)
+    if _use_numba(backend):
+        result = dict(zip(ROLLING_STATS, _rolling_numba(values, starts, window)))
+        return {name: result[name] for name in stats}
+    
+    rolling = pd.Series(values).groupby(np.cumsum(starts), sort=False).rolling(window=window, min_periods=1)
+    return {name: getattr(rolling, name)().to_numpy() for name in stats}
+
+def _weighted_rolling(values, weights, starts, window, stats):
+    """Statistics over the trailing ``window`` reports of tracks whose rows stand for several
+    
+    Walks back one row at a time (at most ``window`` rows, since every row
+    is at least one report) and counts the oldest row only with the reports
+    still missing from the window. Runs in NumPy on either backend.
+    """
+    n = len(values)
+    track = np.cumsum(starts)
+    valid = ~np.isnan(values)
+    weights = np.where(np.isnan(weights), 1.0, weights)
+    rows = np.arange(n)
+    
+    def window_rows():
+        covered = np.zeros(n)
+        for k in range(min(window, n)):
+            src = np.maximum(rows - k, 0)
+            take = (rows >= k) & (track[src] == track) & (covered < window)
+            w = np.where(take, np.minimum(weights[src], window - covered), 0.0)
+            covered += w
+            yield src, take & valid[src], np.where(valid[src], w, 0.0)
+    
+    total_w = np.zeros(n)
+    total = np.zeros(n)
+    high = np.full(n, -np.inf)
+    low = np.full(n, np.inf)
+    for src, take, w in window_rows():
+        total_w += w
+        total += w * np.where(take, values[src], 0.0)
+        high = np.where(take, np.maximum(high, values[src]), high)
+        low = np.where(take, np.minimum(low, values[src]), low)
+    
+    empty = total_w == 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(empty, np.nan, total / total_w)
+    result = {
+        'sum': np.where(empty, np.nan, total),
+        'mean': mean,
+        'max': np.where(empty, np.nan, high),
+        'min': np.where(empty, np.nan, low)
+    }
+    if 'std' in stats:
+        m2 = np.zeros(n)
+        for src, take, w in window_rows():
+            m2 += w * np.where(take, values[src] - mean, 0.0) ** 2
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result['std'] = np.where(total_w > 1, np.sqrt(m2 / (total_w - 1)), np.nan)
+    return {name: result[name] for name in stats}
+
+def dead_reckoning_keep(lat, lon, seconds, sog, cog, must_keep, tolerance_km, sog_tolerance,
+                        cog_tolerance, max_interval_s, min_course_speed=1.0, backend=None):
+    """Reports a dead-reckoning compressor keeps, for tracks sorted by vessel and time
+    
+    Each report is predicted from the last kept one by moving along its COG
+    at its SOG (knots). A report is kept when the prediction misses it by
+    more than ``tolerance_km``, when its SOG or COG (above
+    ``min_course_speed``) differs from the last kept one by more than the
+    tolerances, when the next report would be more than ``max_interval_s``
+    after the last kept one, or when ``must_keep`` is set (track ends, gaps).
+    The scan is sequential; without numba it runs as a Python loop.
+    """
+    args = (np.asarray(lat, dtype=float), np.asarray(lon, dtype=float), np.asarray(seconds, dtype=float),
+            np.asarray(sog, dtype=float), np.asarray(cog, dtype=float), np.asarray(must_keep, dtype=bool),
+            float(tolerance_km), float(sog_tolerance), float(cog_tolerance), float(max_interval_s),
+            float(min_course_speed))
+    if _use_numba(backend):
+        return _dead_reckoning_numba(*args)
+    return _dead_reckoning_loop(*args)
+
+def _dead_reckoning_loop(lat, lon, seconds, sog, cog, must_keep, tolerance_km, sog_tolerance,
+                         cog_tolerance, max_interval_s, min_course_speed):
+    n = len(lat)
+    keep = np.zeros(n, dtype=np.bool_)
+    anchor = 0
+    for i in range(n):
+        if must_keep[i]:
+            keep[i] = True
+            anchor = i
+            continue
+        
+        # Position predicted from the anchor's speed and course
+        distance = sog[anchor] * 1.852 * (seconds[i] - seconds[anchor]) / 3600 / EARTH_RADIUS_KM
+        bearing = math.radians(cog[anchor])
+        lat0, lon0 = math.radians(lat[anchor]), math.radians(lon[anchor])
+        pred_lat = math.asin(math.sin(lat0) * math.cos(distance)
+                             + math.cos(lat0) * math.sin(distance) * math.cos(bearing))
+        pred_lon = lon0 + math.atan2(math.sin(bearing) * math.sin(distance) * math.cos(lat0),
+                                     math.cos(distance) - math.sin(lat0) * math.sin(pred_lat))
+        lat1, lon1 = math.radians(lat[i]), math.radians(lon[i])
+        a = (math.sin((lat1 - pred_lat) / 2) ** 2
+             + math.cos(pred_lat) * math.cos(lat1) * math.sin((lon1 - pred_lon) / 2) ** 2)
+        error_km = 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+        
+        turn = abs(cog[i] - cog[anchor])
+        turn = min(turn, 360 - turn)
+        moving = sog[i] >= min_course_speed and sog[anchor] >= min_course_speed
+        
+        if (error_km > tolerance_km or abs(sog[i] - sog[anchor]) > sog_tolerance
+                or (moving and turn > cog_tolerance)
+                or (i + 1 < n and seconds[i + 1] - seconds[anchor] > max_interval_s)):
+            keep[i] = True
+            anchor = i
+    return keep
+
+if numba is not None:
+    _dead_reckoning_numba = numba.njit(cache=True)(_dead_reckoning_loop)
+    
+    @numba.njit(cache=True, inline='always')
+    def _haversine_scalar(lat1, lon1, lat2, lon2):
+        lat1, lon1, lat2, lon2 = math.radians(lat1), math.radians(lon1), math.radians(lat2), math.radians(lon2)
+        a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+    
+    @numba.njit(cache=True)
+    def _step_distances_numba(lat, lon, starts):
+        out = np.empty(len(lat))
+        for i in range(len(lat)):
+            if i == 0 or starts[i]:
+                out[i] = np.nan
+            else:
+                out[i] = _haversine_scalar(lat[i - 1], lon[i - 1], lat[i], lon[i])
+        return out
+    
+    @numba.njit(cache=True, parallel=True)
+    def _pairwise_numba(lat1, lon1, lat2, lon2):
+        out = np.empty((len(lat1), len(lat2)))
+        for i in numba.prange(len(lat1)):
+            for j in range(len(lat2)):
+                out[i, j] = _haversine_scalar(lat1[i], lon1[i], lat2[j], lon2[j])
+        return out
+    
+    @numba.njit(cache=True)
+    def _window_radius_numba(lat, lon, window, radius_km):
+        counts = np.zeros(len(lat), dtype=np.int64)
+        for i in range(window - 1, len(lat)):
+            count = 0
+            for j in range(i - window + 1, i + 1):
+                if _haversine_scalar(lat[i], lon[i], lat[j], lon[j]) <= radius_km:
+                    count += 1
+            counts[i] = count
+        return counts
+    
+    @numba.njit(cache=True)
+    def _rolling_numba(values, starts, window):
+        n = len(values)
+        total = np.full(n, np.nan)
+        mean = np.full(n, np.nan)
+        std = np.full(n, np.nan)
+        high = np.full(n, np.nan)
+        low = np.full(n, np.nan)
+        track_start = 0
+        for i in range(n):
+            if starts[i]:
+                track_start = i
+            lo = max(track_start, i - window + 1)
+            count = 0
+            s = 0.0
+            for j in range(lo, i + 1):
+                v = values[j]
+                if v == v:
+                    if count == 0 or v > high[i]:
+                        high[i] = v
+                    if count == 0 or v < low[i]:
+                        low[i] = v
+                    s += v
+                    count += 1
+            if count == 0:
+                continue
+            total[i] = s
+            mean[i] = s / count
+            if count > 1:
+                m2 = 0.0
+                for j in range(lo, i + 1):
+                    v = values[j]
+                    if v == v:
+                        m2 += (v - mean[i]) ** 2
+                std[i] = math.sqrt(m2 / (count - 1))
+        return total, mean, std, high, low
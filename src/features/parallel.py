@@ -0,0 +1,50 @@
+"""MMSI-sharded parallel execution for per-vessel feature extractors"""
+import os
+import pandas as pd
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__, "logs/features.log")
+
+def resolve_workers(config, n_workers=None):
+    """Worker count from the argument or features.parallel.workers (0 = all cores)"""
+    if n_workers is None:
+        n_workers = config.get('features', 'parallel', 'workers', default=1)
+    if n_workers <= 0:
+        n_workers = os.cpu_count() or 1
+    return n_workers
+
+def shard_by_mmsi(df, n_shards):
+    """Split a frame into shards so that every vessel lands in exactly one shard
+    
+    Shard assignment uses a stable hash of the MMSI, so it does not depend on
+    row order, process or Python hash seed.
+    """
+    if n_shards <= 1:
+        return [df]
+    
+    shard_ids = pd.util.hash_array(df['MMSI'].to_numpy()) % np.uint64(n_shards)
+    shards = [df[shard_ids == shard] for shard in range(n_shards)]
+    return [shard for shard in shards if len(shard) > 0]
+
+def run_sharded(df, worker, config, n_workers, shards_per_worker=None):
+    """Apply ``worker(config, shard)`` to MMSI shards in a process pool
+    
+    Results are returned in shard order, which is fixed by the hash, so the
+    caller can merge them deterministically.
+    """
+    if shards_per_worker is None:
+        shards_per_worker = config.get('features', 'parallel', 'shards_per_worker', default=4)
+    
+    shards = shard_by_mmsi(df, n_workers * shards_per_worker)
+    logger.info(f"Processing {len(shards)} MMSI shards with {n_workers} workers")
+    
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        results = list(pool.map(worker, [config] * len(shards), shards))
+    
+    return results
@@ -0,0 +1,115 @@
+"""Time-bucketed neighbor search for vessel proximity features"""
+import pandas as pd
+import numpy as np
+from scipy.spatial import cKDTree
+from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__, "logs/features.log")
+
+EARTH_RADIUS_KM = 6371
+NO_NEIGHBOR_DISTANCE = 999
+
+# Offset between time buckets along the extra tree axis. Unit-sphere chords
+# are at most 2, so points in different buckets can never be neighbors.
+BUCKET_SEPARATION = 10.0
+
+def unit_vectors(lat, lon):
+    """Positions on the unit sphere; chord length is monotonic in haversine distance"""
+    lat = np.radians(lat)
+    lon = np.radians(lon)
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0, 1))
+
+def km_to_chord(km):
+    return 2 * np.sin(km / (2 * EARTH_RADIUS_KM))
+
+class VesselProximityIndex:
+    """Proximity features from a KD-tree over time-bucketed vessel positions
+    
+    Reports are grouped into ``time_bucket_minutes`` windows. Within a
+    bucket every vessel is represented by its latest report, and each report
+    is matched against the representatives of the other vessels in the same
+    bucket. Distances are great-circle kilometres: the search runs on 3-D
+    unit vectors (chord length is monotonic in haversine distance) with the
+    bucket as a fourth coordinate, so one tree answers all buckets at once.
+    """
+    
+    def __init__(self, config):
+        self.config = config
+        self.time_bucket = pd.Timedelta(
+            minutes=config.get('features', 'proximity', 'time_bucket_minutes', default=10)
+        )
+        self.radius_km = config.get('features', 'proximity', 'radius_km', default=11.1)
+    
+    def _points(self, df):
+        """Tree coordinates and dense time-bucket ids for every report"""
+        timestamps = df['timestamp'].to_numpy(dtype='datetime64[ns]').view('int64')
+        _, bucket = np.unique(timestamps // self.time_bucket.value, return_inverse=True)
+        xyz = unit_vectors(df['lat'].to_numpy(dtype=float), df['lon'].to_numpy(dtype=float))
+        return np.column_stack([xyz, bucket * BUCKET_SEPARATION]), bucket, timestamps
+    
+    def _representatives(self, mmsi, bucket, timestamps):
+        """Row positions of the latest report of each vessel in each bucket"""
+        order = np.lexsort((timestamps, mmsi, bucket))
+        last = np.ones(len(order), dtype=bool)
+        last[:-1] = (bucket[order][1:] != bucket[order][:-1]) | (mmsi[order][1:] != mmsi[order][:-1])
+        return order[last]
+    
+    def features(self, df):
+        """nearby_vessels, min_vessel_distance and avg_vessel_distance per report
+        
+        nearby_vessels counts other vessels within ``radius_km``;
+        avg_vessel_distance is their mean distance and min_vessel_distance the
+        distance to the closest other vessel in the bucket (km, 999 if none).
+        """
+        n = len(df)
+        if n == 0:
+            return pd.DataFrame(columns=['nearby_vessels', 'min_vessel_distance', 'avg_vessel_distance'],
+                                index=df.index)
+        
+        mmsi = df['MMSI'].to_numpy()
+        points, bucket, timestamps = self._points(df)
+        reps = self._representatives(mmsi, bucket, timestamps)
+        rep_mmsi = mmsi[reps]
+        rep_tree = cKDTree(points[reps])
+        
+        # All (report, other vessel) pairs within the radius
+        pairs = cKDTree(points).sparse_distance_matrix(
+            rep_tree, km_to_chord(self.radius_km), output_type='ndarray'
+        )
+        other = mmsi[pairs['i']] != rep_mmsi[pairs['j']]
+        rows = pairs['i'][other]
+        distances = chord_to_km(pairs['v'][other])
+        
+        nearby = np.bincount(rows, minlength=n)
+        distance_sum = np.bincount(rows, weights=distances, minlength=n)
+        avg_distance = np.full(n, float(NO_NEIGHBOR_DISTANCE))
+        np.divide(distance_sum, nearby, out=avg_distance, where=nearby > 0)
+        
+        # Closest other vessel: a report's own vessel has a single
+        # representative per bucket, so two nearest candidates always suffice
+        k = min(2, len(reps))
+        chord, index = rep_tree.query(points, k=k)
+        chord, index = chord.reshape(n, k), index.reshape(n, k)
+        valid = index < len(reps)
+        candidate_mmsi = np.where(valid, rep_mmsi[np.minimum(index, len(reps) - 1)], mmsi[:, None])
+        usable = valid & (candidate_mmsi != mmsi[:, None]) & (chord < BUCKET_SEPARATION / 2)
+        first = usable.argmax(axis=1)
+        nearest = chord[np.arange(n), first]
+        min_distance = np.where(usable.any(axis=1), chord_to_km(nearest), NO_NEIGHBOR_DISTANCE)
+        
+        logger.info(f"Proximity: {n} reports, {len(reps)} vessel positions in "
+                    f"{bucket.max() + 1} time buckets, {len(rows)} neighbor pairs")
+        
+        return pd.DataFrame({
+            'nearby_vessels': nearby,
+            'min_vessel_distance': min_distance,
+            'avg_vessel_distance': avg_distance
+        }, index=df.index)
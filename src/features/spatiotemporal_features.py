@@ -2,235 +2,255 @@
 import pandas as pd
 import numpy as np
 from scipy.spatial.distance import cdist
-from sklearn.cluster import DBSCAN
 from pathlib import Path
 import sys
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
 from src.utils.logger import setup_logger
+from src.utils.storage import StageStore
+from src.utils.schema import apply_schema
+from src.features.parallel import resolve_workers, run_sharded
+from src.features.proximity import VesselProximityIndex
+from src.features.clustering import TrackClusterer
+from src.features.kernels import course_change, path_stats, point_weights, resolve_backend, track_starts
 
 logger = setup_logger(__name__, "logs/features.log")
 
+def vessel_features_shard(config, df):
+    """Vessel-level spatio-temporal feature table for one MMSI shard"""
+    extractor = SpatioTemporalFeatureExtractor(config)
+    return extractor.vessel_feature_table(df)
+
+def broadcast_vessel_table(table, df):
+    """Expand a vessel-level table (indexed by MMSI) to the rows of ``df``"""
+    positions = table.index.get_indexer(df['MMSI'])
+    rows = table.iloc[positions]
+    rows.index = df.index
+    return rows
+
 class SpatioTemporalFeatureExtractor:
-    """Extract advanced spatio-temporal features for anomaly detection"""
+    """Extract advanced spatio-temporal features for anomaly detection
+    
+    Clustering, temporal and trajectory features are one value set per
+    vessel; they are computed as vessel-level tables keyed by MMSI and only
+    broadcast to rows when joined onto the report frame.
+    """
     
     def __init__(self, config):
         self.config = config
-        
-    def extract_spatial_clustering(self, df):
-        """Detect spatial clustering patterns (potential fishing grounds)"""
+        self.clusterer = TrackClusterer(config)
+        self.kernel_backend = resolve_backend(config)
+    
+    def spatial_clustering_table(self, df):
+        """Detect spatial clustering patterns (potential fishing grounds), one row per vessel"""
         logger.info("Extracting spatial clustering features...")
+        return self.clusterer.vessel_table(df)
+    
+    def extract_fishing_hotspots(self, df):
+        """Shared fishing hotspots across all vessels (hotspot table, hotspot id per report)"""
+        logger.info("Detecting region-wide fishing hotspots...")
+        return self.clusterer.hotspots(df)
+    
+    def temporal_patterns_table(self, df):
+        """Extract temporal behavior patterns, one row per vessel"""
+        logger.info("Extracting temporal pattern features...")
         
-        features = []
+        timestamps = pd.to_datetime(df['timestamp'])
+        mmsi = df['MMSI']
+        hour = timestamps.dt.hour
         
-        for mmsi, group in df.groupby('MMSI'):
-            group = group.sort_values('timestamp').reset_index(drop=True)
-            
-            # DBSCAN clustering on positions
-            coords = group[['lat', 'lon']].values
-            
-            if len(coords) > 5:
-                clustering = DBSCAN(eps=0.05, min_samples=3).fit(coords)
-                labels = clustering.labels_
-                
-                # Number of clusters (excluding noise)
-                n_clusters = len(set(labels)) - (1 if -1 in labels else 0)
-                
-                # Time spent in clusters
-                cluster_time = (labels != -1).sum() / len(labels)
-                
-                # Cluster revisits
-                cluster_revisits = 0
-                if n_clusters > 0:
-                    for cluster_id in set(labels):
-                        if cluster_id != -1:
-                            cluster_mask = labels == cluster_id
-                            cluster_indices = np.where(cluster_mask)[0]
-                            # Check for gaps (revisits)
-                            if len(cluster_indices) > 1:
-                                gaps = np.diff(cluster_indices)
-                                cluster_revisits += (gaps > 10).sum()
-            else:
-                n_clusters = 0
-                cluster_time = 0
-                cluster_revisits = 0
-            
-            for idx in group.index:
-                features.append({
-                    'index': idx,
-                    'spatial_clusters': n_clusters,
-                    'cluster_time_ratio': cluster_time,
-                    'cluster_revisits': cluster_revisits
-                })
+        # Reports per row (compressed tracks), so shares count original reports
+        weights = point_weights(df)
+        weight = pd.Series(1.0 if weights is None else weights, index=df.index)
+        vessel_weight = weight.groupby(mmsi).sum()
         
-        features_df = pd.DataFrame(features).set_index('index')
-        return features_df
-    
-    def extract_temporal_patterns(self, df):
-        """Extract temporal behavior patterns"""
-        logger.info("Extracting temporal pattern features...")
+        # Night activity (10 PM - 6 AM) and weekend activity
+        night = (((hour >= 22) | (hour <= 6)) * weight).groupby(mmsi).sum() / vessel_weight
+        weekend = ((timestamps.dt.dayofweek >= 5) * weight).groupby(mmsi).sum() / vessel_weight
         
-        features = []
+        # Activity concentration (entropy of hourly distribution)
+        hour_share = weight.groupby([mmsi, hour]).sum()
+        hour_share = hour_share / hour_share.groupby(level=0).transform('sum')
+        hour_entropy = (-(hour_share * np.log2(hour_share + 1e-10))).groupby(level=0).sum()
         
-        for mmsi, group in df.groupby('MMSI'):
-            group = group.sort_values('timestamp').reset_index(drop=True)
-            
-            # Extract hour of day
-            group['hour'] = pd.to_datetime(group['timestamp']).dt.hour
-            
-            # Night activity (10 PM - 6 AM)
-            night_activity = ((group['hour'] >= 22) | (group['hour'] <= 6)).sum() / len(group)
-            
-            # Activity concentration (entropy of hourly distribution)
-            hour_counts = group['hour'].value_counts(normalize=True)
-            hour_entropy = -np.sum(hour_counts * np.log2(hour_counts + 1e-10))
-            
-            # Day of week patterns
-            group['dayofweek'] = pd.to_datetime(group['timestamp']).dt.dayofweek
-            weekend_activity = (group['dayofweek'] >= 5).sum() / len(group)
-            
-            # Temporal regularity (std of time gaps)
-            time_diffs = group['timestamp'].diff().dt.total_seconds() / 60  # minutes
-            time_regularity = time_diffs.std() if len(time_diffs) > 1 else 0
-            
-            for idx in group.index:
-                features.append({
-                    'index': idx,
-                    'night_activity_ratio': night_activity,
-                    'hour_entropy': hour_entropy,
-                    'weekend_activity_ratio': weekend_activity,
-                    'time_regularity': time_regularity
-                })
+        # Temporal regularity (std of time gaps between sorted reports)
+        order = np.lexsort((timestamps.to_numpy(), mmsi.to_numpy()))
+        sorted_mmsi = mmsi.iloc[order]
+        time_diffs = timestamps.iloc[order].groupby(sorted_mmsi.to_numpy()).diff().dt.total_seconds() / 60
+        time_regularity = time_diffs.groupby(sorted_mmsi.to_numpy()).std()
+        time_regularity[mmsi.value_counts().reindex(time_regularity.index) <= 1] = 0
         
-        features_df = pd.DataFrame(features).set_index('index')
-        return features_df
+        return pd.DataFrame({
+            'night_activity_ratio': night,
+            'hour_entropy': hour_entropy,
+            'weekend_activity_ratio': weekend,
+            'time_regularity': time_regularity
+        }).rename_axis('MMSI')
     
-    def extract_trajectory_complexity(self, df):
-        """Measure trajectory complexity and patterns"""
+    def trajectory_complexity_table(self, df):
+        """Measure trajectory complexity and patterns, one row per vessel
+        
+        Path length (km) and efficiency come from one kernel pass over all
+        tracks sorted by (MMSI, timestamp).
+        """
         logger.info("Extracting trajectory complexity features...")
         
-        features = []
+        mmsi = df['MMSI'].to_numpy()
+        order = np.lexsort((df['timestamp'].to_numpy(), mmsi))
+        mmsi = mmsi[order]
+        lat = df['lat'].to_numpy(dtype=float)[order]
+        lon = df['lon'].to_numpy(dtype=float)[order]
         
-        for mmsi, group in df.groupby('MMSI'):
-            group = group.sort_values('timestamp').reset_index(drop=True)
-            
-            if len(group) < 3:
-                for idx in group.index:
-                    features.append({
-                        'index': idx,
-                        'trajectory_length': 0,
-                        'path_efficiency': 1.0,
-                        'turning_points': 0,
-                        'trajectory_entropy': 0
-                    })
+        starts = track_starts(mmsi)
+        first = np.flatnonzero(starts)
+        sizes = np.diff(np.r_[first, len(mmsi)])
+        total_distance, path_efficiency = path_stats(lat, lon, starts, backend=self.kernel_backend)
+        
+        # Turning points (significant course changes)
+        if 'COG' in df.columns:
+            turns = course_change(df['COG'].to_numpy(dtype=float)[order], starts) > 45
+            turning_points = np.add.reduceat(turns.astype(int), first) if len(first) else np.zeros(0, dtype=int)
+        else:
+            turning_points = np.zeros(len(first), dtype=int)
+        
+        # Trajectory entropy (spatial distribution over a 9x9 grid of the track's extent)
+        trajectory_entropy = np.zeros(len(first))
+        for i, (start, size) in enumerate(zip(first, sizes)):
+            if size < 3:
                 continue
-            
-            # Calculate cumulative distance
-            coords = group[['lat', 'lon']].values
-            distances = np.sqrt(np.sum(np.diff(coords, axis=0)**2, axis=1))
-            total_distance = np.sum(distances)
-            
-            # Path efficiency (straight line / actual path)
-            straight_line = np.sqrt(np.sum((coords[-1] - coords[0])**2))
-            path_efficiency = straight_line / (total_distance + 1e-10)
-            
-            # Turning points (significant course changes)
-            if 'COG' in group.columns:
-                course_changes = np.abs(np.diff(group['COG'].values))
-                course_changes = np.minimum(course_changes, 360 - course_changes)
-                turning_points = (course_changes > 45).sum()
-            else:
-                turning_points = 0
-            
-            # Trajectory entropy (spatial distribution)
-            # Divide area into grid and calculate entropy
-            lat_bins = np.linspace(coords[:, 0].min(), coords[:, 0].max(), 10)
-            lon_bins = np.linspace(coords[:, 1].min(), coords[:, 1].max(), 10)
-            hist, _, _ = np.histogram2d(coords[:, 0], coords[:, 1], bins=[lat_bins, lon_bins])
+            track_lat, track_lon = lat[start:start + size], lon[start:start + size]
+            lat_bins = np.linspace(track_lat.min(), track_lat.max(), 10)
+            lon_bins = np.linspace(track_lon.min(), track_lon.max(), 10)
+            hist, _, _ = np.histogram2d(track_lat, track_lon, bins=[lat_bins, lon_bins])
             hist_norm = hist.flatten() / hist.sum()
             hist_norm = hist_norm[hist_norm > 0]
-            trajectory_entropy = -np.sum(hist_norm * np.log2(hist_norm))
-            
-            for idx in group.index:
-                features.append({
-                    'index': idx,
-                    'trajectory_length': total_distance,
-                    'path_efficiency': path_efficiency,
-                    'turning_points': turning_points,
-                    'trajectory_entropy': trajectory_entropy
-                })
+            trajectory_entropy[i] = -np.sum(hist_norm * np.log2(hist_norm))
+        
+        table = pd.DataFrame({
+            'trajectory_length': total_distance,
+            'path_efficiency': path_efficiency,
+            'turning_points': turning_points,
+            'trajectory_entropy': trajectory_entropy
+        }, index=pd.Index(mmsi[first], name='MMSI'))
         
-        features_df = pd.DataFrame(features).set_index('index')
-        return features_df
+        # Tracks shorter than three reports carry no shape
+        table.loc[sizes < 3] = (0, 1.0, 0, 0)
+        return table
+    
+    def vessel_feature_table(self, df):
+        """All per-vessel spatio-temporal features as one table keyed by MMSI"""
+        return pd.concat([
+            self.spatial_clustering_table(df),
+            self.temporal_patterns_table(df),
+            self.trajectory_complexity_table(df)
+        ], axis=1)
+    
+    def extract_spatial_clustering(self, df):
+        """Spatial clustering features broadcast to every report"""
+        return broadcast_vessel_table(self.spatial_clustering_table(df), df)
+    
+    def extract_temporal_patterns(self, df):
+        """Temporal pattern features broadcast to every report"""
+        return broadcast_vessel_table(self.temporal_patterns_table(df), df)
+    
+    def extract_trajectory_complexity(self, df):
+        """Trajectory complexity features broadcast to every report"""
+        return broadcast_vessel_table(self.trajectory_complexity_table(df), df)
     
     def extract_proximity_features(self, df):
         """Extract features based on proximity to other vessels"""
         logger.info("Extracting vessel proximity features...")
         
-        features = []
+        if self.config.get('features', 'proximity', 'engine', default='index') == 'index':
+            return VesselProximityIndex(self.config).features(df)
+        return self._exact_timestamp_proximity(df)
+    
+    def _exact_timestamp_proximity(self, df):
+        """Pairwise degree distances between reports sharing an exact timestamp"""
+        indices, nearby, min_distance, avg_distance = [], [], [], []
         
         # Group by timestamp to find vessels at same time
         for timestamp, time_group in df.groupby('timestamp'):
-            if len(time_group) < 2:
-                for idx in time_group.index:
-                    features.append({
-                        'index': idx,
-                        'nearby_vessels': 0,
-                        'min_vessel_distance': np.inf,
-                        'avg_vessel_distance': np.inf
-                    })
+            indices.append(time_group.index.to_numpy())
+            n = len(time_group)
+            if n < 2:
+                nearby.append(np.zeros(n, dtype=int))
+                min_distance.append(np.full(n, np.inf))
+                avg_distance.append(np.full(n, np.inf))
                 continue
             
-            coords = time_group[['lat', 'lon']].values
-            
             # Calculate pairwise distances
+            coords = time_group[['lat', 'lon']].values
             distances = cdist(coords, coords)
             np.fill_diagonal(distances, np.inf)
             
-            for i, idx in enumerate(time_group.index):
-                vessel_distances = distances[i]
-                
-                # Count nearby vessels (within 0.1 degrees ~ 11km)
-                nearby = (vessel_distances < 0.1).sum()
-                min_dist = vessel_distances.min() if len(vessel_distances) > 0 else np.inf
-                avg_dist = vessel_distances[vessel_distances < np.inf].mean() if nearby > 0 else np.inf
-                
-                features.append({
-                    'index': idx,
-                    'nearby_vessels': nearby,
-                    'min_vessel_distance': min_dist if min_dist != np.inf else 999,
-                    'avg_vessel_distance': avg_dist if avg_dist != np.inf else 999
-                })
+            # Nearby vessels within 0.1 degrees (~11 km); the average runs
+            # over all other vessels at that timestamp, as before
+            group_nearby = (distances < 0.1).sum(axis=1)
+            group_min = distances.min(axis=1)
+            off_diagonal = distances.sum(axis=1, where=np.isfinite(distances)) / (n - 1)
+            nearby.append(group_nearby)
+            min_distance.append(np.where(np.isinf(group_min), 999, group_min))
+            avg_distance.append(np.where(group_nearby > 0, off_diagonal, 999))
         
-        features_df = pd.DataFrame(features).set_index('index')
-        return features_df
+        if not indices:
+            return pd.DataFrame(columns=['nearby_vessels', 'min_vessel_distance', 'avg_vessel_distance'])
+        
+        return pd.DataFrame({
+            'nearby_vessels': np.concatenate(nearby),
+            'min_vessel_distance': np.concatenate(min_distance),
+            'avg_vessel_distance': np.concatenate(avg_distance)
+        }, index=pd.Index(np.concatenate(indices), name='index'))
     
-    def extract_features(self, df):
-        """Extract all spatio-temporal features"""
+    def extract_vessel_table(self, df, n_workers=None):
+        """Vessel-level feature table, computed serially or across MMSI shards
+        
+        Every vessel lives in exactly one shard, so shard tables are disjoint
+        and are simply stacked; only the compact tables cross process
+        boundaries.
+        """
+        n_workers = resolve_workers(self.config, n_workers)
+        
+        if n_workers == 1:
+            return vessel_features_shard(self.config, df)
+        
+        results = run_sharded(df, vessel_features_shard, self.config, n_workers)
+        return pd.concat(results).sort_index()
+    
+    def extract_vessel_features(self, df, n_workers=None):
+        """Per-vessel spatio-temporal features broadcast to the rows of ``df``"""
+        return broadcast_vessel_table(self.extract_vessel_table(df, n_workers), df)
+    
+    def extract_features(self, df, n_workers=None, return_vessel_table=False):
+        """Extract all spatio-temporal features
+        
+        With ``return_vessel_table`` the vessel-level table is returned as
+        well, for consumers that work per vessel rather than per report.
+        """
         logger.info("=" * 50)
         logger.info("SPATIO-TEMPORAL FEATURE EXTRACTION")
         logger.info("=" * 50)
         
-        df = df.copy()
+        # Per-vessel feature sets (parallel across MMSI shards)
+        vessel_table = self.extract_vessel_table(df, n_workers)
         
-        # Extract all feature sets
-        spatial_features = self.extract_spatial_clustering(df)
-        temporal_features = self.extract_temporal_patterns(df)
-        trajectory_features = self.extract_trajectory_complexity(df)
+        # Proximity compares vessels with each other, so it runs on the full frame
         proximity_features = self.extract_proximity_features(df)
         
-        # Merge all features
-        df = df.join(spatial_features)
-        df = df.join(temporal_features)
-        df = df.join(trajectory_features)
+        # Broadcast vessel-level features to reports with a single merge on MMSI
+        df = df.join(vessel_table, on='MMSI')
         df = df.join(proximity_features)
         
         # Fill any NaN values
         numeric_cols = df.select_dtypes(include=[np.number]).columns
         df[numeric_cols] = df[numeric_cols].fillna(0)
+        df = apply_schema(df, self.config)
         
-        logger.info(f"Added {len(spatial_features.columns) + len(temporal_features.columns) + len(trajectory_features.columns) + len(proximity_features.columns)} spatio-temporal features")
+        logger.info(f"Added {len(vessel_table.columns) + len(proximity_features.columns)} spatio-temporal features "
+                    f"({len(vessel_table)} vessel rows)")
         
+        if return_vessel_table:
+            return df, apply_schema(vessel_table.fillna(0), self.config)
         return df
 
 def main():
@@ -238,21 +258,26 @@ def main():
     from src.utils.config_loader import load_config
     
     config = load_config()
+    store = StageStore(config)
     
     # Load data with basic features
-    input_path = Path(config.get('data', 'output_dir')) / "ais_all_features.csv"
-    logger.info(f"Loading data from {input_path}")
-    df = pd.read_csv(input_path, parse_dates=['timestamp'])
+    df = store.load('ais_all_features')
     
     # Extract spatio-temporal features
     extractor = SpatioTemporalFeatureExtractor(config)
-    df = extractor.extract_features(df)
+    df, vessel_table = extractor.extract_features(df, return_vessel_table=True)
     
     # Save enhanced features
-    output_path = Path(config.get('data', 'output_dir')) / "ais_enhanced_features.csv"
-    df.to_csv(output_path, index=False)
+    output_path = store.save(df, 'ais_enhanced_features')
     logger.info(f"Saved enhanced features to {output_path}")
     
+    # Vessel-level table for per-vessel models and reports
+    store.save(vessel_table.reset_index(), 'ais_vessel_features')
+    
+    if config.get('features', 'clustering', 'hotspots', 'enabled', default=True):
+        hotspots, _ = extractor.extract_fishing_hotspots(df)
+        store.save(hotspots, 'ais_fishing_hotspots')
+    
     logger.info(f"Total features: {len(df.columns)}")
     logger.info(f"Total records: {len(df)}")
 
@@ -1,4 +1,3 @@
-import pandas as pd
 import numpy as np
 from pathlib import Path
 import sys
@@ -6,6 +5,11 @@ sys.path.append(str(Path(__file__).parent.parent.parent))
 
 from src.utils.config_loader import load_config
 from src.utils.logger import setup_logger
+from src.utils.storage import StageStore
+from src.features.kernels import (
+    time_gaps_minutes, gap_flags, step_distances_km, position_jump_flags, resolve_backend, rolling_track_stats,
+    point_weights, step_weights
+)
 
 logger = setup_logger(__name__, "logs/features.log")
 
@@ -14,34 +18,45 @@ class TransmissionFeatureExtractor:
         self.config = config
         self.max_gap_minutes = config.get('features', 'transmission', 'max_gap_minutes', default=60)
         self.mmsi_change_threshold = config.get('features', 'transmission', 'mmsi_change_threshold', default=3)
+        self.kernel_backend = resolve_backend(config)
+    
+    def rolling(self, values, starts=None, stats=('mean',), window=20, weights=None):
+        """Trailing-window statistics of one track (or of sorted tracks)"""
+        return rolling_track_stats(np.asarray(values, dtype=float), starts, window,
+                                   stats=stats, backend=self.kernel_backend, weights=weights)
+    
+    def report_gaps(self, group):
+        """Time gaps per original report interval, with their weights on compressed tracks"""
+        weights = point_weights(group)
+        gaps = group['time_gap'].to_numpy(dtype=float)
+        if weights is None:
+            return gaps, None
+        steps = step_weights(weights)
+        return gaps / steps, steps
     
     def detect_ais_gaps(self, group):
         """Detect AIS transmission gaps"""
         group = group.sort_values('timestamp').copy()
         
         # Calculate time gaps between consecutive transmissions
-        group['time_gap'] = group['timestamp'].diff().dt.total_seconds() / 60  # minutes
+        group['time_gap'] = time_gaps_minutes(group['timestamp'].to_numpy())  # minutes
         
         # Flag significant gaps
-        group['ais_gap'] = (group['time_gap'] > self.max_gap_minutes).astype(int)
+        group['ais_gap'] = gap_flags(group['time_gap'].to_numpy(), self.max_gap_minutes)
         
         # Count gaps in rolling window
-        group['gap_count'] = group['ais_gap'].rolling(window=20, min_periods=1).sum()
+        gaps, weights = self.report_gaps(group)
+        group['gap_count'] = self.rolling(group['ais_gap'], stats=('sum',), weights=weights)['sum']
         
         # Calculate average gap duration
-        group['avg_gap_duration'] = group['time_gap'].rolling(window=20, min_periods=1).mean()
+        group['avg_gap_duration'] = self.rolling(gaps, weights=weights)['mean']
         
         return group
     
     def detect_sudden_disappearance(self, group):
         """Detect sudden disappearance and reappearance"""
-        group['disappeared'] = 0
-        
-        for i in range(1, len(group)):
-            # Check if vessel disappeared for extended period
-            if group['time_gap'].iloc[i] > self.max_gap_minutes * 2:
-                group.loc[group.index[i], 'disappeared'] = 1
-        
+        # Vessel disappeared for an extended period before this report
+        group['disappeared'] = gap_flags(group['time_gap'].to_numpy(), self.max_gap_minutes * 2)
         return group
     
     def detect_position_jumps(self, group):
@@ -52,27 +67,9 @@ class TransmissionFeatureExtractor:
         group['lat_diff'] = group['lat'].diff()
         group['lon_diff'] = group['lon'].diff()
         
-        # Calculate distance using Haversine
-        R = 6371  # Earth radius in km
-        lat1 = np.radians(group['lat'].shift(1))
-        lat2 = np.radians(group['lat'])
-        lon1 = np.radians(group['lon'].shift(1))
-        lon2 = np.radians(group['lon'])
-        
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        
-        a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
-        c = 2 * np.arcsin(np.sqrt(a))
-        distance = R * c
-        
-        # Calculate expected max distance based on time gap and max speed
-        max_speed_kmh = 50 * 1.852  # 50 knots to km/h
-        time_hours = group['time_gap'] / 60
-        expected_max_distance = max_speed_kmh * time_hours
-        
-        # Flag unrealistic jumps
-        group['position_jump'] = (distance > expected_max_distance * 1.5).astype(int)
+        # Haversine distance against the distance 50 knots allow in the gap
+        distance = step_distances_km(group['lat'].to_numpy(), group['lon'].to_numpy(), backend=self.kernel_backend)
+        group['position_jump'] = position_jump_flags(distance, group['time_gap'].to_numpy())
         
         return group
     
@@ -80,11 +77,14 @@ class TransmissionFeatureExtractor:
         """Calculate transmission regularity metrics"""
         group = group.sort_values('timestamp').copy()
         
+        report_gaps, weights = self.report_gaps(group)
+        gaps = self.rolling(report_gaps, stats=('mean', 'std'), weights=weights)
+        
         # Standard deviation of time gaps
-        group['gap_std'] = group['time_gap'].rolling(window=20, min_periods=1).std()
+        group['gap_std'] = gaps['std']
         
         # Transmission frequency (messages per hour)
-        group['transmission_freq'] = 60 / group['time_gap'].rolling(window=20, min_periods=1).mean()
+        group['transmission_freq'] = 60 / gaps['mean']
         
         return group
     
@@ -111,17 +111,16 @@ class TransmissionFeatureExtractor:
 def main():
     config = load_config()
     extractor = TransmissionFeatureExtractor(config)
+    store = StageStore(config)
     
     # Load behavior features data
-    input_path = Path(config.get('data', 'output_dir')) / "ais_behavior_features.csv"
-    df = pd.read_csv(input_path, parse_dates=['timestamp'])
+    df = store.load('ais_behavior_features')
     
     # Extract transmission features
     df_features = extractor.extract_features(df)
     
     # Save features
-    output_path = Path(config.get('data', 'output_dir')) / "ais_all_features.csv"
-    df_features.to_csv(output_path, index=False)
+    output_path = store.save(df_features, 'ais_all_features')
     logger.info(f"Saved all features to {output_path}")
 
 if __name__ == "__main__":
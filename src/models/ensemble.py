@@ -1,5 +1,4 @@
 """Ensemble model combining all detectors"""
-import pandas as pd
 import numpy as np
 from pathlib import Path
 import sys
@@ -7,6 +6,7 @@ sys.path.append(str(Path(__file__).parent.parent.parent))
 
 from src.utils.config_loader import load_config
 from src.utils.logger import setup_logger
+from src.utils.storage import StageStore
 from src.models.supervised_models import SupervisedAnomalyDetector
 from src.models.unsupervised_models import UnsupervisedAnomalyDetector
 from src.models.lstm_model import LSTMTrainer
@@ -40,17 +40,18 @@ class EnsembleAnomalyDetector:
         # This is a simplified version - in production, save model config
         logger.info("LSTM model loading skipped in ensemble (requires sequence data)")
     
+    def component_scores(self, df):
+        """Supervised and unsupervised scores of every row, on the trained feature columns"""
+        supervised_scores = self.supervised.predict(self.supervised.feature_matrix(df))
+        unsupervised_scores = self.unsupervised.predict(self.unsupervised.feature_matrix(df))
+        return supervised_scores, unsupervised_scores
+    
     def predict(self, df, use_lstm=False):
         """Predict anomaly scores using ensemble"""
         logger.info("Running ensemble prediction...")
         
-        # Prepare data for supervised/unsupervised
-        X_supervised, _ = self.supervised.prepare_data(df.copy())
-        X_unsupervised = self.unsupervised.prepare_data(df.copy())
-        
         # Get predictions
-        supervised_scores = self.supervised.predict(X_supervised)
-        unsupervised_scores = self.unsupervised.predict(X_unsupervised)
+        supervised_scores, unsupervised_scores = self.component_scores(df)
         
         # Combine scores
         if use_lstm:
@@ -76,13 +77,8 @@ class EnsembleAnomalyDetector:
         """Predict with detailed scores from each model"""
         logger.info("Running detailed ensemble prediction...")
         
-        # Prepare data
-        X_supervised, _ = self.supervised.prepare_data(df.copy())
-        X_unsupervised = self.unsupervised.prepare_data(df.copy())
-        
         # Get predictions
-        supervised_scores = self.supervised.predict(X_supervised)
-        unsupervised_scores = self.unsupervised.predict(X_unsupervised)
+        supervised_scores, unsupervised_scores = self.component_scores(df)
         
         # Ensemble
         ensemble_scores = (
@@ -99,13 +95,11 @@ class EnsembleAnomalyDetector:
         
         return results
 
-def main():
-    """Test ensemble prediction"""
-    config = load_config()
-    
+def run_stage(config, df=None):
+    """Ensemble predictions for ``df`` (or the ais_all_features stage), saved to outputs/"""
     # Load test data
-    input_path = Path(config.get('data', 'output_dir')) / "ais_all_features.csv"
-    df = pd.read_csv(input_path, parse_dates=['timestamp'])
+    if df is None:
+        df = StageStore(config).load('ais_all_features')
     
     # Initialize ensemble
     ensemble = EnsembleAnomalyDetector(config)
@@ -128,6 +122,11 @@ def main():
     logger.info(f"Anomalies detected: {results['anomaly'].sum()}")
     logger.info(f"Anomaly rate: {results['anomaly'].sum()/len(results)*100:.2f}%")
     logger.info(f"Average ensemble score: {results['ensemble_score'].mean():.4f}")
+    return results
+
+def main():
+    """Test ensemble prediction"""
+    run_stage(load_config())
 
 if __name__ == "__main__":
     main()
@@ -4,7 +4,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 from pathlib import Path
-import joblib
+from sklearn.inspection import permutation_importance
 import sys
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
@@ -12,25 +12,51 @@ from src.utils.logger import setup_logger
 
 logger = setup_logger(__name__, "logs/models.log")
 
+# Rows of the reference sample scored for permutation importance
+PERMUTATION_ROWS = 5000
+
 class ModelExplainer:
     """Explain model predictions for actionable insights"""
     
-    def __init__(self, model, feature_names):
+    def __init__(self, model, feature_names, X_reference=None):
         self.model = model
         self.feature_names = feature_names
+        self.X_reference = X_reference
+        self._permutation = None
         
     def get_feature_importance(self):
-        """Get feature importance from tree-based models"""
+        """Get feature importance from tree-based models
+        
+        Models without ``feature_importances_`` (histogram gradient boosting)
+        fall back to permutation importance on ``X_reference``.
+        """
         if hasattr(self.model, 'feature_importances_'):
-            importance_df = pd.DataFrame({
-                'feature': self.feature_names,
-                'importance': self.model.feature_importances_
-            }).sort_values('importance', ascending=False)
-            
-            return importance_df
+            importance = self.model.feature_importances_
+        elif self.X_reference is not None:
+            importance = self.permutation_importance()
         else:
-            logger.warning("Model does not have feature_importances_ attribute")
+            logger.warning("Model does not have feature_importances_ attribute and no reference data was given")
             return None
+        
+        importance_df = pd.DataFrame({
+            'feature': self.feature_names,
+            'importance': importance
+        }).sort_values('importance', ascending=False)
+        
+        return importance_df
+    
+    def permutation_importance(self):
+        """Mean drop in ROC-AUC against the model's own predictions when a feature is shuffled"""
+        if self._permutation is None:
+            logger.info(f"Computing permutation importance on {len(self.X_reference)} reference rows...")
+            y = self.model.predict(self.X_reference)
+            result = permutation_importance(
+                self.model, self.X_reference, y,
+                scoring='roc_auc' if len(np.unique(y)) > 1 else None,
+                n_repeats=5, random_state=42
+            )
+            self._permutation = result.importances_mean
+        return self._permutation
     
     def plot_feature_importance(self, output_path, top_n=20):
         """Plot top N important features"""
@@ -172,27 +198,39 @@ class ModelExplainer:
         
         return summary_df
 
+def load_explainer(config, model_dir, df, reference_rows=PERMUTATION_ROWS):
+    """ModelExplainer for the saved tree model, whichever backend trained it
+    
+    A sample of ``df`` prepared like the scoring inputs is kept as the
+    reference for permutation importance.
+    """
+    from src.models.supervised_models import SupervisedAnomalyDetector
+    
+    detector = SupervisedAnomalyDetector(config)
+    detector.load_models(model_dir)
+    
+    sample = df.sample(n=min(reference_rows, len(df)), random_state=42)
+    X_reference = detector.scaler.transform(detector.feature_matrix(sample))
+    return ModelExplainer(detector.tree_model, detector.feature_columns, X_reference)
+
 def main():
     """Generate explainability reports"""
     from src.utils.config_loader import load_config
+    from src.utils.storage import StageStore
     
     config = load_config()
     
     # Load model and data
     model_dir = Path("outputs/models")
-    rf_model = joblib.load(model_dir / "random_forest.pkl")
-    feature_columns = joblib.load(model_dir / "feature_columns.pkl")
-    
     # Load predictions
     pred_path = Path("outputs/anomaly_predictions.csv")
     pred_df = pd.read_csv(pred_path)
     
     # Load original data
-    data_path = Path(config.get('data', 'output_dir')) / "ais_all_features.csv"
-    df = pd.read_csv(data_path, parse_dates=['timestamp'])
+    df = StageStore(config).load('ais_all_features')
     
     # Initialize explainer
-    explainer = ModelExplainer(rf_model, feature_columns)
+    explainer = load_explainer(config, model_dir, df)
     
     # Create output directory
     output_dir = Path("outputs/explainability")
@@ -79,7 +79,7 @@ class LSTMTrainer:
         
         # Select feature columns
         exclude_cols = ['MMSI', 'timestamp', 'lat', 'lon', 'anomaly',
-                       'lat_diff', 'lon_diff', 'geometry']
+                       'lat_diff', 'lon_diff', 'geometry', 'point_weight']
         self.feature_columns = [col for col in df.columns if col not in exclude_cols]
         
         sequences = []
@@ -2,6 +2,7 @@
 import pandas as pd
 import numpy as np
 from pathlib import Path
+import time
 import joblib
 from datetime import datetime
 import sys
@@ -9,10 +10,69 @@ sys.path.append(str(Path(__file__).parent.parent.parent))
 
 from src.utils.config_loader import load_config
 from src.utils.logger import setup_logger
+from src.utils.storage import StageStore
 from src.models.ensemble import EnsembleAnomalyDetector
 
 logger = setup_logger(__name__, "logs/realtime.log")
 
+RESULT_COLUMNS = ['MMSI', 'timestamp', 'lat', 'lon', 'supervised_score', 'unsupervised_score',
+                  'anomaly_score', 'is_anomaly', 'risk_level', 'detection_time']
+
+class MicroBatcher:
+    """Collect single records and score them in micro-batches
+    
+    A batch is scored when it holds ``max_rows`` records or when its oldest
+    record has waited ``max_wait_ms``. There is no background thread: the
+    wait limit is checked whenever a record is submitted or ``poll`` is
+    called, so record-at-a-time feeds should call ``poll`` on idle ticks.
+    Results come back as frames with one row per record, in submission
+    order. If scoring raises, the batch stays pending and the error reaches
+    the caller, so no record is lost.
+    """
+    
+    def __init__(self, score_batch, max_rows=256, max_wait_ms=50, clock=time.monotonic):
+        self.score_batch = score_batch
+        self.max_rows = max_rows
+        self.max_wait_ms = max_wait_ms
+        self.clock = clock
+        self.pending = []
+        self.deadline = None
+    
+    def submit(self, record):
+        """Queue a record (dict or Series); returns the results of any batch this completes"""
+        if not self.pending:
+            self.deadline = self.clock() + self.max_wait_ms / 1000
+        self.pending.append(record)
+        if len(self.pending) >= self.max_rows or self.clock() >= self.deadline:
+            return self.flush()
+        return None
+    
+    def poll(self):
+        """Score the pending batch if its oldest record has waited long enough"""
+        if self.pending and self.clock() >= self.deadline:
+            return self.flush()
+        return None
+    
+    def flush(self):
+        """Score every pending record now (they stay pending if scoring raises)"""
+        if not self.pending:
+            return None
+        batch = pd.DataFrame([dict(record) for record in self.pending])
+        results = self.score_batch(batch)
+        self.pending = []
+        self.deadline = None
+        return results
+    
+    def stream(self, records):
+        """Per-record results of an iterable of records, in order"""
+        for record in records:
+            results = self.submit(record)
+            if results is not None:
+                yield from results.to_dict('records')
+        results = self.flush()
+        if results is not None:
+            yield from results.to_dict('records')
+
 class RealtimeIUUDetector:
     """Real-time IUU fishing detection system"""
     
@@ -22,11 +82,13 @@ class RealtimeIUUDetector:
         self.ensemble = EnsembleAnomalyDetector(config)
         self.alert_threshold = config.get('anomaly', 'threshold', default=0.7)
         self.high_risk_threshold = 0.85
+        self.batch_size = config.get('realtime', 'batch_size', default=256)
+        self.max_wait_ms = config.get('realtime', 'max_wait_ms', default=50)
         self.alerts = []
         
         # Load models
         self._load_models()
-        
+    
     def _load_models(self):
         """Load trained models"""
         try:
@@ -37,12 +99,14 @@ class RealtimeIUUDetector:
             raise
     
     def preprocess_realtime_data(self, ais_record):
-        """Preprocess single AIS record for prediction"""
-        # Convert to DataFrame if dict
+        """Preprocess an AIS record (dict or Series) or a frame of records for prediction"""
+        # Convert to DataFrame if dict or row
         if isinstance(ais_record, dict):
             df = pd.DataFrame([ais_record])
+        elif isinstance(ais_record, pd.Series):
+            df = ais_record.to_frame().T.infer_objects()
         else:
-            df = ais_record.copy()
+            df = ais_record
         
         # Ensure required columns exist
         required_cols = ['MMSI', 'timestamp', 'lat', 'lon', 'SOG', 'COG']
@@ -53,52 +117,51 @@ class RealtimeIUUDetector:
         
         return df
     
+    def score_batch(self, df):
+        """Score a frame of records in one vectorized ensemble call
+        
+        Returns one result row per record, in input order, and raises an
+        alert for every anomalous record.
+        """
+        # Features are assumed to be extracted already (see IncrementalFeatureEngine)
+        results = self.ensemble.predict_with_details(df).reset_index(drop=True)
+        results = results.rename(columns={'ensemble_score': 'anomaly_score'})
+        results['is_anomaly'] = results.pop('anomaly').astype(bool)
+        results['risk_level'] = self._get_risk_levels(results['anomaly_score'].to_numpy())
+        results['detection_time'] = datetime.now().isoformat()
+        
+        for result in results[results['is_anomaly']].to_dict('records'):
+            self._generate_alert(result)
+        
+        return results[RESULT_COLUMNS]
+    
     def detect_anomaly(self, ais_record):
-        """Detect anomaly in real-time AIS record"""
+        """Detect anomaly in real-time AIS record (frames: use ``score_batch``)"""
         # Preprocess
         df = self.preprocess_realtime_data(ais_record)
         if df is None:
             return None
-        
-        # Extract features (simplified - in production, use full feature extraction)
-        # For now, assume features are already extracted
+        if len(df) > 1:
+            logger.warning(f"detect_anomaly scores one record; ignoring {len(df) - 1} more "
+                           f"(use score_batch or process_stream for frames)")
         
         try:
-            # Get prediction
-            scores, predictions = self.ensemble.predict(df)
-            
-            # Create result
-            result = {
-                'MMSI': df['MMSI'].iloc[0],
-                'timestamp': df['timestamp'].iloc[0],
-                'lat': df['lat'].iloc[0],
-                'lon': df['lon'].iloc[0],
-                'anomaly_score': float(scores[0]),
-                'is_anomaly': bool(predictions[0]),
-                'risk_level': self._get_risk_level(scores[0]),
-                'detection_time': datetime.now().isoformat()
-            }
-            
-            # Generate alert if needed
-            if result['is_anomaly']:
-                self._generate_alert(result)
-            
-            return result
-            
+            return self.score_batch(df.iloc[:1]).to_dict('records')[0]
+        
         except Exception as e:
             logger.error(f"Error detecting anomaly: {e}")
             return None
     
-    def _get_risk_level(self, score):
-        """Determine risk level based on score"""
-        if score >= self.high_risk_threshold:
-            return 'CRITICAL'
-        elif score >= self.alert_threshold:
-            return 'HIGH'
-        elif score >= 0.5:
-            return 'MEDIUM'
-        else:
-            return 'LOW'
+    def micro_batcher(self):
+        """Micro-batcher over this detector for record-at-a-time feeds"""
+        return MicroBatcher(self.score_batch, self.batch_size, self.max_wait_ms)
+    
+    def _get_risk_levels(self, scores):
+        """Risk level of every score"""
+        return np.select(
+            [scores >= self.high_risk_threshold, scores >= self.alert_threshold, scores >= 0.5],
+            ['CRITICAL', 'HIGH', 'MEDIUM'], default='LOW'
+        )
     
     def _generate_alert(self, detection_result):
         """Generate alert for anomalous vessel"""
@@ -131,24 +194,37 @@ class RealtimeIUUDetector:
         
         return actions.get(risk_level, 'Monitor vessel activity.')
     
-    def process_stream(self, ais_stream):
-        """Process stream of AIS records"""
+    def process_stream(self, ais_stream, batch_size=None):
+        """Process stream of AIS records in batches of ``batch_size`` (default: realtime.batch_size)
+        
+        A batch that fails to score is retried record by record, so only the
+        records that cannot be scored are dropped.
+        """
         logger.info("Starting real-time detection stream...")
         
-        results = []
+        df = self.preprocess_realtime_data(ais_stream)
+        if df is None:
+            return pd.DataFrame(columns=RESULT_COLUMNS)
+        batch_size = batch_size or self.batch_size
         
-        for idx, record in ais_stream.iterrows():
-            result = self.detect_anomaly(record)
-            if result:
-                results.append(result)
-                
-                # Log progress
-                if (idx + 1) % 100 == 0:
-                    logger.info(f"Processed {idx + 1} records, {len(self.alerts)} alerts generated")
+        results = []
+        for start in range(0, len(df), batch_size):
+            batch = df.iloc[start:start + batch_size]
+            try:
+                results.append(self.score_batch(batch))
+            except Exception as e:
+                logger.error(f"Error scoring batch at record {start}: {e}")
+                rows = [self.detect_anomaly(batch.iloc[[i]]) for i in range(len(batch))]
+                results.append(pd.DataFrame([r for r in rows if r], columns=RESULT_COLUMNS))
+            
+            # Log progress
+            logger.info(f"Processed {min(start + batch_size, len(df))} records, {len(self.alerts)} alerts generated")
         
         logger.info(f"Stream processing complete. Total alerts: {len(self.alerts)}")
         
-        return pd.DataFrame(results)
+        if not results:
+            return pd.DataFrame(columns=RESULT_COLUMNS)
+        return pd.concat(results, ignore_index=True)
     
     def get_active_alerts(self, time_window_hours=24):
         """Get active alerts within time window"""
@@ -234,8 +310,7 @@ def main():
     detector = RealtimeIUUDetector(config)
     
     # Load test data
-    data_path = Path(config.get('data', 'output_dir')) / "ais_all_features.csv"
-    df = pd.read_csv(data_path, parse_dates=['timestamp'])
+    df = StageStore(config).load('ais_all_features')
     
     # Simulate real-time stream (use first 1000 records)
     test_stream = df.head(1000)
@@ -1,8 +1,12 @@
 """Supervised ML models for anomaly detection"""
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.svm import SVC
+from sklearn.ensemble import RandomForestClassifier, HistGradientBoostingClassifier
+from sklearn.svm import SVC, LinearSVC
+from sklearn.linear_model import SGDClassifier
+from sklearn.kernel_approximation import Nystroem, RBFSampler
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.pipeline import make_pipeline
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import classification_report, confusion_matrix, roc_auc_score
@@ -14,33 +18,105 @@ sys.path.append(str(Path(__file__).parent.parent.parent))
 from src.utils.config_loader import load_config
 from src.utils.logger import setup_logger
 
+try:
+    from sklearn.frozen import FrozenEstimator
+except ImportError:  # scikit-learn < 1.6 calibrates prefit models with cv='prefit'
+    FrozenEstimator = None
+
+try:
+    import lightgbm
+except ImportError:
+    lightgbm = None
+
 logger = setup_logger(__name__, "logs/models.log")
 
+def build_random_forest(config):
+    """Random forest (``models.random_forest``)"""
+    return RandomForestClassifier(
+        n_estimators=config.get('models', 'random_forest', 'n_estimators', default=200),
+        max_depth=config.get('models', 'random_forest', 'max_depth', default=20),
+        random_state=config.get('models', 'random_forest', 'random_state', default=42),
+        n_jobs=-1,
+        class_weight='balanced'
+    )
+
+def build_hist_gradient_boosting(config):
+    """Histogram gradient boosting (``models.hist_gradient_boosting``)"""
+    return HistGradientBoostingClassifier(
+        max_iter=config.get('models', 'hist_gradient_boosting', 'max_iter', default=200),
+        learning_rate=config.get('models', 'hist_gradient_boosting', 'learning_rate', default=0.1),
+        max_leaf_nodes=config.get('models', 'hist_gradient_boosting', 'max_leaf_nodes', default=31),
+        random_state=config.get('models', 'hist_gradient_boosting', 'random_state', default=42),
+        class_weight='balanced'
+    )
+
+def build_lightgbm(config):
+    """LightGBM (``models.lightgbm``), an optional dependency"""
+    if lightgbm is None:
+        raise ImportError("lightgbm not installed. Install with: pip install lightgbm")
+    return lightgbm.LGBMClassifier(
+        n_estimators=config.get('models', 'lightgbm', 'n_estimators', default=200),
+        learning_rate=config.get('models', 'lightgbm', 'learning_rate', default=0.1),
+        num_leaves=config.get('models', 'lightgbm', 'num_leaves', default=31),
+        random_state=config.get('models', 'lightgbm', 'random_state', default=42),
+        class_weight='balanced',
+        verbose=-1
+    )
+
+# models.supervised.backend: name -> (builder, handles missing values natively)
+SUPERVISED_BACKENDS = {
+    'random_forest': (build_random_forest, False),
+    'hist_gradient_boosting': (build_hist_gradient_boosting, True),
+    'lightgbm': (build_lightgbm, True)
+}
+
+# Report labels of the tree model backends
+SUPERVISED_BACKEND_NAMES = {
+    'random_forest': 'Random Forest',
+    'hist_gradient_boosting': 'Histogram Gradient Boosting',
+    'lightgbm': 'LightGBM'
+}
+
+def saved_backend(model_dir):
+    """Tree model backend of the models saved in ``model_dir`` (random_forest if not recorded)"""
+    backend_path = Path(model_dir) / "supervised_backend.pkl"
+    return joblib.load(backend_path) if backend_path.exists() else 'random_forest'
+
+# models.svm.backend: exact kernel SVC, or a linear classifier on an approximate RBF feature map
+SVM_BACKENDS = ('svc', 'nystroem', 'rbf_sampler', 'linear')
+
 class SupervisedAnomalyDetector:
     def __init__(self, config):
         self.config = config
         self.scaler = StandardScaler()
-        self.rf_model = None
+        self.tree_model = None
         self.svm_model = None
         self.feature_columns = None
-        
+        self.set_backend(config.get('models', 'supervised', 'backend', default='random_forest'))
+    
+    def set_backend(self, backend):
+        """Select the tree model backend from ``SUPERVISED_BACKENDS``"""
+        if backend not in SUPERVISED_BACKENDS:
+            raise ValueError(f"Unknown supervised backend: {backend}")
+        self.backend = backend
+        self.native_missing = SUPERVISED_BACKENDS[backend][1]
+    
     def prepare_data(self, df, label_column='anomaly'):
         """Prepare data for training"""
         logger.info("Preparing data for supervised learning...")
         
         # Select feature columns (exclude metadata)
         exclude_cols = ['MMSI', 'timestamp', 'lat', 'lon', label_column, 
-                       'lat_diff', 'lon_diff', 'geometry']
+                       'lat_diff', 'lon_diff', 'geometry', 'point_weight']
         self.feature_columns = [col for col in df.columns if col not in exclude_cols]
         
-        X = df[self.feature_columns].copy()
+        # Infinite values count as missing
+        X = df[self.feature_columns].replace([np.inf, -np.inf], np.nan)
         
-        # Handle missing values
-        X = X.fillna(X.mean())
-        
-        # Handle infinite values
-        X = X.replace([np.inf, -np.inf], np.nan)
-        X = X.fillna(X.mean())
+        # Handle missing values (backends with native support see them; the SVM
+        # gets mean-imputed inputs from svm_input)
+        if not self.native_missing:
+            X = X.fillna(X.mean())
         
         if label_column in df.columns:
             y = df[label_column]
@@ -51,54 +127,113 @@ class SupervisedAnomalyDetector:
             logger.info(f"Features: {len(self.feature_columns)}, Samples: {len(X)}")
             return X, None
     
-    def train_random_forest(self, X_train, y_train):
-        """Train Random Forest classifier"""
-        logger.info("Training Random Forest...")
-        
-        n_estimators = self.config.get('models', 'random_forest', 'n_estimators', default=200)
-        max_depth = self.config.get('models', 'random_forest', 'max_depth', default=20)
-        random_state = self.config.get('models', 'random_forest', 'random_state', default=42)
-        
-        self.rf_model = RandomForestClassifier(
-            n_estimators=n_estimators,
-            max_depth=max_depth,
-            random_state=random_state,
-            n_jobs=-1,
-            class_weight='balanced'
-        )
+    def feature_matrix(self, df):
+        """Trained feature columns of ``df`` for scoring, missing values imputed with training means
+        
+        Unlike ``prepare_data`` the feature set and imputation come from the
+        fitted models, so a row gets the same inputs at any batch size.
+        Backends with native missing-value handling get the gaps as NaN.
+        """
+        X = df.reindex(columns=self.feature_columns).astype(float)
+        X = X.replace([np.inf, -np.inf], np.nan)
+        if self.native_missing:
+            return X
+        return X.fillna(pd.Series(self.scaler.mean_, index=self.feature_columns))
+    
+    def svm_input(self, X_scaled):
+        """Scaled features for the SVM; missing values left for a native-missing backend get the training mean (0)"""
+        if not self.native_missing:
+            return X_scaled
+        return np.where(np.isnan(X_scaled), 0.0, X_scaled)
+    
+    def train_tree_model(self, X_train, y_train):
+        """Train the tree model of the configured backend"""
+        logger.info(f"Training {self.backend}...")
         
-        self.rf_model.fit(X_train, y_train)
-        logger.info("Random Forest training complete")
+        self.tree_model = SUPERVISED_BACKENDS[self.backend][0](self.config)
+        self.tree_model.fit(X_train, y_train)
+        logger.info(f"{self.backend} training complete")
         
         # Feature importance
-        feature_importance = pd.DataFrame({
-            'feature': self.feature_columns,
-            'importance': self.rf_model.feature_importances_
-        }).sort_values('importance', ascending=False)
-        
-        logger.info(f"Top 10 important features:\n{feature_importance.head(10)}")
+        if hasattr(self.tree_model, 'feature_importances_'):
+            feature_importance = pd.DataFrame({
+                'feature': self.feature_columns,
+                'importance': self.tree_model.feature_importances_
+            }).sort_values('importance', ascending=False)
+            
+            logger.info(f"Top 10 important features:\n{feature_importance.head(10)}")
         
-        return self.rf_model
+        return self.tree_model
     
     def train_svm(self, X_train, y_train):
         """Train SVM classifier"""
-        logger.info("Training SVM...")
+        backend = self.config.get('models', 'svm', 'backend', default='svc')
+        if backend not in SVM_BACKENDS:
+            raise ValueError(f"Unknown SVM backend: {backend}")
+        logger.info(f"Training SVM ({backend})...")
         
         kernel = self.config.get('models', 'svm', 'kernel', default='rbf')
         C = self.config.get('models', 'svm', 'C', default=1.0)
         
-        self.svm_model = SVC(
-            kernel=kernel,
-            C=C,
-            probability=True,
-            class_weight='balanced'
-        )
+        if backend == 'svc':
+            self.svm_model = SVC(
+                kernel=kernel,
+                C=C,
+                probability=True,
+                class_weight='balanced'
+            )
+            self.svm_model.fit(X_train, y_train)
+        else:
+            self.svm_model = self.train_scalable_svm(X_train, y_train, backend, C)
         
-        self.svm_model.fit(X_train, y_train)
         logger.info("SVM training complete")
         
         return self.svm_model
     
+    def train_scalable_svm(self, X_train, y_train, backend, C):
+        """Linear SVM on an approximate RBF feature map, Platt-calibrated on a held-out split
+        
+        Training is linear in the number of rows and prediction cost is
+        fixed by ``n_components`` rather than the number of support
+        vectors. Probabilities come from one sigmoid fitted on
+        ``calibration_fraction`` of the training rows instead of SVC's
+        internal 5-fold cross-validation.
+        """
+        n_components = self.config.get('models', 'svm', 'n_components', default=500)
+        classifier = self.config.get('models', 'svm', 'classifier', default='sgd')
+        calibration_fraction = self.config.get('models', 'svm', 'calibration_fraction', default=0.1)
+        random_state = self.config.get('models', 'svm', 'random_state', default=42)
+        
+        X_fit, X_cal, y_fit, y_cal = train_test_split(
+            X_train, y_train, test_size=calibration_fraction, random_state=random_state, stratify=y_train
+        )
+        
+        # SVC's gamma='scale' on standardized features
+        gamma = 1.0 / (X_fit.shape[1] * np.asarray(X_fit).var())
+        steps = []
+        if backend == 'nystroem':
+            steps.append(Nystroem(gamma=gamma, n_components=min(n_components, len(X_fit)),
+                                  random_state=random_state))
+        elif backend == 'rbf_sampler':
+            steps.append(RBFSampler(gamma=gamma, n_components=n_components, random_state=random_state))
+        
+        if classifier == 'sgd':
+            # alpha = 1 / (C * n) is the SVM objective's regularization
+            steps.append(SGDClassifier(loss='hinge', alpha=1.0 / (C * len(X_fit)), class_weight='balanced',
+                                       max_iter=50, tol=1e-4, random_state=random_state))
+        elif classifier == 'linear_svc':
+            steps.append(LinearSVC(C=C, class_weight='balanced', dual='auto', random_state=random_state))
+        else:
+            raise ValueError(f"Unknown SVM classifier: {classifier}")
+        
+        model = make_pipeline(*steps).fit(X_fit, y_fit)
+        
+        if FrozenEstimator is not None:
+            calibrated = CalibratedClassifierCV(FrozenEstimator(model), method='sigmoid')
+        else:
+            calibrated = CalibratedClassifierCV(model, method='sigmoid', cv='prefit')
+        return calibrated.fit(X_cal, y_cal)
+    
     def train(self, df, label_column='anomaly'):
         """Train all supervised models"""
         logger.info("=" * 50)
@@ -118,8 +253,8 @@ class SupervisedAnomalyDetector:
         X_test_scaled = self.scaler.transform(X_test)
         
         # Train models
-        self.train_random_forest(X_train_scaled, y_train)
-        self.train_svm(X_train_scaled, y_train)
+        self.train_tree_model(X_train_scaled, y_train)
+        self.train_svm(self.svm_input(X_train_scaled), y_train)
         
         # Evaluate
         self.evaluate(X_test_scaled, y_test)
@@ -132,15 +267,16 @@ class SupervisedAnomalyDetector:
         logger.info("MODEL EVALUATION")
         logger.info("=" * 50)
         
-        # Random Forest
-        logger.info("\nRandom Forest:")
-        rf_pred = self.rf_model.predict(X_test)
-        rf_proba = self.rf_model.predict_proba(X_test)[:, 1]
-        logger.info(f"\n{classification_report(y_test, rf_pred)}")
-        logger.info(f"ROC-AUC: {roc_auc_score(y_test, rf_proba):.4f}")
+        # Tree model
+        logger.info(f"\n{self.backend}:")
+        tree_pred = self.tree_model.predict(X_test)
+        tree_proba = self.tree_model.predict_proba(X_test)[:, 1]
+        logger.info(f"\n{classification_report(y_test, tree_pred)}")
+        logger.info(f"ROC-AUC: {roc_auc_score(y_test, tree_proba):.4f}")
         
         # SVM
         logger.info("\nSVM:")
+        X_test = self.svm_input(X_test)
         svm_pred = self.svm_model.predict(X_test)
         svm_proba = self.svm_model.predict_proba(X_test)[:, 1]
         logger.info(f"\n{classification_report(y_test, svm_pred)}")
@@ -150,11 +286,11 @@ class SupervisedAnomalyDetector:
         """Predict anomalies"""
         X_scaled = self.scaler.transform(X)
         
-        rf_proba = self.rf_model.predict_proba(X_scaled)[:, 1]
-        svm_proba = self.svm_model.predict_proba(X_scaled)[:, 1]
+        tree_proba = self.tree_model.predict_proba(X_scaled)[:, 1]
+        svm_proba = self.svm_model.predict_proba(self.svm_input(X_scaled))[:, 1]
         
         # Ensemble prediction (average)
-        ensemble_proba = (rf_proba + svm_proba) / 2
+        ensemble_proba = (tree_proba + svm_proba) / 2
         
         return ensemble_proba
     
@@ -163,7 +299,10 @@ class SupervisedAnomalyDetector:
         output_dir = Path(output_dir)
         output_dir.mkdir(parents=True, exist_ok=True)
         
-        joblib.dump(self.rf_model, output_dir / "random_forest.pkl")
+        # The tree model keeps the random_forest.pkl name whatever the backend;
+        # readers get the backend from supervised_backend.pkl (saved_backend)
+        joblib.dump(self.tree_model, output_dir / "random_forest.pkl")
+        joblib.dump(self.backend, output_dir / "supervised_backend.pkl")
         joblib.dump(self.svm_model, output_dir / "svm.pkl")
         joblib.dump(self.scaler, output_dir / "scaler.pkl")
         joblib.dump(self.feature_columns, output_dir / "feature_columns.pkl")
@@ -174,7 +313,8 @@ class SupervisedAnomalyDetector:
         """Load trained models"""
         model_dir = Path(model_dir)
         
-        self.rf_model = joblib.load(model_dir / "random_forest.pkl")
+        self.tree_model = joblib.load(model_dir / "random_forest.pkl")
+        self.set_backend(saved_backend(model_dir))
         self.svm_model = joblib.load(model_dir / "svm.pkl")
         self.scaler = joblib.load(model_dir / "scaler.pkl")
         self.feature_columns = joblib.load(model_dir / "feature_columns.pkl")
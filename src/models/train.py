@@ -1,11 +1,11 @@
 """Main training pipeline for all models"""
-import pandas as pd
 from pathlib import Path
 import sys
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
 from src.utils.config_loader import load_config
 from src.utils.logger import setup_logger
+from src.utils.storage import StageStore
 from src.models.supervised_models import SupervisedAnomalyDetector
 from src.models.unsupervised_models import UnsupervisedAnomalyDetector
 from src.models.lstm_model import LSTMTrainer
@@ -40,17 +40,18 @@ def create_synthetic_labels(df):
     
     return df
 
-def main():
-    """Run complete training pipeline"""
-    config = load_config()
+def run_stage(config, df=None):
+    """Train all models on ``df`` (or the ais_all_features stage)
     
+    Returns the labelled frame the models were trained on; the caller's
+    frame is left without the label column.
+    """
     # Load features
-    input_path = Path(config.get('data', 'output_dir')) / "ais_all_features.csv"
-    logger.info(f"Loading features from {input_path}")
-    df = pd.read_csv(input_path, parse_dates=['timestamp'])
+    if df is None:
+        df = StageStore(config).load('ais_all_features')
     
     # Create synthetic labels (replace with real labels if available)
-    df = create_synthetic_labels(df)
+    df = create_synthetic_labels(df.copy(deep=False))
     
     # Train supervised models
     logger.info("\n" + "=" * 70)
@@ -79,6 +80,11 @@ def main():
     logger.info("\n" + "=" * 70)
     logger.info("ALL MODELS TRAINED SUCCESSFULLY")
     logger.info("=" * 70)
+    return df
+
+def main():
+    """Run complete training pipeline"""
+    run_stage(load_config())
 
 if __name__ == "__main__":
     main()
@@ -15,12 +15,16 @@ from src.utils.logger import setup_logger
 logger = setup_logger(__name__, "logs/models.log")
 
 class UnsupervisedAnomalyDetector:
+    # Held-out training rows scored to calibrate a subsampled LOF
+    CALIBRATION_ROWS = 50000
+    
     def __init__(self, config):
         self.config = config
         self.scaler = StandardScaler()
         self.isolation_forest = None
         self.lof = None
         self.feature_columns = None
+        self.calibration = None
         
     def prepare_data(self, df):
         """Prepare data for unsupervised learning"""
@@ -28,7 +32,7 @@ class UnsupervisedAnomalyDetector:
         
         # Select feature columns
         exclude_cols = ['MMSI', 'timestamp', 'lat', 'lon', 'anomaly',
-                       'lat_diff', 'lon_diff', 'geometry']
+                       'lat_diff', 'lon_diff', 'geometry', 'point_weight']
         self.feature_columns = [col for col in df.columns if col not in exclude_cols]
         
         X = df[self.feature_columns].copy()
@@ -41,6 +45,12 @@ class UnsupervisedAnomalyDetector:
         logger.info(f"Features: {len(self.feature_columns)}, Samples: {len(X)}")
         return X
     
+    def feature_matrix(self, df):
+        """Trained feature columns of ``df``, imputed with the scaler's training means"""
+        X = df.reindex(columns=self.feature_columns).astype(float)
+        X = X.replace([np.inf, -np.inf], np.nan)
+        return X.fillna(pd.Series(self.scaler.mean_, index=self.feature_columns))
+    
     def train_isolation_forest(self, X):
         """Train Isolation Forest"""
         logger.info("Training Isolation Forest...")
@@ -64,8 +74,12 @@ class UnsupervisedAnomalyDetector:
         logger.info("Training Local Outlier Factor...")
         
         contamination = self.config.get('models', 'isolation_forest', 'contamination', default=0.1)
+        n_neighbors = self.config.get('models', 'lof', 'n_neighbors', default=20)
+        algorithm = self.config.get('models', 'lof', 'algorithm', default='auto')
         
         self.lof = LocalOutlierFactor(
+            n_neighbors=n_neighbors,
+            algorithm=algorithm,
             contamination=contamination,
             novelty=True,
             n_jobs=-1
@@ -76,6 +90,28 @@ class UnsupervisedAnomalyDetector:
         
         return self.lof
     
+    def lof_reference(self, X):
+        """Reference set the LOF is fitted on, and training rows to calibrate its scores on
+        
+        ``full`` keeps every training row (exact LOF, scoring cost grows with
+        the training set). ``subsample`` keeps a random ``reference_size``
+        rows, which bounds the model's memory and neighbour-search cost; the
+        rows left out calibrate its scores the way new data is scored
+        (None: use the LOF's own training scores).
+        """
+        method = self.config.get('models', 'lof', 'reference', default='full')
+        size = self.config.get('models', 'lof', 'reference_size', default=20000)
+        random_state = self.config.get('models', 'isolation_forest', 'random_state', default=42)
+        
+        if method not in ('full', 'subsample'):
+            raise ValueError(f"Unknown LOF reference method: {method}")
+        if method == 'full' or len(X) <= size:
+            return X, None
+        
+        order = np.random.default_rng(random_state).permutation(len(X))
+        logger.info(f"LOF reference ({method}): {size} of {len(X)} training rows")
+        return X[order[:size]], order[size:size + self.CALIBRATION_ROWS]
+    
     def train(self, df):
         """Train all unsupervised models"""
         logger.info("=" * 50)
@@ -89,18 +125,59 @@ class UnsupervisedAnomalyDetector:
         X_scaled = self.scaler.fit_transform(X)
         
         # Train models
+        X_reference, calibration_rows = self.lof_reference(X_scaled)
         self.train_isolation_forest(X_scaled)
-        self.train_lof(X_scaled)
+        self.train_lof(X_reference)
         
-        # Get anomaly scores
+        # Get anomaly scores (on a full reference LOF's own training scores;
+        # score_samples would count each point as its neighbour)
         if_scores = self.isolation_forest.score_samples(X_scaled)
-        lof_scores = self.lof.score_samples(X_scaled)
+        if calibration_rows is None:
+            lof_scores = self.lof.negative_outlier_factor_
+        else:
+            lof_scores = self.lof.score_samples(X_scaled[calibration_rows])
         
         logger.info(f"Isolation Forest anomaly score range: [{if_scores.min():.4f}, {if_scores.max():.4f}]")
         logger.info(f"LOF anomaly score range: [{lof_scores.min():.4f}, {lof_scores.max():.4f}]")
         
+        self.fit_calibration(if_scores, lof_scores)
+        
         return X_scaled
     
+    def fit_calibration(self, if_scores, lof_scores):
+        """Fix the raw score to [0, 1] mapping on the training scores
+        
+        ``quantile`` maps a score to its rank among the training scores,
+        ``minmax`` to its position between the training min and max
+        (clipped). Either way a row's score no longer depends on the
+        batch it is scored in.
+        """
+        method = self.config.get('models', 'unsupervised_calibration', 'method', default='quantile')
+        n_quantiles = self.config.get('models', 'unsupervised_calibration', 'n_quantiles', default=1001)
+        
+        if method == 'quantile':
+            probs = np.linspace(0, 1, n_quantiles)
+            reference = {name: np.quantile(scores, probs)
+                         for name, scores in [('isolation_forest', if_scores), ('lof', lof_scores)]}
+        elif method == 'minmax':
+            reference = {name: np.array([scores.min(), scores.max()])
+                         for name, scores in [('isolation_forest', if_scores), ('lof', lof_scores)]}
+        else:
+            raise ValueError(f"Unknown score calibration method: {method}")
+        
+        self.calibration = {'method': method, **reference}
+        logger.info(f"Score calibration fitted ({method})")
+        return self.calibration
+    
+    def normalize_scores(self, scores, model_name):
+        """Raw scores (lower = more anomalous) to [0, 1] where 1 = anomaly"""
+        if self.calibration is None:
+            # Models saved without calibration: batch-relative min-max
+            return 1 - (scores - scores.min()) / (scores.max() - scores.min())
+        
+        reference = self.calibration[model_name]
+        return 1 - np.interp(scores, reference, np.linspace(0, 1, len(reference)))
+    
     def predict(self, X):
         """Predict anomaly scores"""
         X_scaled = self.scaler.transform(X)
@@ -110,8 +187,8 @@ class UnsupervisedAnomalyDetector:
         lof_scores = self.lof.score_samples(X_scaled)
         
         # Normalize to [0, 1] where 1 = anomaly
-        if_scores_norm = 1 - (if_scores - if_scores.min()) / (if_scores.max() - if_scores.min())
-        lof_scores_norm = 1 - (lof_scores - lof_scores.min()) / (lof_scores.max() - lof_scores.min())
+        if_scores_norm = self.normalize_scores(if_scores, 'isolation_forest')
+        lof_scores_norm = self.normalize_scores(lof_scores, 'lof')
         
         # Ensemble (average)
         ensemble_scores = (if_scores_norm + lof_scores_norm) / 2
@@ -127,6 +204,7 @@ class UnsupervisedAnomalyDetector:
         joblib.dump(self.lof, output_dir / "lof.pkl")
         joblib.dump(self.scaler, output_dir / "unsupervised_scaler.pkl")
         joblib.dump(self.feature_columns, output_dir / "unsupervised_feature_columns.pkl")
+        joblib.dump(self.calibration, output_dir / "unsupervised_calibration.pkl")
         
         logger.info(f"Unsupervised models saved to {output_dir}")
     
@@ -139,4 +217,12 @@ class UnsupervisedAnomalyDetector:
         self.scaler = joblib.load(model_dir / "unsupervised_scaler.pkl")
         self.feature_columns = joblib.load(model_dir / "unsupervised_feature_columns.pkl")
         
+        calibration_path = model_dir / "unsupervised_calibration.pkl"
+        if calibration_path.exists():
+            self.calibration = joblib.load(calibration_path)
+        else:
+            self.calibration = None
+            logger.warning("No score calibration saved with these models: scores are normalized per batch "
+                           "until they are retrained")
+        
         logger.info(f"Unsupervised models loaded from {model_dir}")
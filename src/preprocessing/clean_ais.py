@@ -1,18 +1,56 @@
 import pandas as pd
 import numpy as np
+import time
 from pathlib import Path
 import sys
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
 from src.utils.config_loader import load_config
 from src.utils.logger import setup_logger
+from src.utils.storage import StageStore
+from src.utils.schema import peak_rss_mb
+from src.preprocessing.compress_trajectory import TrajectoryCompressor, compression_enabled
 
 logger = setup_logger(__name__, "logs/preprocessing.log")
 
+DUPLICATE_KEYS = ['MMSI', 'timestamp', 'lat', 'lon']
+
+class RecentMessageState:
+    """Bounded per-vessel memory of recently seen duplicate keys
+    
+    Keeps at most ``window`` keys per MMSI, so duplicates are caught across
+    chunk boundaries as long as the repeat arrives within the vessel's last
+    ``window`` messages.
+    """
+    
+    def __init__(self, window):
+        self.window = window
+        self.recent = None
+    
+    def drop_seen(self, chunk):
+        """Remove rows whose key was seen in an earlier chunk and remember the rest"""
+        if self.recent is None:
+            self.recent = chunk[DUPLICATE_KEYS].groupby('MMSI', sort=False).tail(self.window)
+            return chunk
+        
+        if len(self.recent) > 0:
+            seen = chunk[DUPLICATE_KEYS].merge(
+                self.recent.assign(_seen=True), on=DUPLICATE_KEYS, how='left'
+            )['_seen'].notna().to_numpy()
+            chunk = chunk[~seen]
+        
+        self.recent = pd.concat(
+            [self.recent, chunk[DUPLICATE_KEYS]], ignore_index=True
+        ).groupby('MMSI', sort=False).tail(self.window)
+        return chunk
+
 class AISCleaner:
     def __init__(self, config):
         self.config = config
-        
+        self.chunksize = config.get('preprocessing', 'streaming', 'chunksize', default=500000)
+        self.dedup_window = config.get('preprocessing', 'streaming', 'dedup_window', default=64)
+        self.compressor = TrajectoryCompressor(config) if compression_enabled(config) else None
+    
     def load_data(self, filepath):
         """Load AIS data from CSV"""
         logger.info(f"Loading AIS data from {filepath}")
@@ -57,7 +95,7 @@ class AISCleaner:
         df = df[df['COG'].between(0, 360)]
         
         return df
-
+    
     def remove_duplicates(self, df):
         """Remove duplicate records"""
         logger.info("Removing duplicates...")
@@ -74,24 +112,84 @@ class AISCleaner:
         df = self.clean_timestamps(df)
         df = self.clean_speed_course(df)
         df = self.remove_duplicates(df)
+        if self.compressor is not None:
+            df = self.compressor.compress(df)
         logger.info(f"Cleaning complete. Final records: {len(df)}")
         return df
+    
+    def clean_streaming(self, filepath, store, stage='ais_cleaned'):
+        """Clean a raw AIS file chunk by chunk into a partitioned stage
+        
+        Only one chunk is held in memory at a time. Each cleaned chunk is
+        sorted by (MMSI, timestamp) and written as its own part file;
+        duplicates across chunks are dropped using bounded per-MMSI state.
+        With compression enabled each chunk is compressed on its own, so a
+        track's reports at chunk boundaries are always kept.
+        
+        Returns row counts and throughput. ``peak_rss_mb`` is the peak of the
+        whole process so far, so inside a pipeline run it includes whatever
+        ran before this stage.
+        """
+        logger.info(f"Streaming AIS data from {filepath} in chunks of {self.chunksize}")
+        store.clear_parts(stage)
+        state = RecentMessageState(self.dedup_window)
+        
+        start_time = time.perf_counter()
+        rows_in = rows_out = 0
+        
+        for part_number, chunk in enumerate(pd.read_csv(filepath, chunksize=self.chunksize)):
+            rows_in += len(chunk)
+            chunk = self.clean_coordinates(chunk)
+            chunk = self.clean_timestamps(chunk)
+            chunk = self.clean_speed_course(chunk)
+            chunk = self.remove_duplicates(chunk)
+            chunk = state.drop_seen(chunk)
+            if self.compressor is not None:
+                chunk = self.compressor.compress(chunk)
+            
+            store.save_part(chunk, stage, part_number)
+            rows_out += len(chunk)
+        
+        elapsed = time.perf_counter() - start_time
+        
+        stats = {
+            'rows_in': rows_in,
+            'rows_out': rows_out,
+            'parts': part_number + 1 if rows_in else 0,
+            'seconds': elapsed,
+            'rows_per_second': rows_in / elapsed if elapsed > 0 else 0.0,
+            'peak_rss_mb': peak_rss_mb()
+        }
+        logger.info(f"Streaming clean complete: {rows_out}/{rows_in} records kept in {stats['parts']} parts, "
+                    f"{stats['rows_per_second']:,.0f} rows/s, peak RSS {stats['peak_rss_mb']:.0f} MB")
+        return stats
 
-def main():
-    config = load_config()
+def run_stage(config):
+    """Clean the raw AIS file into the ais_cleaned stage
+    
+    Returns the cleaned frame, or None in streaming mode, where the stage is
+    written part by part and never held in memory.
+    """
     cleaner = AISCleaner(config)
+    input_path = config.get('data', 'ais_data')
+    
+    if config.get('preprocessing', 'streaming', 'enabled', default=False):
+        # Chunked cleaning for raw files larger than memory
+        cleaner.clean_streaming(input_path, StageStore(config))
+        return None
     
     # Load and clean data
-    input_path = config.get('data', 'ais_data')
     df = cleaner.load_data(input_path)
     df_clean = cleaner.clean(df)
     
     # Save cleaned data
-    output_dir = Path(config.get('data', 'output_dir'))
-    output_dir.mkdir(parents=True, exist_ok=True)
-    output_path = output_dir / "ais_cleaned.csv"
-    df_clean.to_csv(output_path, index=False)
+    output_path = StageStore(config).save(df_clean, 'ais_cleaned')
     logger.info(f"Saved cleaned data to {output_path}")
+    df_clean.index = pd.RangeIndex(len(df_clean))  # as read back from the store
+    return df_clean
+
+def main():
+    run_stage(load_config())
 
 if __name__ == "__main__":
     main()
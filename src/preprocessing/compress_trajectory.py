@@ -0,0 +1,116 @@
+"""Dead-reckoning compression of cleaned AIS tracks"""
+import numpy as np
+from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src.utils.config_loader import load_config
+from src.utils.logger import setup_logger
+from src.utils.storage import StageStore
+from src.features.kernels import (
+    WEIGHT_COLUMN, track_starts, time_gaps_minutes, gap_flags, step_distances_km,
+    position_jump_flags, dead_reckoning_keep, resolve_backend
+)
+
+logger = setup_logger(__name__, "logs/preprocessing.log")
+
+class TrajectoryCompressor:
+    """Drop reports that the last kept report's speed and course already predict
+    
+    Vessels at anchor or in steady transit send long runs of near-identical
+    reports. A report is dropped only while it stays within ``tolerance_km``
+    of the dead-reckoned position and its SOG and COG stay within their
+    tolerances. Track ends, both reports around a transmission gap or a
+    position jump and reports without speed or course are always kept, and
+    kept reports are never more than ``max_interval_minutes`` apart, so gap
+    features see the same gaps.
+    Each kept report gets a ``point_weight``: itself plus the dropped
+    reports it predicted, up to the next kept one. Rolling features weight
+    rows by it.
+    """
+    
+    METHODS = ('dead_reckoning',)
+    
+    def __init__(self, config):
+        self.config = config
+        self.method = config.get('preprocessing', 'compression', 'method', default='dead_reckoning')
+        self.tolerance_km = config.get('preprocessing', 'compression', 'tolerance_km', default=0.5)
+        self.sog_tolerance = config.get('preprocessing', 'compression', 'sog_tolerance_knots', default=2.0)
+        self.cog_tolerance = config.get('preprocessing', 'compression', 'cog_tolerance_degrees', default=20)
+        self.max_gap_minutes = config.get('features', 'transmission', 'max_gap_minutes', default=60)
+        self.max_interval_minutes = (config.get('preprocessing', 'compression', 'max_interval_minutes', default=None)
+                                     or self.max_gap_minutes)
+        self.kernel_backend = resolve_backend(config)
+        self.stats = None
+        
+        if self.method not in self.METHODS:
+            raise ValueError(f"Unknown compression method: {self.method}")
+    
+    def must_keep(self, df, starts):
+        """Reports that are never dropped"""
+        n = len(df)
+        lat = df['lat'].to_numpy(dtype=float)
+        lon = df['lon'].to_numpy(dtype=float)
+        
+        keep = starts.copy()
+        keep[np.flatnonzero(starts)[1:] - 1] = True  # last report of each track
+        keep[n - 1:] = True
+        
+        # Both sides of transmission gaps and implausible jumps
+        gaps = time_gaps_minutes(df['timestamp'].to_numpy(), starts)
+        distance = step_distances_km(lat, lon, starts, backend=self.kernel_backend)
+        breaks = (gap_flags(gaps, self.max_gap_minutes) | position_jump_flags(distance, gaps)).astype(bool)
+        keep |= breaks
+        keep[:-1] |= breaks[1:]
+        
+        keep |= ~np.isfinite(df['SOG'].to_numpy(dtype=float)) | ~np.isfinite(df['COG'].to_numpy(dtype=float))
+        return keep
+    
+    def compress(self, df):
+        """Compressed copy of a frame, sorted by (MMSI, timestamp), with ``point_weight``"""
+        n_in = len(df)
+        if n_in == 0:
+            return df.assign(**{WEIGHT_COLUMN: np.ones(0, dtype=np.int32)})
+        
+        df = df.sort_values(['MMSI', 'timestamp'], kind='stable')
+        starts = track_starts(df['MMSI'].to_numpy())
+        seconds = df['timestamp'].to_numpy(dtype='datetime64[ns]').view('int64') / 1e9
+        
+        keep = dead_reckoning_keep(
+            df['lat'].to_numpy(dtype=float), df['lon'].to_numpy(dtype=float), seconds,
+            df['SOG'].to_numpy(dtype=float), df['COG'].to_numpy(dtype=float), self.must_keep(df, starts),
+            self.tolerance_km, self.sog_tolerance, self.cog_tolerance, self.max_interval_minutes * 60,
+            backend=self.kernel_backend
+        )
+        
+        # Dropped reports count towards the kept one they were predicted from
+        # (every track start is kept); weights of an already compressed frame accumulate
+        kept = np.flatnonzero(keep)
+        weights = (df[WEIGHT_COLUMN].to_numpy(dtype=np.int64) if WEIGHT_COLUMN in df.columns
+                   else np.ones(n_in, dtype=np.int64))
+        
+        df = df.iloc[kept].copy()
+        df[WEIGHT_COLUMN] = np.add.reduceat(weights, kept).astype(np.int32)
+        
+        self.stats = {
+            'rows_in': n_in,
+            'rows_out': len(df),
+            'ratio': n_in / max(len(df), 1)
+        }
+        logger.info(f"Trajectory compression ({self.method}): kept {len(df)}/{n_in} reports "
+                    f"({self.stats['ratio']:.1f}x)")
+        return df
+
+def compression_enabled(config):
+    """Whether cleaning compresses tracks (``preprocessing.compression.enabled``)"""
+    return config.get('preprocessing', 'compression', 'enabled', default=False)
+
+def main():
+    """Compress the stored ais_cleaned stage in place"""
+    config = load_config()
+    store = StageStore(config)
+    df = TrajectoryCompressor(config).compress(store.load('ais_cleaned'))
+    store.save(df, 'ais_cleaned')
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,121 @@
 import geopandas as gpd
 import pandas as pd
-from shapely.geometry import Point
+import numpy as np
+import shapely
 from pathlib import Path
 import sys
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
 from src.utils.config_loader import load_config
 from src.utils.logger import setup_logger
+from src.utils.storage import StageStore
 
 logger = setup_logger(__name__, "logs/preprocessing.log")
 
+class EEZMembershipIndex:
+    """Vectorized point-in-EEZ test backed by a rasterized cell mask
+    
+    The EEZ features are merged and prepared once. A regular grid over their
+    bounding box classifies each cell as fully inside, fully outside or
+    crossing the boundary, so only points in boundary cells need an exact
+    shapely test. Membership is strict interior, matching sjoin's 'within'.
+    """
+    
+    OUTSIDE, INSIDE, BOUNDARY = 0, 1, 2
+    
+    def __init__(self, boundary, grid_size=256):
+        if boundary.crs is not None and not boundary.crs.equals("EPSG:4326"):
+            boundary = boundary.to_crs("EPSG:4326")
+        
+        self.geometry = shapely.union_all(boundary.geometry.values)
+        shapely.prepare(self.geometry)
+        self.minx, self.miny, self.maxx, self.maxy = self.geometry.bounds
+        self.grid_size = grid_size
+        self.cell_state = self._rasterize()
+    
+    def _rasterize(self):
+        """Classify grid cells against the EEZ geometry"""
+        n = self.grid_size
+        self.dx = (self.maxx - self.minx) / n
+        self.dy = (self.maxy - self.miny) / n
+        
+        # Pad cells slightly so points rounded into a neighbouring cell are still covered
+        pad = 1e-9 * max(self.dx, self.dy, 1.0)
+        x0, y0 = np.meshgrid(
+            self.minx + self.dx * np.arange(n),
+            self.miny + self.dy * np.arange(n)
+        )
+        cells = shapely.box(x0 - pad, y0 - pad, x0 + self.dx + pad, y0 + self.dy + pad)
+        
+        state = np.full(cells.shape, self.BOUNDARY, dtype=np.int8)
+        state[shapely.contains_properly(self.geometry, cells)] = self.INSIDE
+        state[shapely.disjoint(self.geometry, cells)] = self.OUTSIDE
+        
+        logger.info(f"EEZ grid {n}x{n}: {(state == self.INSIDE).sum()} inside, "
+                    f"{(state == self.BOUNDARY).sum()} boundary cells")
+        return state
+    
+    def contains(self, lon, lat):
+        """Boolean mask of positions strictly inside the EEZ"""
+        lon = np.asarray(lon, dtype=float)
+        lat = np.asarray(lat, dtype=float)
+        result = np.zeros(len(lon), dtype=bool)
+        
+        # Bounding-box prefilter (NaN coordinates fall out here)
+        candidates = np.flatnonzero(
+            (lon > self.minx) & (lon < self.maxx) & (lat > self.miny) & (lat < self.maxy)
+        )
+        if len(candidates) == 0:
+            return result
+        
+        cand_lon = lon[candidates]
+        cand_lat = lat[candidates]
+        ix = np.minimum(((cand_lon - self.minx) / self.dx).astype(np.intp), self.grid_size - 1)
+        iy = np.minimum(((cand_lat - self.miny) / self.dy).astype(np.intp), self.grid_size - 1)
+        state = self.cell_state[iy, ix]
+        
+        result[candidates[state == self.INSIDE]] = True
+        
+        # Exact test only near the boundary
+        boundary = state == self.BOUNDARY
+        result[candidates[boundary]] = shapely.contains_xy(
+            self.geometry, cand_lon[boundary], cand_lat[boundary]
+        )
+        return result
+
 class EEZFilter:
     def __init__(self, config):
         self.config = config
         self.eez_boundary = None
-        
+        self.eez_index = None
+        self.engine = config.get('eez', 'engine', default='index')
+        self.grid_size = config.get('eez', 'grid_size', default=256)
+    
     def load_eez_boundary(self, filepath):
         """Load EEZ boundary from GeoJSON"""
         logger.info(f"Loading EEZ boundary from {filepath}")
         self.eez_boundary = gpd.read_file(filepath)
+        self.eez_index = None
         logger.info(f"Loaded EEZ boundary with {len(self.eez_boundary)} features")
         return self.eez_boundary
     
+    def build_index(self):
+        """Prepare the EEZ membership index once per boundary"""
+        if self.eez_boundary is None:
+            raise ValueError("EEZ boundary not loaded")
+        
+        if self.eez_index is None:
+            self.eez_index = EEZMembershipIndex(self.eez_boundary, self.grid_size)
+        return self.eez_index
+    
+    def within_eez_mask(self, df):
+        """Boolean mask of AIS records inside the EEZ"""
+        return self.build_index().contains(df['lon'].to_numpy(), df['lat'].to_numpy())
+    
     def create_geodataframe(self, df):
         """Convert DataFrame to GeoDataFrame"""
         logger.info("Creating GeoDataFrame from AIS data...")
-        geometry = [Point(xy) for xy in zip(df['lon'], df['lat'])]
+        geometry = gpd.points_from_xy(df['lon'], df['lat'])
         gdf = gpd.GeoDataFrame(df, geometry=geometry, crs="EPSG:4326")
         return gdf
     
@@ -67,31 +157,42 @@ class EEZFilter:
         eez_path = self.config.get('data', 'eez_boundary')
         self.load_eez_boundary(eez_path)
         
-        # Create GeoDataFrame and filter
-        gdf = self.create_geodataframe(df)
-        gdf_filtered = self.filter_within_eez(gdf)
-        
-        # Convert back to DataFrame
-        df_filtered = pd.DataFrame(gdf_filtered.drop(columns='geometry'))
+        if self.engine == 'sjoin':
+            # Create GeoDataFrame and filter
+            gdf = self.create_geodataframe(df)
+            gdf_filtered = self.filter_within_eez(gdf)
+            
+            # Convert back to DataFrame
+            df_filtered = pd.DataFrame(gdf_filtered.drop(columns='geometry'))
+        else:
+            logger.info("Filtering trajectories within EEZ (grid index)...")
+            mask = self.within_eez_mask(df)
+            df_filtered = df[mask]
+            logger.info(f"Filtered to {len(df_filtered)} records within EEZ ({mask.mean()*100:.2f}%)")
         
         logger.info(f"EEZ filtering complete. Final records: {len(df_filtered)}")
         return df_filtered
 
-def main():
-    config = load_config()
+def run_stage(config, df=None):
+    """Filter cleaned reports (``df`` or the ais_cleaned stage) into ais_eez_filtered"""
     eez_filter = EEZFilter(config)
+    store = StageStore(config)
     
     # Load cleaned data
-    input_path = Path(config.get('data', 'output_dir')) / "ais_cleaned.csv"
-    df = pd.read_csv(input_path)
+    if df is None:
+        df = store.load('ais_cleaned')
     
     # Filter within EEZ
     df_eez = eez_filter.filter(df)
     
     # Save filtered data
-    output_path = Path(config.get('data', 'output_dir')) / "ais_eez_filtered.csv"
-    df_eez.to_csv(output_path, index=False)
+    output_path = store.save(df_eez, 'ais_eez_filtered')
     logger.info(f"Saved EEZ-filtered data to {output_path}")
+    df_eez.index = pd.RangeIndex(len(df_eez))
+    return df_eez
+
+def main():
+    run_stage(load_config())
 
 if __name__ == "__main__":
     main()
@@ -14,6 +14,8 @@ import schedule
 from threading import Thread
 
 from src.data.ais_api_integration import AISDataManager
+from src.data.ais_archive import AISArchive
+from src.features.incremental_features import IncrementalFeatureEngine
 from src.utils.config_loader import load_config
 from src.utils.logger import setup_logger
 
@@ -33,9 +35,23 @@ class LiveMonitoringSystem:
         self.config = load_config()
         self.update_interval = update_interval
         self.ais_manager = AISDataManager()
+        self.bbox = [6, 68, 22, 88]  # Indian EEZ
+        self.feature_engine = IncrementalFeatureEngine(self.config)
+        self.archive = AISArchive(self.config)
+        self.detector = self._load_detector()
+        self.results = None  # scored reports of the current window, carried between cycles
         self.is_running = False
         self.last_update = None
     
+    def _load_detector(self):
+        """Real-time detector over the trained models, or None if they (or torch) are unavailable"""
+        try:
+            from src.models.realtime_detector import RealtimeIUUDetector
+            return RealtimeIUUDetector(self.config)
+        except Exception as e:
+            logger.warning(f"⚠️ Trained models unavailable ({e}), using placeholder scores")
+            return None
+    
     def fetch_live_data(self):
         """Fetch live AIS data from API or generate sample data"""
         try:
@@ -43,8 +59,8 @@ class LiveMonitoringSystem:
             logger.info(f"🌊 FETCHING LIVE AIS DATA - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
             logger.info("=" * 70)
             
-            # Fetch data for Indian EEZ
-            bbox = [6, 68, 22, 88]  # Indian EEZ
+            # Fetch data for Indian EEZ (streaming providers are drained, not awaited)
+            bbox = self.bbox
             logger.info(f"📍 Target region: Indian EEZ ({bbox[0]}°N-{bbox[2]}°N, {bbox[1]}°E-{bbox[3]}°E)")
             
             df = self.ais_manager.fetch_live_data(bbox=bbox, time_range=60)
@@ -94,15 +110,32 @@ class LiveMonitoringSystem:
             return None
     
     def process_data(self, df):
-        """Add dummy scores for visualization"""
+        """Score new reports (with their incremental features)
+        
+        Uses the trained ensemble when it is available and falls back to
+        placeholder scores for visualization otherwise.
+        """
         try:
-            logger.info("🔄 Adding visualization scores...")
+            logger.info(f"🔄 Scoring {len(df)} new reports...")
+            
+            scores = None
+            if self.detector is not None:
+                try:
+                    scores = self.detector.score_batch(df)
+                except Exception as e:
+                    logger.error(f"❌ Ensemble scoring failed, using placeholder scores: {e}")
             
-            # Add random scores for now (will be replaced with real ML predictions later)
-            df['supervised_score'] = np.random.beta(2, 5, len(df))
-            df['unsupervised_score'] = np.random.beta(2, 5, len(df))
-            df['ensemble_score'] = (df['supervised_score'] + df['unsupervised_score']) / 2
-            df['is_anomaly'] = df['ensemble_score'] >= 0.7
+            if scores is not None:
+                df['supervised_score'] = scores['supervised_score'].to_numpy()
+                df['unsupervised_score'] = scores['unsupervised_score'].to_numpy()
+                df['ensemble_score'] = scores['anomaly_score'].to_numpy()
+                df['is_anomaly'] = scores['is_anomaly'].to_numpy()
+            else:
+                # Random placeholder scores until models are trained
+                df['supervised_score'] = np.random.beta(2, 5, len(df))
+                df['unsupervised_score'] = np.random.beta(2, 5, len(df))
+                df['ensemble_score'] = (df['supervised_score'] + df['unsupervised_score']) / 2
+                df['is_anomaly'] = df['ensemble_score'] >= 0.7
             
             anomaly_count = df['is_anomaly'].sum()
             logger.info(f"     ✅ Processed: {len(df)} records, {anomaly_count} potential anomalies")
@@ -113,21 +146,23 @@ class LiveMonitoringSystem:
             logger.error(f"❌ Error processing data: {e}")
             return df
     
-    def save_results(self, df):
-        """Save processed results"""
+    def save_results(self, df, new_rows=None):
+        """Save processed results
+        
+        The dashboards read the whole scored window; only ``new_rows``
+        (reports scored in this cycle) are archived.
+        """
         try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            
             # Save to outputs folder
             output_path = Path("outputs/anomaly_predictions.csv")
             df.to_csv(output_path, index=False)
             logger.info(f"💾 Saved results to: {output_path}")
             
-            # Save timestamped copy
-            archive_path = Path(f"outputs/archive/predictions_{timestamp}.csv")
-            archive_path.parent.mkdir(parents=True, exist_ok=True)
-            df.to_csv(archive_path, index=False)
-            logger.info(f"📁 Archived to: {archive_path}")
+            # Append to the day/tile-partitioned prediction archive
+            new_rows = df if new_rows is None else new_rows
+            if not new_rows.empty:
+                self.archive.append(new_rows, 'predictions')
+            logger.info(f"📁 Archived to: {self.archive.dataset_dir('predictions')}")
             
             # Generate alert summary
             self._generate_alert_summary(df)
@@ -179,18 +214,31 @@ class LiveMonitoringSystem:
                 logger.warning("No data to process")
                 return
             
-            # Process data (add scores)
-            df_results = self.process_data(df)
-            if df_results is None or df_results.empty:
-                logger.warning("Processing failed")
+            # Update per-vessel feature state with the reports not seen in earlier cycles;
+            # only those are archived and scored
+            df = df.reset_index(drop=True)
+            new_reports = self.feature_engine.update_frame(df)
+            if new_reports.empty:
+                logger.info("No new AIS reports since the last cycle")
+            else:
+                self.archive.append(new_reports, 'positions')
+                new_reports = self.process_data(new_reports)
+            
+            # Earlier reports keep the scores of the cycle that first saw them
+            df_results = self._carry_over(new_reports, pd.to_datetime(df['timestamp']).min())
+            if df_results.empty:
+                logger.warning("No scored reports in the current window")
                 return
             
             # Save results
-            self.save_results(df_results)
+            self.save_results(df_results, new_reports)
             
             # Update timestamp
             self.last_update = datetime.now()
             
+            # Merge closed days into single parts and drop days past retention
+            self.archive.maintain()
+            
             # Calculate duration
             duration = time.time() - start_time
             logger.info("=" * 70)
@@ -203,6 +251,16 @@ class LiveMonitoringSystem:
             import traceback
             logger.error(traceback.format_exc())
     
+    def _carry_over(self, new_results, window_start):
+        """Scored reports of the current window: earlier cycles' rows still inside it plus ``new_results``"""
+        parts = [part for part in (self.results, new_results) if part is not None and not part.empty]
+        if not parts:
+            return new_results
+        results = pd.concat(parts, ignore_index=True)
+        results = results[pd.to_datetime(results['timestamp']) >= window_start].reset_index(drop=True)
+        self.results = results
+        return results
+    
     def start_monitoring(self):
         """Start continuous monitoring"""
         logger.info("=" * 70)
@@ -210,11 +268,14 @@ class LiveMonitoringSystem:
         logger.info("=" * 70)
         logger.info(f"⏱️  Update interval: {self.update_interval} minutes")
         logger.info(f"🌍 Coverage: Indian EEZ (6°N-22°N, 68°E-88°E)")
-        logger.info(f"🤖 Models: {'Loaded' if self.ensemble else 'Not loaded'}")
+        logger.info(f"🤖 Models: {'Loaded' if self.detector is not None else 'Not loaded'}")
         logger.info("=" * 70)
         
         self.is_running = True
         
+        # Keep streaming subscriptions open between update cycles
+        self.ais_manager.start_streams(self.bbox)
+        
         # Run first update immediately
         logger.info("Running initial update...")
         self.run_update_cycle()
@@ -236,6 +297,7 @@ class LiveMonitoringSystem:
     def stop_monitoring(self):
         """Stop monitoring"""
         self.is_running = False
+        self.ais_manager.close()
         logger.info("=" * 70)
         logger.info("🛑 MONITORING SYSTEM STOPPED")
         logger.info("=" * 70)
@@ -260,6 +322,7 @@ def main():
         # Run once
         logger.info("Running single update cycle...")
         system.run_update_cycle()
+        system.ais_manager.close()
     else:
         # Start continuous monitoring
         system.start_monitoring()
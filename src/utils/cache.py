@@ -0,0 +1,341 @@
+"""Content-addressed cache of pipeline stage outputs"""
+import json
+import time
+import shutil
+import hashlib
+from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src.utils.logger import setup_logger
+from src.utils.storage import StageStore
+from src.features.kernels import resolve_backend
+
+logger = setup_logger(__name__, "logs/cache.log")
+
+REPO_ROOT = Path(__file__).parent.parent.parent
+
+# How each stored stage is produced: inputs (stages and config file paths),
+# the config sub-trees and source code it depends on, and the stages it writes.
+# kernel_backend: outputs depend on the kernel backend actually resolved
+# ('auto' gives numba or NumPy depending on the machine)
+STAGE_STEPS = {
+    'clean_ais': {
+        'input_files': [('data', 'ais_data')],
+        'input_stages': [],
+        # features.transmission: the compressor keeps gap boundaries at max_gap_minutes
+        'config_keys': [('preprocessing',), ('features', 'transmission'), ('data', 'compact_dtypes')],
+        'code': ['src/preprocessing/clean_ais.py', 'src/preprocessing/compress_trajectory.py',
+                 'src/features/kernels.py', 'src/utils/schema.py', 'src/utils/storage.py'],
+        'outputs': ['ais_cleaned']
+    },
+    'filter_eez': {
+        'input_files': [('data', 'eez_boundary')],
+        'input_stages': ['ais_cleaned'],
+        'config_keys': [('eez',), ('data', 'compact_dtypes')],
+        'code': ['src/preprocessing/eez_filter.py', 'src/utils/schema.py', 'src/utils/storage.py'],
+        'outputs': ['ais_eez_filtered']
+    },
+    'extract_features': {
+        'input_files': [],
+        'input_stages': ['ais_eez_filtered'],
+        'config_keys': [('features',), ('data', 'compact_dtypes')],
+        'code': ['src/features', 'src/utils/schema.py', 'src/utils/storage.py'],
+        'kernel_backend': True,
+        'outputs': ['ais_all_features']
+    },
+    'spatiotemporal_features': {
+        'input_files': [],
+        'input_stages': ['ais_all_features'],
+        'config_keys': [('features',), ('data', 'compact_dtypes')],
+        'code': ['src/features', 'src/utils/schema.py', 'src/utils/storage.py'],
+        'kernel_backend': True,
+        'outputs': ['ais_enhanced_features', 'ais_vessel_features', 'ais_fishing_hotspots']
+    }
+}
+
+def file_digest(path, block_size=1 << 20):
+    """SHA-256 of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _files(path):
+    """A file, or the sorted files below a directory"""
+    path = Path(path)
+    if path.is_dir():
+        return sorted(p for p in path.rglob('*') if p.is_file() and '__pycache__' not in p.parts)
+    return [path] if path.exists() else []
+
+class StageCache:
+    """Skip pipeline steps whose inputs, config and code are unchanged
+    
+    A step's key hashes the content of its input files and stages, the
+    config sub-trees it reads and the source files of its code. Outputs are
+    copied into ``cache.dir/<key>/``; on a hit they are restored into the
+    stage store instead of recomputing them. File digests are remembered
+    by (size, mtime) so unchanged inputs are not re-read on every run.
+    Entries older than ``max_age_days`` are removed, then the least
+    recently used ones until the cache fits ``max_size_mb``.
+    """
+    
+    def __init__(self, config, store=None, enabled=None):
+        self.config = config
+        self.store = store or StageStore(config)
+        self.enabled = config.get('cache', 'enabled', default=True) if enabled is None else enabled
+        self.cache_dir = Path(config.get('cache', 'dir', default='data/cache/'))
+        self.max_size_mb = config.get('cache', 'max_size_mb', default=2048)
+        self.max_age_days = config.get('cache', 'max_age_days', default=30)
+        self.results = []
+        self._digests = None
+    
+    # Hashing
+    
+    def _digest_index_path(self):
+        return self.cache_dir / 'digests.json'
+    
+    def digest(self, path):
+        """Content digest of a file, reusing the stored one if size and mtime match"""
+        if self._digests is None:
+            index_path = self._digest_index_path()
+            self._digests = json.loads(index_path.read_text()) if index_path.exists() else {}
+        
+        path = Path(path)
+        stat = path.stat()
+        name = str(path.resolve())
+        entry = self._digests.get(name)
+        if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return entry[2]
+        
+        digest = file_digest(path)
+        self._digests[name] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+    
+    def _save_digests(self):
+        if self._digests is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._digest_index_path().write_text(json.dumps(self._digests))
+    
+    def stage_digest(self, stage):
+        """Digest of the stored copy of a stage (None if it is missing)"""
+        path, _ = self.store.find(stage)
+        if path is None:
+            return None
+        digest = hashlib.sha256()
+        for part in _files(path):
+            digest.update(part.name.encode())
+            digest.update(self.digest(part).encode())
+        return digest.hexdigest()
+    
+    def code_version(self, paths):
+        """Digest of the source files a step runs"""
+        digest = hashlib.sha256()
+        for path in paths:
+            for source in _files(REPO_ROOT / path):
+                if source.suffix == '.py':
+                    digest.update(str(source.relative_to(REPO_ROOT)).encode())
+                    digest.update(self.digest(source).encode())
+        return digest.hexdigest()
+    
+    def key(self, step, input_files=(), input_stages=(), config_keys=(), code=(), kernel_backend=False, **_):
+        """Cache key of a step, or None if one of its inputs does not exist"""
+        inputs = {}
+        for keys in input_files:
+            path = self.config.get(*keys)
+            if path is None or not Path(path).exists():
+                return None
+            inputs['/'.join(keys)] = self.digest(path)
+        for stage in input_stages:
+            inputs[stage] = self.stage_digest(stage)
+            if inputs[stage] is None:
+                return None
+        
+        settings = {'/'.join(keys): self.config.get(*keys) for keys in config_keys}
+        settings['storage_format'] = self.store.format
+        if kernel_backend:
+            settings['kernel_backend'] = resolve_backend(self.config)
+        payload = json.dumps({
+            'step': step,
+            'inputs': inputs,
+            'config': settings,
+            'code': self.code_version(code)
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()[:32]
+    
+    # Entries
+    
+    def entry_dir(self, key):
+        return self.cache_dir / key
+    
+    def manifest(self, key):
+        path = self.entry_dir(key) / 'manifest.json'
+        return json.loads(path.read_text()) if path.exists() else None
+    
+    def _write_manifest(self, key, manifest):
+        (self.entry_dir(key) / 'manifest.json').write_text(json.dumps(manifest, indent=2))
+    
+    def save(self, key, step, outputs, elapsed):
+        """Copy the stored outputs of a step into a new cache entry"""
+        entry = self.entry_dir(key)
+        tmp = entry.with_name(entry.name + '.tmp')
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        
+        stages = {}
+        for stage in outputs:
+            path, fmt = self.store.find(stage)
+            if path is None:
+                continue
+            target = tmp / path.name
+            if path.is_dir():
+                target.mkdir()
+                for part in sorted(path.glob('part-*')):
+                    shutil.copyfile(part, target / part.name)
+            else:
+                shutil.copyfile(path, target)
+            stages[stage] = {'name': path.name, 'partitioned': path.is_dir(), 'digest': self.stage_digest(stage)}
+        
+        size = sum(p.stat().st_size for p in _files(tmp))
+        now = time.time()
+        shutil.rmtree(entry, ignore_errors=True)
+        tmp.rename(entry)
+        self._write_manifest(key, {
+            'step': step, 'stages': stages, 'size_bytes': size,
+            'compute_seconds': elapsed, 'created': now, 'last_used': now
+        })
+    
+    def restore(self, key):
+        """Write the cached outputs of an entry back into the stage store"""
+        manifest = self.manifest(key)
+        entry = self.entry_dir(key)
+        self.store.output_dir.mkdir(parents=True, exist_ok=True)
+        
+        for stage, info in manifest['stages'].items():
+            if self.stage_digest(stage) == info['digest']:
+                continue  # The store already holds these outputs
+            source = entry / info['name']
+            if info['partitioned']:
+                part_dir = self.store.clear_parts(stage)
+                for part in sorted(source.glob('part-*')):
+                    shutil.copyfile(part, part_dir / part.name)
+            else:
+                # copyfile gives the restored copy a fresh mtime, so it wins over older formats
+                shutil.copyfile(source, self.store.output_dir / info['name'])
+        
+        manifest['last_used'] = time.time()
+        self._write_manifest(key, manifest)
+        return manifest
+    
+    def entries(self):
+        """Manifests of all complete entries, keyed by cache key"""
+        if not self.cache_dir.is_dir():
+            return {}
+        manifests = {}
+        for entry in self.cache_dir.iterdir():
+            if entry.is_dir() and (entry / 'manifest.json').exists():
+                manifests[entry.name] = self.manifest(entry.name)
+        return manifests
+    
+    def evict(self):
+        """Remove expired entries, then least recently used ones above the size limit"""
+        entries = self.entries()
+        now = time.time()
+        removed = []
+        
+        if self.max_age_days is not None:
+            for key, manifest in list(entries.items()):
+                if now - manifest['created'] > self.max_age_days * 86400:
+                    removed.append(key)
+                    del entries[key]
+        
+        if self.max_size_mb is not None:
+            total = sum(m['size_bytes'] for m in entries.values())
+            for key, manifest in sorted(entries.items(), key=lambda item: item[1]['last_used']):
+                if total <= self.max_size_mb * 1e6:
+                    break
+                total -= manifest['size_bytes']
+                removed.append(key)
+        
+        for key in removed:
+            shutil.rmtree(self.entry_dir(key), ignore_errors=True)
+        if removed:
+            logger.info(f"Evicted {len(removed)} cache entries")
+        return removed
+    
+    def clear(self):
+        """Remove every cache entry and the digest index"""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        self._digests = None
+    
+    # Running steps
+    
+    def run(self, step, func, spec=None):
+        """Run ``func`` unless the cache holds the outputs of ``step`` for the current inputs
+        
+        Returns True on a cache hit.
+        """
+        spec = spec or STAGE_STEPS[step]
+        key = self.key(step, **spec) if self.enabled else None
+        
+        if key is not None and self.manifest(key) is not None:
+            manifest = self.restore(key)
+            self._save_digests()
+            self.results.append({'step': step, 'status': 'hit', 'seconds': manifest['compute_seconds']})
+            logger.info(f"Cache hit for {step} ({key[:12]}), restored {', '.join(manifest['stages'])}")
+            return True
+        
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        status = 'miss' if self.enabled else 'disabled'
+        
+        if self.enabled:
+            if key is not None:
+                self.save(key, step, spec['outputs'], elapsed)
+                self.evict()
+            self._save_digests()
+            logger.info(f"Cache miss for {step}, computed in {elapsed:.1f} s")
+        
+        self.results.append({'step': step, 'status': status, 'seconds': elapsed})
+        return False
+    
+    def summary(self):
+        """Log the hit/miss status of every step run through the cache"""
+        if not self.results:
+            return
+        hits = [r for r in self.results if r['status'] == 'hit']
+        logger.info("Stage cache: " + ", ".join(f"{r['step']} {r['status']}" for r in self.results))
+        if hits:
+            logger.info(f"Stage cache: {len(hits)}/{len(self.results)} steps reused, "
+                        f"~{sum(r['seconds'] for r in hits):.1f} s of compute skipped")
+
+def main():
+    """List or clear cached stage outputs"""
+    import argparse
+    from src.utils.config_loader import load_config
+    
+    parser = argparse.ArgumentParser(description='Inspect the pipeline stage cache')
+    parser.add_argument('--clear', action='store_true', help='Remove all cache entries')
+    parser.add_argument('--evict', action='store_true', help='Apply the size and age limits now')
+    args = parser.parse_args()
+    
+    cache = StageCache(load_config())
+    if args.clear:
+        cache.clear()
+        print(f"Cleared {cache.cache_dir}")
+        return
+    if args.evict:
+        cache.evict()
+    
+    entries = cache.entries()
+    print(f"{len(entries)} entries in {cache.cache_dir} "
+          f"({sum(m['size_bytes'] for m in entries.values()) / 1e6:.1f} MB, limit {cache.max_size_mb} MB)")
+    for key, manifest in sorted(entries.items(), key=lambda item: -item[1]['last_used']):
+        age_hours = (time.time() - manifest['created']) / 3600
+        print(f"  {key[:12]}  {manifest['step']:<24} {manifest['size_bytes'] / 1e6:>8.1f} MB  "
+              f"{age_hours:>6.1f} h old  {', '.join(manifest['stages'])}")
+
+if __name__ == "__main__":
+    main()
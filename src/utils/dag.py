@@ -0,0 +1,205 @@
+"""Dependency-ordered pipeline execution with concurrent stages"""
+import time
+import threading
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src.utils.logger import setup_logger
+from src.utils.schema import memory_mb, peak_rss_mb
+
+logger = setup_logger(__name__, "logs/pipeline.log")
+
+def artifact_mb(value):
+    """In-memory size of a stage result in MB (frames only)"""
+    if isinstance(value, pd.DataFrame):
+        return memory_mb(value)
+    if isinstance(value, (tuple, list)):
+        return sum(artifact_mb(v) for v in value)
+    return 0.0
+
+class PipelineStage:
+    """A pipeline step with named inputs and outputs
+    
+    ``func`` is called with the input artifacts as keyword arguments. With one
+    output it returns the artifact itself, with several a tuple in
+    ``outputs`` order. A ``cache_step`` (see src.utils.cache.STAGE_STEPS)
+    lets the stage be skipped when its stored outputs are still valid.
+    """
+    
+    def __init__(self, name, func, inputs=(), outputs=(), cache_step=None):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.cache_step = cache_step
+
+class PipelineDAG:
+    """Run stages as soon as their inputs exist, independent ones concurrently
+    
+    Artifacts are handed between stages in memory. An artifact that was not
+    produced in this run (the producing stage was restored from the stage
+    cache, or returned None because it wrote its output in parts) is read
+    from the stage store of the same name, once, when a stage first needs it.
+    A failed stage skips everything downstream of it; independent branches
+    keep running. Stages run in threads, so they must not modify their
+    input frames.
+    """
+    
+    def __init__(self, config, store=None, cache=None, max_workers=None):
+        self.config = config
+        self.store = store
+        self.cache = cache
+        self.max_workers = max_workers or config.get('pipeline', 'max_workers', default=4)
+        self.stages = {}
+        self.artifacts = {}
+        self.records = []
+        self._lock = threading.Lock()
+    
+    def add(self, name, func, inputs=(), outputs=(), cache_step=None):
+        """Declare a stage; returns self so stages can be chained"""
+        if name in self.stages:
+            raise ValueError(f"Duplicate pipeline stage: {name}")
+        self.stages[name] = PipelineStage(name, func, inputs, outputs, cache_step)
+        return self
+    
+    def producers(self):
+        """Stage producing each artifact"""
+        producers = {}
+        for stage in self.stages.values():
+            for output in stage.outputs:
+                if output in producers:
+                    raise ValueError(f"Artifact {output} produced by {producers[output]} and {stage.name}")
+                producers[output] = stage.name
+        return producers
+    
+    def dependencies(self):
+        """Upstream stages of every stage; raises on cycles"""
+        producers = self.producers()
+        deps = {name: {producers[i] for i in stage.inputs if i in producers}
+                for name, stage in self.stages.items()}
+        
+        visiting, done = set(), set()
+        def visit(name, path):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Pipeline cycle: {' -> '.join(path + [name])}")
+            visiting.add(name)
+            for dep in deps[name]:
+                visit(dep, path + [name])
+            visiting.discard(name)
+            done.add(name)
+        for name in deps:
+            visit(name, [])
+        return deps
+    
+    def _resolve(self, name):
+        """Value of an artifact, reading it from the stage store if it is not in memory"""
+        with self._lock:
+            if self.artifacts.get(name) is None:
+                if self.store is None or not self.store.exists(name):
+                    raise KeyError(f"Artifact {name} was not produced and is not stored")
+                self.artifacts[name] = self.store.load(name)
+            return self.artifacts[name]
+    
+    def _call(self, stage):
+        return stage.func(**{name: self._resolve(name) for name in stage.inputs})
+    
+    def _execute(self, stage):
+        """Run one stage (in a worker thread), through the cache if it has a cache step
+        
+        Inputs are resolved only when the stage actually runs, so a cache hit
+        never reads its inputs from disk.
+        """
+        start = time.perf_counter()
+        result = {}
+        if stage.cache_step is not None and self.cache is not None:
+            hit = self.cache.run(stage.cache_step, lambda: result.setdefault('value', self._call(stage)))
+            status = 'cached' if hit else 'ran'
+        else:
+            result['value'] = self._call(stage)
+            status = 'ran'
+        return result.get('value'), status, time.perf_counter() - start
+    
+    def _store_outputs(self, stage, value):
+        if len(stage.outputs) == 1:
+            value = (value,)
+        elif value is None:
+            value = (None,) * len(stage.outputs)
+        with self._lock:
+            for output, artifact in zip(stage.outputs, value):
+                self.artifacts[output] = artifact
+        return artifact_mb(value)
+    
+    def run(self):
+        """Execute every stage; returns the per-stage report"""
+        deps = self.dependencies()
+        pending = dict(self.stages)
+        failed = set()
+        running = {}
+        t0 = time.perf_counter()
+        
+        def record(name, status, started=None, seconds=0.0, output_mb=0.0):
+            self.records.append({
+                'stage': name, 'status': status,
+                'start_s': started if started is not None else time.perf_counter() - t0,
+                'seconds': seconds, 'output_mb': output_mb, 'peak_rss_mb': peak_rss_mb()
+            })
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='stage') as pool:
+            while pending or running:
+                # Skip stages downstream of a failure
+                for name in [n for n in pending if deps[n] & failed]:
+                    del pending[name]
+                    failed.add(name)
+                    record(name, 'skipped')
+                    logger.warning(f"Skipping stage {name}: an upstream stage failed")
+                
+                done_names = {r['stage'] for r in self.records}
+                for name in [n for n in pending if deps[n] <= done_names - failed]:
+                    stage = pending.pop(name)
+                    logger.info(f"Starting stage {name}")
+                    future = pool.submit(self._execute, stage)
+                    running[future] = (stage, time.perf_counter() - t0)
+                
+                if not running:
+                    continue
+                
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stage, started = running.pop(future)
+                    try:
+                        value, status, seconds = future.result()
+                    except Exception as e:
+                        failed.add(stage.name)
+                        record(stage.name, 'failed', started, time.perf_counter() - t0 - started)
+                        logger.error(f"Stage {stage.name} failed: {e}", exc_info=True)
+                        continue
+                    record(stage.name, status, started, seconds, self._store_outputs(stage, value))
+                    logger.info(f"Finished stage {stage.name} ({status}, {seconds:.1f} s)")
+        
+        return self.report()
+    
+    def report(self):
+        """Per-stage status, start offset, wall time, output size and process peak RSS"""
+        return pd.DataFrame(self.records, columns=['stage', 'status', 'start_s', 'seconds',
+                                                   'output_mb', 'peak_rss_mb'])
+    
+    def failed(self):
+        return [r['stage'] for r in self.records if r['status'] in ('failed', 'skipped')]
+    
+    def log_report(self):
+        """Log the timing and memory table"""
+        report = self.report()
+        table = report.to_string(index=False, formatters={
+            'start_s': '{:.1f}'.format, 'seconds': '{:.2f}'.format,
+            'output_mb': '{:.1f}'.format, 'peak_rss_mb': '{:.0f}'.format
+        })
+        logger.info("\n" + "=" * 70 + "\nPIPELINE STAGES\n" + "=" * 70 + "\n" + table)
+        if len(report):
+            wall = (report['start_s'] + report['seconds']).max()
+            logger.info(f"Wall time {wall:.1f} s for {report['seconds'].sum():.1f} s of stage time")
+        return report
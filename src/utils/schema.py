@@ -0,0 +1,156 @@
+"""Column types for AIS and feature frames"""
+import numpy as np
+import pandas as pd
+from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src.utils.logger import setup_logger
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = setup_logger(__name__, "logs/storage.log")
+
+# Declared types for core AIS columns. Positions stay float64: float32
+# would round longitudes near 90 degrees to ~1 m.
+COLUMN_TYPES = {
+    'MMSI': 'int64',
+    'timestamp': 'datetime64[ns]',
+    'lat': 'float64',
+    'lon': 'float64',
+    'SOG': 'float64',
+    'COG': 'float64',
+    'heading': 'float64'
+}
+
+COMPACT_COLUMN_TYPES = {
+    **COLUMN_TYPES,
+    'MMSI': 'uint32',  # MMSIs have nine digits
+    'SOG': 'float32',
+    'COG': 'float32',
+    'heading': 'float32'
+}
+
+# 0/1 indicators
+FLAG_COLUMNS = ['loitering', 'fishing_speed', 'ais_gap', 'disappeared', 'position_jump', 'anomaly']
+
+# Low-cardinality strings
+CATEGORY_COLUMNS = ['vessel_name', 'vessel_type', 'data_source']
+
+def compact_dtypes(config):
+    """Whether the compact schema is enabled (``data.compact_dtypes``)"""
+    return config is None or config.get('data', 'compact_dtypes', default=True)
+
+def _cast(df, col, dtype):
+    if str(df[col].dtype) == dtype:
+        return
+    if dtype.startswith('datetime64'):
+        df[col] = pd.to_datetime(df[col], errors='coerce')
+    elif dtype[0] in 'iu' and df[col].isna().any():
+        logger.debug(f"Column {col} has missing values, keeping {df[col].dtype}")
+    else:
+        df[col] = df[col].astype(dtype)
+
+def apply_schema(df, config=None):
+    """Cast a frame to the pipeline schema
+    
+    Core AIS columns always get their declared types. With compact dtypes
+    enabled (the default) the rest of the frame is narrowed as well: flags
+    to uint8, names, types and sources to categoricals, other integers to
+    int32 and other floats to float32.
+    """
+    if not compact_dtypes(config):
+        for col, dtype in COLUMN_TYPES.items():
+            if col in df.columns:
+                _cast(df, col, dtype)
+        return df
+    
+    for col in df.columns:
+        dtype = df[col].dtype
+        if col in COMPACT_COLUMN_TYPES:
+            _cast(df, col, COMPACT_COLUMN_TYPES[col])
+        elif col in FLAG_COLUMNS and (pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_bool_dtype(dtype)):
+            _cast(df, col, 'uint8')
+        elif col in CATEGORY_COLUMNS:
+            _cast(df, col, 'category')
+        elif pd.api.types.is_integer_dtype(dtype) and dtype.itemsize > 4:
+            values = df[col].to_numpy()
+            if len(values) == 0 or (values.min() >= np.iinfo('int32').min and values.max() <= np.iinfo('int32').max):
+                _cast(df, col, 'int32')
+        elif pd.api.types.is_float_dtype(dtype) and dtype.itemsize > 4:
+            _cast(df, col, 'float32')
+    return df
+
+def widen(df):
+    """The frame with default pandas types (int64, float64, object strings)"""
+    wide = {}
+    for col in df.columns:
+        dtype = df[col].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            wide[col] = df[col].astype(object)
+        elif pd.api.types.is_bool_dtype(dtype):
+            wide[col] = df[col]
+        elif pd.api.types.is_integer_dtype(dtype):
+            wide[col] = df[col].astype('int64')
+        elif pd.api.types.is_float_dtype(dtype):
+            wide[col] = df[col].astype('float64')
+        else:
+            wide[col] = df[col]
+    return pd.DataFrame(wide, index=df.index)
+
+def memory_mb(df):
+    """Deep in-memory size of a frame in MB"""
+    return df.memory_usage(deep=True).sum() / 1e6
+
+def peak_rss_mb():
+    """Peak resident memory of the whole process so far in MB (NaN where unavailable)"""
+    if resource is None:
+        return float('nan')
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1e6 if sys.platform == 'darwin' else rss / 1e3
+
+def memory_report(store, stages):
+    """In-memory size of stored stages with the wide and the compact schema"""
+    rows = []
+    for stage in stages:
+        if not store.exists(stage):
+            continue
+        df = store.load(stage)
+        wide = widen(df)
+        compact = apply_schema(widen(df))
+        rows.append({
+            'stage': stage,
+            'rows': len(df),
+            'columns': len(df.columns),
+            'wide_mb': memory_mb(wide),
+            'compact_mb': memory_mb(compact)
+        })
+    
+    report = pd.DataFrame(rows, columns=['stage', 'rows', 'columns', 'wide_mb', 'compact_mb'])
+    report['reduction'] = 1 - report['compact_mb'] / report['wide_mb']
+    return report
+
+def main():
+    """Print the memory footprint of each stored pipeline stage"""
+    from src.utils.config_loader import load_config
+    from src.utils.storage import StageStore, STAGES
+    
+    store = StageStore(load_config())
+    report = memory_report(store, STAGES)
+    
+    print("=" * 70)
+    print("MEMORY PER PIPELINE STAGE (wide = int64/float64/object)")
+    print("=" * 70)
+    print(report.to_string(index=False, formatters={
+        'wide_mb': '{:.2f}'.format, 'compact_mb': '{:.2f}'.format, 'reduction': '{:.0%}'.format
+    }))
+    total_wide, total_compact = report['wide_mb'].sum(), report['compact_mb'].sum()
+    if total_wide:
+        print(f"\nTotal: {total_wide:.2f} MB -> {total_compact:.2f} MB "
+              f"({1 - total_compact / total_wide:.0%} smaller)")
+
+if __name__ == "__main__":
+    main()
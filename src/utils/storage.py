@@ -0,0 +1,181 @@
+"""Columnar storage for processed pipeline stages"""
+import pandas as pd
+from pathlib import Path
+import sys
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src.utils.logger import setup_logger
+from src.utils.schema import apply_schema, memory_mb
+
+logger = setup_logger(__name__, "logs/storage.log")
+
+# Processed data stages written by the pipeline
+STAGES = [
+    'ais_cleaned',
+    'ais_eez_filtered',
+    'ais_behavior_features',
+    'ais_all_features',
+    'ais_enhanced_features',
+    'ais_vessel_features',
+    'ais_fishing_hotspots'
+]
+
+FORMAT_EXTENSIONS = {
+    'parquet': '.parquet',
+    'feather': '.feather',
+    'csv': '.csv'
+}
+
+def _arrow_available():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+class StageStore:
+    """Read and write pipeline stages in a configurable on-disk format
+    
+    Parquet is the default; Feather (Arrow IPC) and CSV are also supported.
+    Both columnar formats need pyarrow; without it the store falls back to
+    CSV. A stage is either a single file or a directory of part files
+    written chunk by chunk. Readers pick the most recently written copy of a
+    stage in any format, so stages written by older runs stay readable.
+    Frames are cast to the pipeline schema (src.utils.schema) on both write
+    and read.
+    """
+    
+    def __init__(self, config, output_dir=None):
+        self.config = config
+        self.output_dir = Path(output_dir or config.get('data', 'output_dir', default='data/processed/'))
+        self.format = config.get('data', 'storage_format', default='parquet')
+        
+        if self.format not in FORMAT_EXTENSIONS:
+            raise ValueError(f"Unsupported storage format: {self.format}")
+        
+        if self.format != 'csv' and not _arrow_available():
+            logger.warning(f"pyarrow not installed, storing stages as CSV instead of {self.format}. "
+                           "Install with: pip install pyarrow")
+            self.format = 'csv'
+    
+    def path(self, stage, fmt=None):
+        """Path of a stage file in the given (or configured) format"""
+        return self.output_dir / f"{stage}{FORMAT_EXTENSIONS[fmt or self.format]}"
+    
+    def partition_dir(self, stage):
+        """Directory holding the part files of a partitioned stage"""
+        return self.output_dir / stage
+    
+    def find(self, stage):
+        """Most recently written file or partition directory for a stage"""
+        candidates = []
+        for fmt in FORMAT_EXTENSIONS:
+            path = self.path(stage, fmt)
+            if path.exists():
+                candidates.append((path.stat().st_mtime, path, fmt))
+        
+        part_dir = self.partition_dir(stage)
+        parts = sorted(part_dir.glob('part-*')) if part_dir.is_dir() else []
+        if parts:
+            fmt = next(f for f, ext in FORMAT_EXTENSIONS.items() if parts[0].suffix == ext)
+            candidates.append((max(p.stat().st_mtime for p in parts), part_dir, fmt))
+        
+        if not candidates:
+            return None, None
+        _, path, fmt = max(candidates, key=lambda c: c[0])
+        return path, fmt
+    
+    def exists(self, stage):
+        return self.find(stage)[0] is not None
+    
+    def _write(self, df, path):
+        df = apply_schema(df.copy(deep=False), self.config)
+        
+        if self.format == 'parquet':
+            df.to_parquet(path, index=False)
+        elif self.format == 'feather':
+            df.reset_index(drop=True).to_feather(path)
+        else:
+            df.to_csv(path, index=False)
+    
+    def save(self, df, stage):
+        """Write a stage in the configured format"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        path = self.path(stage)
+        self._write(df, path)
+        logger.info(f"Saved {len(df)} records to {path}")
+        return path
+    
+    def clear_parts(self, stage):
+        """Remove the part files of a partitioned stage before rewriting it"""
+        part_dir = self.partition_dir(stage)
+        if part_dir.is_dir():
+            for part in part_dir.glob('part-*'):
+                part.unlink()
+        part_dir.mkdir(parents=True, exist_ok=True)
+        return part_dir
+    
+    def save_part(self, df, stage, part_number):
+        """Write one part of a partitioned stage"""
+        path = self.partition_dir(stage) / f"part-{part_number:05d}{FORMAT_EXTENSIONS[self.format]}"
+        self._write(df, path)
+        return path
+    
+    def load(self, stage, columns=None):
+        """Read a stage, optionally restricted to a subset of columns"""
+        path, fmt = self.find(stage)
+        if path is None:
+            raise FileNotFoundError(f"No stored data for stage '{stage}' in {self.output_dir}")
+        
+        if path.is_dir():
+            parts = [self._read(part, fmt, columns) for part in sorted(path.glob('part-*'))]
+            df = pd.concat(parts, ignore_index=True)
+        else:
+            df = self._read(path, fmt, columns)
+        
+        df = apply_schema(df, self.config)
+        logger.info(f"Loaded {len(df)} records ({len(df.columns)} columns, {memory_mb(df):.1f} MB) from {path}")
+        return df
+    
+    def _read(self, path, fmt, columns):
+        if fmt == 'parquet':
+            return pd.read_parquet(path, columns=columns)
+        if fmt == 'feather':
+            return pd.read_feather(path, columns=columns)
+        return pd.read_csv(path, usecols=columns)
+    
+    def export_csv(self, stage, output_path=None):
+        """Export a stored stage to CSV for sharing or inspection
+        
+        Exports go to ``data.export_dir``, not the stage directory, where a
+        newer CSV copy would shadow the columnar stage file in ``find``.
+        """
+        if output_path is None:
+            export_dir = Path(self.config.get('data', 'export_dir', default='outputs/exports/'))
+            export_dir.mkdir(parents=True, exist_ok=True)
+            output_path = export_dir / f"{stage}.csv"
+        output_path = Path(output_path)
+        df = self.load(stage)
+        df.to_csv(output_path, index=False)
+        logger.info(f"Exported {stage} to {output_path}")
+        return output_path
+
+def main():
+    """Export processed stages to CSV"""
+    import argparse
+    from src.utils.config_loader import load_config
+    
+    parser = argparse.ArgumentParser(description='Export processed pipeline stages to CSV')
+    parser.add_argument('stages', nargs='*', default=STAGES,
+                       help='Stages to export (default: all stored stages)')
+    args = parser.parse_args()
+    
+    store = StageStore(load_config())
+    for stage in args.stages:
+        if store.exists(stage):
+            store.export_csv(stage)
+        else:
+            logger.warning(f"Stage {stage} not found, skipping")
+
+if __name__ == "__main__":
+    main()
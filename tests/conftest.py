@@ -0,0 +1,15 @@
+"""Shared fixtures: make ``src`` importable and load the project config"""
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT))
+
+from src.utils.config_loader import load_config
+
+
+@pytest.fixture(scope='session')
+def config():
+    return load_config(ROOT / 'config' / 'config.yaml')
@@ -0,0 +1,76 @@
+"""Incremental feature engine against the batch extractors"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.features.behavior_features import BehaviorFeatureExtractor
+from src.features.transmission_features import TransmissionFeatureExtractor
+from src.features.incremental_features import IncrementalFeatureEngine
+from src.utils.schema import apply_schema
+
+
+def make_tracks(n_vessels=4, n_points=60, seed=7):
+    """Tracks with drifting phases and a few long transmission gaps"""
+    rng = np.random.default_rng(seed)
+    n_rows = n_vessels * n_points
+    gaps = np.where(rng.random((n_vessels, n_points)) < 0.05,
+                    rng.uniform(60, 240, (n_vessels, n_points)),
+                    rng.uniform(5, 20, (n_vessels, n_points))).cumsum(axis=1)
+    step = np.where(rng.random((n_vessels, n_points)) < 0.5, 0.002, 0.02)
+    df = pd.DataFrame({
+        'MMSI': np.repeat(400000000 + np.arange(1, n_vessels + 1), n_points),
+        'timestamp': pd.Timestamp('2024-01-01') + pd.to_timedelta(gaps.ravel(), unit='min'),
+        'lat': (np.repeat(rng.uniform(6, 22, n_vessels), n_points)
+                + (rng.normal(0, 1, (n_vessels, n_points)) * step).cumsum(axis=1).ravel()),
+        'lon': (np.repeat(rng.uniform(68, 88, n_vessels), n_points)
+                + (rng.normal(0, 1, (n_vessels, n_points)) * step).cumsum(axis=1).ravel()),
+        'SOG': rng.uniform(0, 12, n_rows),
+        'COG': rng.uniform(0, 360, n_rows),
+        'heading': rng.uniform(0, 360, n_rows)
+    })
+    return df.sort_values('timestamp', kind='stable').reset_index(drop=True)
+
+
+def batch_features(df, config):
+    df = BehaviorFeatureExtractor(config).extract_features(df)
+    return TransmissionFeatureExtractor(config).extract_features(df)
+
+
+def test_overlapping_cycles_match_batch_extractors(config):
+    df = make_tracks()
+    expected = apply_schema(batch_features(df, config), config).sort_index()
+    
+    engine = IncrementalFeatureEngine(config)
+    bounds = np.linspace(0, len(df), 5).astype(int)
+    overlap = len(df) // 20
+    result = pd.concat([
+        engine.update_frame(df.iloc[max(lo - overlap, 0):hi])
+        for lo, hi in zip(bounds[:-1], bounds[1:])
+    ]).sort_index()
+    
+    assert result.index.equals(expected.index)
+    for col in [col for col in expected.columns if col not in df.columns]:
+        np.testing.assert_allclose(result[col].to_numpy(dtype=float), expected[col].to_numpy(dtype=float),
+                                   rtol=1e-6, atol=1e-6, err_msg=col)
+
+
+def test_repeated_cycle_without_heading_is_empty(config):
+    df = make_tracks(n_vessels=1, n_points=2).drop(columns=['heading'])
+    engine = IncrementalFeatureEngine(config)
+    assert len(engine.update_frame(df)) == 2
+    assert engine.update_frame(df).empty
+
+
+@pytest.mark.parametrize('refetch_order', [[0, 1], [1, 0]])
+def test_reports_sharing_the_last_timestamp_are_folded_once(config, refetch_order):
+    engine = IncrementalFeatureEngine(config)
+    t = pd.Timestamp('2024-01-01 12:00')
+    reports = [(t, 10.0, 70.0), (t, 10.001, 70.001)]
+    for timestamp, lat, lon in reports:
+        assert engine.update(1, timestamp, lat, lon, 5.0, 90.0) is not None
+    
+    # A refetched window repeats both reports at the last timestamp
+    for i in refetch_order:
+        timestamp, lat, lon = reports[i]
+        assert engine.update(1, timestamp, lat, lon, 5.0, 90.0) is None
+    assert len(engine.vessels[1].time_gap) == 2
@@ -0,0 +1,63 @@
+"""Circular-angle and gap kernels"""
+import numpy as np
+import pandas as pd
+
+from src.features.kernels import (
+    angle_diff, wrap_angle, track_starts, track_diff, track_shift,
+    time_gaps_minutes, gap_flags, position_jump_flags
+)
+
+
+def test_angle_diff_wraps_around_north():
+    np.testing.assert_array_equal(angle_diff([359, 1, 90, 0], [1, 359, 270, 180]), [2, 2, 180, 180])
+
+
+def test_wrap_angle_folds_onto_half_circle():
+    np.testing.assert_array_equal(wrap_angle([0, 10, 180, 190, 358, 360]), [0, 10, 180, 170, 2, 0])
+
+
+def test_angles_propagate_nan():
+    assert np.isnan(angle_diff([np.nan, 10], [10, np.nan])).all()
+    assert np.isnan(wrap_angle([np.nan]))[0]
+
+
+def test_track_starts_at_vessel_boundaries():
+    np.testing.assert_array_equal(track_starts([1, 1, 2, 2, 2, 3]), [True, False, True, False, False, True])
+    assert track_starts([]).size == 0
+
+
+def test_track_diff_and_shift_reset_at_vessel_boundaries():
+    starts = track_starts([1, 1, 2, 2])
+    values = [1.0, 4.0, 10.0, 15.0]
+    np.testing.assert_array_equal(track_diff(values, starts), [np.nan, 3.0, np.nan, 5.0])
+    np.testing.assert_array_equal(track_shift(values, starts), [np.nan, 1.0, np.nan, 10.0])
+    # Without starts the whole array is one track
+    np.testing.assert_array_equal(track_diff(values), [np.nan, 3.0, 6.0, 5.0])
+
+
+def test_track_diff_propagates_nan():
+    np.testing.assert_array_equal(track_diff([1.0, np.nan, 3.0]), [np.nan, np.nan, np.nan])
+
+
+def test_time_gaps_with_nat():
+    timestamps = pd.to_datetime(['2024-01-01 00:00', '2024-01-01 00:10', None,
+                                 '2024-01-01 00:40', '2024-01-01 01:00'])
+    np.testing.assert_array_equal(time_gaps_minutes(timestamps), [np.nan, 10.0, np.nan, np.nan, 20.0])
+
+
+def test_time_gaps_reset_at_vessel_boundaries():
+    timestamps = pd.to_datetime(['2024-01-01 00:00', '2024-01-01 00:30',
+                                 '2024-01-01 00:05', '2024-01-01 00:20'])
+    starts = track_starts([1, 1, 2, 2])
+    np.testing.assert_array_equal(time_gaps_minutes(timestamps, starts), [np.nan, 30.0, np.nan, 15.0])
+
+
+def test_gap_flags_skip_nan_gaps():
+    np.testing.assert_array_equal(gap_flags([np.nan, 10.0, 45.0, 30.0], threshold=30), [0, 0, 1, 0])
+
+
+def test_position_jump_flags_skip_nan_gaps():
+    # 50 knots for an hour is ~92.6 km; the tolerance allows 1.5x that
+    distances = [100.0, 200.0, 10.0, np.nan]
+    gaps = [60.0, 60.0, np.nan, 60.0]
+    np.testing.assert_array_equal(position_jump_flags(distances, gaps), [0, 1, 0, 0])